@@ -1,7 +1,7 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 from hashlib import sha256
+from seat_upload import validate_seat_upload, bulk_upsert_seats, seat_upload_section
 
 # Set up page
 st.set_page_config(page_title="Admin - Add JEE Data", layout="centered")
@@ -22,33 +22,40 @@ with st.sidebar:
 # --- Authentication ---
 if login_button:
     if username == USERNAME and sha256(password.encode('utf-8')).hexdigest() == PASSWORD:
-        st.success("Logged in successfully!")
-
-        # Connect to database
-        conn = sqlite3.connect("jee_data.db")
-        cursor = conn.cursor()
-
-        st.subheader("📝 Add New Entry")
-
-        # Input fields
-        institute = st.text_input("Institute")
-        location = st.text_input("Location")
-        inst_type = st.selectbox("Type", ["IIT", "NIT", "IIIT", "GFTI"])
-        program = st.text_input("Academic Program Name")
-        quota = st.selectbox("Quota", ["AI", "HS", "OS"])
-        seat_type = st.text_input("Seat Type")
-        gender = st.selectbox("Gender", ["Gender-Neutral", "Female-only (including Supernumerary)"])
-        opening = st.number_input("Opening Rank", min_value=0, step=1)
-        closing = st.number_input("Closing Rank", min_value=0, step=1)
-        year = st.selectbox("Year", [2021, 2022, 2023, 2024])
-
-        if st.button("➕ Add to Database"):
-            cursor.execute("""
-                INSERT INTO jee_seats (Institute, Location, Type, `Academic Program Name`, Quota, `Seat Type`, Gender, `Opening Rank`, `Closing Rank`, Year)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (institute, location, inst_type, program, quota, seat_type, gender, opening, closing, year))
-            conn.commit()
-            st.success("✅ Record added successfully!")
-
+        st.session_state.admin_authenticated = True
     else:
+        st.session_state.admin_authenticated = False
         st.error("Invalid username or password")
+
+if st.session_state.get('admin_authenticated'):
+    st.success("Logged in successfully!")
+
+    st.subheader("📝 Add New Entry")
+
+    # Input fields
+    institute = st.text_input("Institute")
+    location = st.text_input("Location")
+    inst_type = st.selectbox("Type", ["IIT", "NIT", "IIIT", "GFTI"])
+    program = st.text_input("Academic Program Name")
+    quota = st.selectbox("Quota", ["AI", "HS", "OS"])
+    seat_type = st.text_input("Seat Type")
+    gender = st.selectbox("Gender", ["Gender-Neutral", "Female-only (including Supernumerary)"])
+    opening = st.number_input("Opening Rank", min_value=0, step=1)
+    closing = st.number_input("Closing Rank", min_value=0, step=1)
+    year = st.selectbox("Year", [2021, 2022, 2023, 2024])
+
+    if st.button("➕ Add to Database"):
+        record = pd.DataFrame([{
+            'Institute': institute, 'Location': location, 'Type': inst_type,
+            'Academic Program Name': program, 'Quota': quota, 'Seat Type': seat_type,
+            'Gender': gender, 'Opening Rank': opening, 'Closing Rank': closing, 'Year': year
+        }])
+        valid_df, rejected_df = validate_seat_upload(record)
+        if len(rejected_df) > 0:
+            st.error(f"Error adding record: {rejected_df['Reason'].iloc[0]}")
+        else:
+            bulk_upsert_seats(valid_df)
+            st.success("✅ Record added successfully!")
+
+    st.markdown("---")
+    seat_upload_section()
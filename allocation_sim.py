@@ -0,0 +1,410 @@
+# allocation_sim.py - Deferred-acceptance seat allocation over real or synthetic preference lists
+#
+# Usage:
+#   python allocation_sim.py                                   # 1M synthetic candidates, latest year
+#   python allocation_sim.py --candidates 200000 --list-mean 25 --seats 8 --output sim_options.csv
+#   python allocation_sim.py --from-shortlists --ranks ranks.csv --allocations sim_allocations.csv
+#   python allocation_sim.py --seat-matrix seats.csv            # per-option seat counts (option_id, Seats)
+#
+# Candidates propose down their ordered lists and every option keeps the best
+# candidates it has been offered up to its capacity (candidate-proposing
+# deferred acceptance, as in JoSAA). An option ranks candidates by category
+# rank for reserved seat types and by CRL otherwise. All proposals of a round
+# are resolved together with one sort, and only options that received new
+# proposals are re-sorted, so the work per round shrinks as candidates settle.
+#
+# Preferences are stored as a CSR pair (int64 offsets, int32 option indexes),
+# about 4 bytes per listed choice. The seat matrix is the final round of a year
+# from jee_seats; cutoffs carry no seat counts, so each option gets --seats seats
+# unless a seat matrix CSV supplies them.
+#
+# Synthetic candidates get CRL 1..N, a category and a category rank, and list
+# options whose past closing rank is near their own rank (most competitive
+# first). Quota and PwD eligibility are not modelled.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from database import get_connection, get_seat_connection, register_query
+
+
+DEFAULT_CANDIDATES = 1_000_000
+DEFAULT_SEATS_PER_OPTION = int(os.environ.get("JEE_SIM_SEATS_PER_OPTION", 10))
+
+# Share of candidates in each category (the rest are OPEN)
+CATEGORY_SHARES = {"OBC-NCL": 0.27, "SC": 0.14, "EWS": 0.10, "ST": 0.05}
+OPEN_SEAT_TYPE = "OPEN"
+NEUTRAL_GENDER = "Gender-Neutral"
+FEMALE_SHARE = 0.3
+
+# Synthetic lists hold options that closed between these multiples of the candidate's rank,
+# or the MIN_WINDOW options nearest to it where that range is sparse
+WINDOW_LOW, WINDOW_HIGH = 0.6, 3.0
+MIN_WINDOW = 50
+
+GENERATE_CHUNK_SIZE = 100_000
+
+# A full read of every linked shortlist item, in list order
+SHORTLIST_PREFERENCES_SQL = register_query(
+    "allocation_sim.shortlist_preferences",
+    "SELECT s.user_id, u.username, s.option_id, s.closing_rank FROM shortlists s JOIN users u ON u.id = s.user_id "
+    "WHERE s.option_id IS NOT NULL ORDER BY s.user_id, s.priority_order, s.id",
+    hot=False,
+)
+
+# Final-round cutoff of every option in a year, one index lookup per option (NULL rounds sort last)
+SEAT_MATRIX_SQL = register_query("allocation_sim.seat_matrix", """
+    SELECT o.id AS option_id, i.name AS Institute, p.name AS "Academic Program Name", q.name AS Quota,
+           s.name AS "Seat Type", g.name AS Gender, f.opening_rank AS "Opening Rank",
+           f.closing_rank AS "Closing Rank", f.year AS Year, f.round AS Round
+    FROM dim_option o
+    JOIN seat_cutoffs f ON f.id = (
+        SELECT c.id FROM seat_cutoffs c WHERE c.option_id = o.id AND c.year = ? AND c.closing_rank IS NOT NULL
+        ORDER BY c.round DESC LIMIT 1
+    )
+    JOIN dim_institute i ON i.id = o.institute_id
+    JOIN dim_program p ON p.id = o.program_id
+    JOIN dim_quota q ON q.id = o.quota_id
+    JOIN dim_seat_type s ON s.id = o.seat_type_id
+    JOIN dim_gender g ON g.id = o.gender_id
+    ORDER BY o.id
+""", db="seat", hot=False)
+LATEST_YEAR_SQL = register_query("allocation_sim.latest_year", "SELECT MAX(year) FROM seat_cutoffs", db="seat", hot=False)
+
+
+def seat_matrix(conn, year=None, seats=DEFAULT_SEATS_PER_OPTION, matrix_path=None):
+    """
+    Options open in the final round of a year, with their seat counts
+
+    Args:
+        conn: Seat database connection
+        year (int): Year to use (latest when None)
+        seats (int): Seats per option when the matrix file does not list it
+        matrix_path (str): Optional CSV of option_id and Seats
+
+    Returns:
+        pandas.DataFrame: SEAT_MATRIX_COLUMNS plus Seats, one row per option
+    """
+    if year is None:
+        year = conn.execute(LATEST_YEAR_SQL).fetchone()[0]
+    matrix = pd.read_sql_query(SEAT_MATRIX_SQL, conn, params=(year,))
+    matrix["Round"] = matrix["Round"].astype("Int64")
+    matrix["Seats"] = seats
+    if matrix_path:
+        counts = pd.read_csv(matrix_path, usecols=["option_id", "Seats"]).drop_duplicates("option_id", keep="last")
+        listed = matrix["option_id"].map(counts.set_index("option_id")["Seats"])
+        matrix["Seats"] = listed.fillna(seats).astype("int64")
+    return matrix
+
+
+class Candidates:
+    """Candidate ranks and ordered preference lists in compact arrays"""
+
+    def __init__(self, crl, category_rank, offsets, choices, labels=None):
+        self.crl = crl                      # int32, CRL (lower is better)
+        self.category_rank = category_rank  # int32, rank within the candidate's category
+        self.offsets = offsets              # int64, candidate i's list is choices[offsets[i]:offsets[i + 1]]
+        self.choices = choices              # int32, indexes into the seat matrix
+        self.labels = labels                # optional external ids (user ids)
+
+    def __len__(self):
+        return len(self.crl)
+
+    @property
+    def nbytes(self):
+        return self.crl.nbytes + self.category_rank.nbytes + self.offsets.nbytes + self.choices.nbytes
+
+
+def generate_candidates(matrix, n, list_mean=20, list_max=80, seed=0):
+    """
+    Synthetic candidate pool with preference lists drawn around each candidate's rank
+
+    Returns:
+        Candidates
+    """
+    rng = np.random.default_rng(seed)
+    crl = np.arange(1, n + 1, dtype=np.int32)
+
+    categories = [c for c in CATEGORY_SHARES if c in set(matrix["Seat Type"])]
+    shares = np.array([1.0 - sum(CATEGORY_SHARES[c] for c in categories)] + [CATEGORY_SHARES[c] for c in categories])
+    seat_names = [OPEN_SEAT_TYPE] + categories
+    category = rng.choice(len(seat_names), n, p=shares / shares.sum()).astype(np.int8)
+    # CRL is already in merit order, so the category rank is the running count within the category
+    category_rank = np.empty(n, dtype=np.int32)
+    for code in range(len(seat_names)):
+        members = np.flatnonzero(category == code)
+        category_rank[members] = np.arange(1, len(members) + 1, dtype=np.int32)
+    female = rng.random(n) < FEMALE_SHARE
+
+    # Options grouped by (seat type, female-only) and sorted by closing rank for window lookups
+    seat_code = pd.Index(seat_names).get_indexer(matrix["Seat Type"].astype(str)).astype(np.int64)
+    female_only = (matrix["Gender"].astype(str) != NEUTRAL_GENDER).to_numpy()
+    closing = matrix["Closing Rank"].to_numpy(dtype=np.int64)
+    usable = np.flatnonzero(seat_code >= 0)
+    group = seat_code[usable] * 2 + female_only[usable]
+    order = np.lexsort((closing[usable], group))
+    sorted_options = usable[order]
+    sorted_keys = (group[order] << 32) + closing[usable][order]
+
+    group_end = np.searchsorted(sorted_keys, (np.arange(2 * len(seat_names)) + 1) << 32)
+    group_start = np.r_[0, group_end[:-1]]
+
+    # Lists are drawn in chunks of candidates to bound the temporary arrays
+    sizes = np.clip(rng.poisson(list_mean, n), 1, list_max)
+    counts = np.zeros(n, dtype=np.int64)
+    parts = []
+    for start in range(0, n, GENERATE_CHUNK_SIZE):
+        owner = np.repeat(np.arange(start, min(start + GENERATE_CHUNK_SIZE, n), dtype=np.int64),
+                          sizes[start:start + GENERATE_CHUNK_SIZE])
+
+        # One window lookup for every slot: options that closed near the rank in the slot's
+        # (seat type, gender) group, widened to at least MIN_WINDOW options
+        use_category = (category[owner] > 0) & (rng.random(len(owner)) < 0.5)
+        slot_group = np.where(use_category, category[owner], 0).astype(np.int64) * 2
+        slot_group += female[owner] & (rng.random(len(owner)) < 0.4)
+        slot_rank = np.where(use_category, category_rank[owner], crl[owner]).astype(np.float64)
+        base = slot_group << 32
+        lo = np.searchsorted(sorted_keys, base + (slot_rank * WINDOW_LOW).astype(np.int64))
+        hi = np.searchsorted(sorted_keys, base + (slot_rank * WINDOW_HIGH).astype(np.int64))
+        hi = np.minimum(np.maximum(hi, lo + MIN_WINDOW), group_end[slot_group])
+        lo = np.maximum(np.minimum(lo, hi - MIN_WINDOW), group_start[slot_group])
+        ok = hi > lo
+        owner, lo, hi = owner[ok], lo[ok], hi[ok]
+        picked = sorted_options[lo + (rng.random(len(lo)) * (hi - lo)).astype(np.int64)]
+
+        # Most competitive first, with noise hashed from (candidate, option) so repeats of
+        # an option sort next to each other and one sort both orders and dedups the list
+        pair = (owner * len(matrix) + picked).astype(np.uint64)
+        noise = (pair * np.uint64(2654435761)) % np.uint64(4294967291) / 4294967291.0
+        preference = np.log(closing[picked]) + 0.5 * (noise - 0.5)
+        # (candidate, preference) packed into one float key: the fraction stays below 1
+        fraction = (preference - preference.min()) / (preference.max() - preference.min() + 1)
+        order = np.argsort(owner + fraction, kind="stable")
+        owner, picked = owner[order], picked[order]
+        keep = np.r_[True, (picked[1:] != picked[:-1]) | (owner[1:] != owner[:-1])]
+        owner, picked = owner[keep], picked[keep]
+
+        counts += np.bincount(owner, minlength=n)
+        parts.append(picked.astype(np.int32))
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    picked = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+    return Candidates(crl, category_rank, offsets, picked)
+
+
+def shortlist_candidates(conn, matrix, ranks_path=None):
+    """
+    Candidates from saved shortlists, in priority_order
+
+    Ranks come from a CSV of user_id (or username) and rank. Users without one are
+    placed at the lowest saved closing rank on their list.
+
+    Returns:
+        Candidates
+    """
+    items = pd.read_sql_query(SHORTLIST_PREFERENCES_SQL, conn)
+    position = pd.Series(np.arange(len(matrix), dtype=np.int32), index=matrix["option_id"].to_numpy())
+    items["choice"] = items["option_id"].map(position)
+    items = items[items["choice"].notna()]
+    if len(items) == 0:
+        empty = np.zeros(0, dtype=np.int32)
+        return Candidates(empty, empty, np.zeros(1, dtype=np.int64), empty)
+
+    users = items.groupby("user_id", sort=True).agg(username=("username", "first"), estimate=("closing_rank", "min"))
+    rank = users["estimate"].astype("float64")
+    if ranks_path:
+        given = pd.read_csv(ranks_path)
+        if "user_id" in given.columns:
+            lookup = given.drop_duplicates("user_id", keep="last").set_index("user_id")["rank"]
+            listed = users.index.to_series().map(lookup)
+        else:
+            given["username"] = given["username"].str.lower()
+            lookup = given.drop_duplicates("username", keep="last").set_index("username")["rank"]
+            listed = users["username"].str.lower().map(lookup)
+        rank = listed.astype("float64").fillna(rank)
+    # Unique merit order: ties go to the lower user id
+    merit = np.empty(len(users), dtype=np.int32)
+    merit[np.lexsort((users.index.to_numpy(), rank.fillna(np.inf).to_numpy()))] = np.arange(1, len(users) + 1)
+
+    owner = users.index.get_indexer(items["user_id"])
+    offsets = np.zeros(len(users) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner, minlength=len(users)), out=offsets[1:])
+    # One rank list: shortlists carry no category rank
+    return Candidates(merit, merit.copy(), offsets, items["choice"].to_numpy(dtype=np.int32),
+                      labels=users.index.to_numpy())
+
+
+def deferred_acceptance(candidates, capacity, uses_category_rank):
+    """
+    Candidate-proposing deferred acceptance
+
+    Args:
+        candidates (Candidates): Ranks and preference lists
+        capacity (numpy.ndarray): Seats per option
+        uses_category_rank (numpy.ndarray): True where an option ranks candidates by category rank
+
+    Returns:
+        tuple: (option index per candidate or -1, 1-based choice number or 0, rounds run)
+    """
+    n = len(candidates)
+    offsets, choices = candidates.offsets, candidates.choices
+    next_choice = offsets[:-1].copy()
+    end = offsets[1:]
+    max_score = int(max(candidates.crl.max(initial=0), candidates.category_rank.max(initial=0))) + 1
+
+    held_candidate = np.zeros(0, dtype=np.int64)
+    held_option = np.zeros(0, dtype=np.int64)
+    active = np.flatnonzero(next_choice < end)
+    rounds = 0
+    while len(active):
+        rounds += 1
+        proposed = choices[next_choice[active]].astype(np.int64)
+
+        # Only options with new proposals need their held candidates re-ranked
+        touched = np.zeros(len(capacity), dtype=bool)
+        touched[proposed] = True
+        contested = touched[held_option]
+        pool_candidate = np.concatenate([held_candidate[contested], active])
+        pool_option = np.concatenate([held_option[contested], proposed])
+        score = np.where(uses_category_rank[pool_option],
+                         candidates.category_rank[pool_candidate], candidates.crl[pool_candidate])
+
+        # One sort ranks every pool within its option; the best `capacity` stay
+        order = np.argsort(pool_option * max_score + score, kind="stable")
+        pool_candidate, pool_option = pool_candidate[order], pool_option[order]
+        group_start = np.searchsorted(pool_option, pool_option, side="left")
+        accepted = np.arange(len(pool_option)) - group_start < capacity[pool_option]
+
+        held_candidate = np.concatenate([held_candidate[~contested], pool_candidate[accepted]])
+        held_option = np.concatenate([held_option[~contested], pool_option[accepted]])
+        rejected = pool_candidate[~accepted]
+        next_choice[rejected] += 1
+        active = rejected[next_choice[rejected] < end[rejected]]
+
+    assigned = np.full(n, -1, dtype=np.int32)
+    assigned[held_candidate] = held_option
+    choice_number = np.zeros(n, dtype=np.int32)
+    choice_number[held_candidate] = next_choice[held_candidate] - offsets[held_candidate] + 1
+    return assigned, choice_number, rounds
+
+
+def _nullable(values, present):
+    """Int64 array that is missing wherever present is False"""
+    return pd.arrays.IntegerArray(np.where(present, values, 0).astype(np.int64), ~present)
+
+
+def allocation_summary(matrix, candidates, assigned, uses_category_rank):
+    """Seat matrix with seats filled and the simulated opening and closing rank of every option"""
+    placed = np.flatnonzero(assigned >= 0)
+    option = assigned[placed]
+    score = np.where(uses_category_rank[option], candidates.category_rank[placed], candidates.crl[placed])
+    n_options = len(matrix)
+    result = matrix.copy()
+    result["Filled"] = np.bincount(option, minlength=n_options)
+    opening = np.full(n_options, np.iinfo(np.int64).max)
+    closing = np.zeros(n_options, dtype=np.int64)
+    np.minimum.at(opening, option, score)
+    np.maximum.at(closing, option, score)
+    filled = result["Filled"].to_numpy() > 0
+    result["Simulated Opening Rank"] = _nullable(opening, filled)
+    result["Simulated Closing Rank"] = _nullable(closing, filled)
+    return result
+
+
+def run_simulation(matrix, candidates):
+    """
+    Allocate seats and report the outcome
+
+    Returns:
+        dict: assigned, choice_number, rounds, options (allocation_summary) and seconds
+    """
+    capacity = matrix["Seats"].to_numpy(dtype=np.int64)
+    uses_category_rank = (matrix["Seat Type"].astype(str) != OPEN_SEAT_TYPE).to_numpy()
+    start = time.perf_counter()
+    assigned, choice_number, rounds = deferred_acceptance(candidates, capacity, uses_category_rank)
+    seconds = time.perf_counter() - start
+    return {
+        "assigned": assigned,
+        "choice_number": choice_number,
+        "rounds": rounds,
+        "seconds": seconds,
+        "options": allocation_summary(matrix, candidates, assigned, uses_category_rank),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate JoSAA-style deferred-acceptance seat allocation")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES, help="Synthetic candidates to generate")
+    parser.add_argument("--list-mean", type=float, default=20, help="Average synthetic preference list length")
+    parser.add_argument("--from-shortlists", action="store_true", help="Use saved shortlists instead of synthetic lists")
+    parser.add_argument("--ranks", default=None, help="CSV of user_id or username and rank for --from-shortlists")
+    parser.add_argument("--year", type=int, default=None, help="Seat matrix year (default: latest)")
+    parser.add_argument("--seats", type=int, default=DEFAULT_SEATS_PER_OPTION, help="Seats per option")
+    parser.add_argument("--seat-matrix", default=None, help="CSV of option_id and Seats overriding --seats")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write per-option results to this CSV")
+    parser.add_argument("--allocations", default=None, help="Write per-candidate allocations to this CSV")
+    args = parser.parse_args(argv)
+
+    timings = {}
+    start = time.perf_counter()
+    conn = get_seat_connection()
+    try:
+        matrix = seat_matrix(conn, args.year, args.seats, args.seat_matrix)
+    finally:
+        conn.close()
+    timings["seat matrix"] = time.perf_counter() - start
+    if len(matrix) == 0:
+        print("❌ No cutoffs found for the requested year")
+        return 1
+
+    start = time.perf_counter()
+    if args.from_shortlists:
+        conn = get_connection()
+        try:
+            candidates = shortlist_candidates(conn, matrix, args.ranks)
+        finally:
+            conn.close()
+    else:
+        candidates = generate_candidates(matrix, args.candidates, args.list_mean, seed=args.seed)
+    timings["preferences"] = time.perf_counter() - start
+    print(f"📚 {len(matrix):,} options with {int(matrix['Seats'].sum()):,} seats; "
+          f"{len(candidates):,} candidates listing {len(candidates.choices):,} choices "
+          f"({candidates.nbytes / 1e6:.0f} MB)")
+
+    result = run_simulation(matrix, candidates)
+    timings["allocation"] = result["seconds"]
+    placed = result["assigned"] >= 0
+    options = result["options"]
+    print(f"✅ {int(placed.sum()):,} candidates placed, {int((options['Filled'] < options['Seats']).sum()):,} options "
+          f"with vacant seats after {result['rounds']} rounds")
+    if placed.any():
+        print(f"   Median choice number of placed candidates: {np.median(result['choice_number'][placed]):.0f}")
+
+    start = time.perf_counter()
+    if args.output:
+        options.to_csv(args.output, index=False)
+    if args.allocations:
+        labels = candidates.labels if candidates.labels is not None else np.arange(1, len(candidates) + 1)
+        assigned = result["assigned"]
+        pd.DataFrame({
+            "candidate": labels,
+            "crl": candidates.crl,
+            "category_rank": candidates.category_rank,
+            "option_id": _nullable(matrix["option_id"].to_numpy()[assigned], placed),
+            "choice_number": _nullable(result["choice_number"], placed),
+        }).to_csv(args.allocations, index=False)
+    timings["output"] = time.perf_counter() - start
+
+    print("⏱️ " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in timings.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
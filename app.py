@@ -1,10 +1,21 @@
+import time
 import streamlit as st
 import pandas as pd
 from streamlit_javascript import st_javascript
 from hashlib import sha256
 from auth import initialize_session, login_page, logout
-from shortlist import add_to_shortlist, shortlist_page
-from database import setup_user_tables, get_jee_data, get_connection
+from shortlist import add_to_shortlist, add_matching_to_shortlist, shortlist_page, pdf_download_widget
+from database import setup_user_tables, get_jee_data, QUERY_REGISTRY
+from seat_cache import seat_data_cache
+from search import get_college_options, get_program_options, apply_filters, expand_program_group, format_dataframe_for_display, public_seat_columns, get_prefix_index, PROGRAM_TAGS, FACET_PICKER_LIMIT
+from seat_upload import validate_seat_upload, bulk_upsert_seats, seat_upload_section
+from predictor import predict_chances, OUTLOOKS
+from topk import top_k_options, get_rank_index, register_with_cache, DEFAULT_K, DEFAULT_WEIGHTS
+from rank_curves import get_rank_curves, curve_grid, CURVE_DIMENSIONS
+from name_search import get_name_index
+from metrics import span, start_metrics_exporter, get_latency_summary, get_statement_stats, normalize_sql, reset_metrics
+from memprofile import profile_page, cache_intermediate, get_memory_report, MEMPROFILE_ENABLED, SESSION_MEMORY_CAP
+from maintenance import start_maintenance_scheduler, run_maintenance, get_last_maintenance_report, MAINTENANCE_INTERVAL
 
 st.set_page_config(
     page_title="JEE Seat Finder",
@@ -25,86 +36,146 @@ def load_css(file_name):
 # Load CSS at the start of your app
 load_css('styles.css')
 
+# Closing rank per year from the materialized trend table (last round of each year)
+TREND_COLUMN = st.column_config.LineChartColumn("Trend", help="Closing rank by year (last round of each year)")
+
 # Initialize database and session
 setup_user_tables()
 initialize_session()
+start_metrics_exporter()
+start_maintenance_scheduler()
+register_with_cache(seat_data_cache)
+
+NAME_KIND_ICONS = {"Institute": "🏢", "Program": "🎯", "Location": "📍"}
+
+def quick_find_widgets(df):
+    """Search box over institute, location and program names; picked matches pre-fill the filters"""
+    query = st.text_input("🔎 Quick Find", placeholder="e.g. IITB CSE, trichy, mechnical", key="name_query")
+    if not query.strip():
+        return [], []
+    name_index = get_name_index(df)
+    with span("search.name_search"):
+        matches = name_index.search(query)
+    if len(matches) == 0:
+        st.caption("No institute, location or program matches that")
+        return [], []
+    labels = [f"{NAME_KIND_ICONS[kind]} {name}" for kind, name in zip(matches["Kind"], matches["Name"])]
+    # The best-scoring matches of each kind are picked to begin with
+    best = matches.groupby("Kind")["Score"].transform("max")
+    default = [label for label, top in zip(labels, matches["Score"] == best) if top]
+    picked = st.multiselect("Matches", labels, default=default)
+    return name_index.selections(matches[[label in picked for label in labels]])
+
+def facet_picker(label, options, key, default=(), placeholder=None):
+    """
+    Search-as-you-type multiselect over a long list of facet values
+
+    Only the selected values and the first FACET_PICKER_LIMIT matches of the
+    typed prefix are sent to the browser. Selections live in session state
+    under key, so they stay pinned while the search text changes.
+    """
+    selected_key, default_key = f"{key}_selected", f"{key}_default"
+    # A new default (e.g. from Quick Find) replaces the current selection
+    if st.session_state.get(default_key) != list(default):
+        st.session_state[default_key] = list(default)
+        st.session_state[selected_key] = list(default)
+    available = set(options)
+    selected = [value for value in st.session_state.get(selected_key, []) if value in available]
+    
+    prefix = st.text_input(f"Search {label}", key=f"{key}_prefix", placeholder=placeholder,
+                           label_visibility="collapsed")
+    matches = get_prefix_index(options).match(prefix)
+    shown = selected + [value for value in matches if value not in selected]
+    # No widget key: a new option list remounts the widget with the pinned selection as its value
+    picked = st.multiselect(label, shown, default=selected)
+    if len(matches) == FACET_PICKER_LIMIT and len(options) > FACET_PICKER_LIMIT:
+        st.caption(f"Showing the first {FACET_PICKER_LIMIT} matches of {len(options):,} · type to narrow")
+    st.session_state[selected_key] = picked
+    return picked
 
 def filter_widgets():
     """Reusable filter widgets function"""
     df = get_jee_data()
     
-    college_types = sorted(df["Type"].dropna().unique())
+    found_colleges, found_programs = quick_find_widgets(df)
+    
+    college_types = seat_data_cache.get_facet_options("Type")
     selected_types = st.multiselect("🏫 College Type", college_types, default=college_types)
     
-    filtered_df_for_colleges = df[df["Type"].isin(selected_types)]
-    college_names = sorted(filtered_df_for_colleges["Institute"].dropna().unique())
-    college_names_with_all = ["All"] + college_names
-    selected_colleges = st.multiselect("🏢 College Name", college_names_with_all, default=["All"])
+    # No college picked means all colleges
+    college_names = get_college_options(df, selected_types)
+    selected_colleges = facet_picker("🏢 College Name", college_names, "college_picker",
+                                     default=found_colleges, placeholder="Type to find a college (all by default)")
     
-    if "All" in selected_colleges or not selected_colleges:
-        filtered_df_for_programs = filtered_df_for_colleges
+    filtered_df_for_programs, all_programs = get_program_options(df, selected_types, selected_colleges)
+    if not selected_colleges:
         selected_colleges = college_names
-    else:
-        filtered_df_for_programs = filtered_df_for_colleges[filtered_df_for_colleges["Institute"].isin(selected_colleges)]
-    
-    all_programs = sorted(filtered_df_for_programs["Academic Program Name"].dropna().unique().tolist())
-    program_group = st.multiselect("🎯 Program(s)", ["Computers", "Electronics"] + all_programs)
+    program_group = facet_picker("🎯 Program(s)", list(PROGRAM_TAGS) + all_programs, "program_picker",
+                                 default=found_programs, placeholder="Type to find a program or branch group")
     
     min_rank = st.number_input("Minimum Closing Rank", min_value=0, max_value=1000000, value=0, step=1000, format="%d")
     max_rank = st.number_input("Maximum Closing Rank", min_value=0, max_value=1000000, value=1000000, step=1000, format="%d")
     
-    gender = st.multiselect("⚧️ Gender", options=sorted(df["Gender"].dropna().unique()), default="Gender-Neutral")
-    quota = st.multiselect("🎟️ Quota", options=sorted(df["Quota"].dropna().unique()),default="AI")
-    seat_type = st.multiselect("💺 Seat Type", options=sorted(df["Seat Type"].dropna().unique()), default=["OPEN"])
+    gender = st.multiselect("⚧️ Gender", options=seat_data_cache.get_facet_options("Gender"), default="Gender-Neutral")
+    quota = st.multiselect("🎟️ Quota", options=seat_data_cache.get_facet_options("Quota"),default="AI")
+    seat_type = st.multiselect("💺 Seat Type", options=seat_data_cache.get_facet_options("Seat Type"), default=["OPEN"])
     
     rank_range = (min_rank, max_rank)
     return selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs
 
-def apply_filters(df, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs):
-    """Apply all filters to the dataframe"""
-    filtered_df = df[df["Type"].isin(selected_types)]
-    if selected_colleges and "All" not in selected_colleges:
-        filtered_df = filtered_df[filtered_df["Institute"].isin(selected_colleges)]
-    filtered_df = filtered_df[
-        (filtered_df["Closing Rank"] >= rank_range[0]) &
-        (filtered_df["Closing Rank"] <= rank_range[1])
-    ]
-    
-    if gender:
-        filtered_df = filtered_df[filtered_df["Gender"].isin(gender)]
-    if seat_type:
-        filtered_df = filtered_df[filtered_df["Seat Type"].isin(seat_type)]
-    if quota:
-        filtered_df = filtered_df[filtered_df["Quota"].isin(quota)]
-    
-    # Program filtering logic
-    selected_programs = []
-    if "Computers" in program_group:
-        selected_programs += filtered_df_for_programs[
-            filtered_df_for_programs["Academic Program Name"].str.contains(
-                "Computer|Data|AI|Artificial|Intelligence", case=False, na=False
-            )
-        ]["Academic Program Name"].unique().tolist()
-    if "Electronics" in program_group:
-        selected_programs += filtered_df_for_programs[
-            filtered_df_for_programs["Academic Program Name"].str.contains(
-                "Electronics", case=False, na=False
-            )
-        ]["Academic Program Name"].unique().tolist()
-    selected_programs += [pg for pg in program_group if pg not in ["Computers", "Electronics"]]
-    if selected_programs:
-        filtered_df = filtered_df[filtered_df["Academic Program Name"].isin(selected_programs)]
-    
-    return filtered_df.sort_values(by="Closing Rank")
+def top_k_widgets():
+    """Rank and preference inputs for the top-K mode, or None when showing every match"""
+    mode = st.radio("Show", ["All matches", "🏆 Best options for my rank"], horizontal=True, key="search_mode")
+    if mode == "All matches":
+        return None
+    col1, col2 = st.columns(2)
+    with col1:
+        rank = st.number_input("🏅 Your Rank", min_value=1, max_value=1000000, value=10000, step=500, format="%d", key="topk_rank")
+        k = st.slider("Number of options", min_value=10, max_value=200, value=DEFAULT_K, step=10, key="topk_k")
+    with col2:
+        branches = st.multiselect("🎯 Preferred Branches", list(PROGRAM_TAGS), key="topk_branches")
+        locations = st.multiselect("📍 Preferred Locations", seat_data_cache.get_facet_options("Location"), key="topk_locations")
+    with st.expander("⚖️ Scoring Weights"):
+        weights = {
+            name: st.slider(name.title(), min_value=0.0, max_value=2.0, value=float(value), step=0.1, key=f"topk_weight_{name}")
+            for name, value in DEFAULT_WEIGHTS.items()
+        }
+    st.caption("Options closing at or above your rank, scored by how close they close to it plus the preferences above. "
+               "The rank range filters are not used in this mode.")
+    return rank, k, tuple(branches), tuple(locations), tuple(weights.items())
+
+def search_results(df, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs, top_k):
+    """Every filtered row, or the K best options for the rank when the top-K mode is on"""
+    if top_k is None:
+        return apply_filters(
+            df, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs
+        )
+    rank, k, branches, locations, weights = top_k
+    colleges = selected_colleges if selected_colleges and "All" not in selected_colleges else None
+    with span("search.top_k"):
+        return top_k_options(
+            df, rank, k, seat_type, quota, gender, selected_types, colleges,
+            expand_program_group(program_group, filtered_df_for_programs),
+            list(branches), list(locations), dict(weights), index=get_rank_index(df)
+        )
 
-def format_dataframe_for_display(df):
-    """Format dataframe with commas in ranks"""
-    display_df = df.copy()
-    if "Closing Rank" in display_df.columns:
-        display_df["Closing Rank"] = display_df["Closing Rank"].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "")
-    if "Opening Rank" in display_df.columns:
-        display_df["Opening Rank"] = display_df["Opening Rank"].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "")
-    return display_df
+def rank_curve_chart(df, rank_range):
+    """Options still open across the min/max closing-rank inputs, per group"""
+    st.markdown("#### 📈 Options Open by Rank")
+    dimension = st.selectbox("Group by", list(CURVE_DIMENSIONS), key="curve_dimension")
+    with span("search.rank_curves"):
+        curves = get_rank_curves(df)
+        open_counts = curves.open_at(dimension, curve_grid(rank_range))
+        between = curves.closing_between(dimension, *rank_range)
+    st.line_chart(open_counts, x_label="Rank", y_label="Options with closing rank ≥ rank", height=320)
+    st.caption(
+        f"{int(between.sum()):,} options close between {rank_range[0]:,} and {rank_range[1]:,}: "
+        + ", ".join(f"{label} {count:,}" for label, count in between.items() if count)
+    )
+
+def filter_cache_key(*filters):
+    """Hashable key for a set of filter selections at the current seat data version"""
+    return (seat_data_cache.version,) + tuple(tuple(f) if isinstance(f, list) else f for f in filters)
 
 def guest_search_page():
     """Search functionality for guest users (without shortlisting)"""
@@ -140,24 +211,37 @@ def guest_search_page():
     """, unsafe_allow_html=True)
     
     # Device detection for responsive layout
-    width = st_javascript("window.innerWidth")
+    with span("search.st_javascript"):
+        width = st_javascript("window.innerWidth")
     is_mobile = width is not None and width < 768
     
     # Get data and apply filters
-    df = get_jee_data()
+    with span("search.get_jee_data"):
+        df = get_jee_data()
     
     # Responsive filter placement
-    if is_mobile:
-        st.markdown("### 🔍 Filters")
-        selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs = filter_widgets()
-    else:
-        with st.sidebar:
-            st.header("🔍 Filters")
+    with span("search.filter_widgets"):
+        if is_mobile:
+            st.markdown("### 🔍 Filters")
             selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs = filter_widgets()
+        else:
+            with st.sidebar:
+                st.header("🔍 Filters")
+                selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs = filter_widgets()
+    
+    top_k = top_k_widgets()
     
     # Apply filters and format
-    filtered_df = apply_filters(df, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs)
-    display_df = format_dataframe_for_display(filtered_df)
+    # Reruns that leave the filters unchanged reuse this session's previous results
+    filter_key = filter_cache_key(selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, top_k)
+    with span("search.apply_filters"):
+        filtered_df = cache_intermediate("guest_results", filter_key, lambda: search_results(
+            df, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs, top_k
+        ))
+    with span("search.format"):
+        display_df = cache_intermediate("guest_display", filter_key, lambda: format_dataframe_for_display(
+            filtered_df, seat_data_cache.get_trends()
+        ))
     
     # Display results
     st.subheader("🎯 Matching Programs")
@@ -171,17 +255,29 @@ def guest_search_page():
     
     st.write(f"Found **{len(filtered_df)}** matching programs:")
     st.info("💡 **Login to save your favorite options to a personal shortlist!**")
-    st.dataframe(display_with_action, use_container_width=True, height=400)
+    table_col, chart_col = (st.container(), st.container()) if is_mobile else st.columns([3, 2])
+    with table_col, span("search.render_table"):
+        st.dataframe(display_with_action, use_container_width=True, height=400, column_config={"Trend": TREND_COLUMN})
+    with chart_col:
+        rank_curve_chart(df, rank_range)
     
     # Download and feedback sections
-    csv = filtered_df.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="📥 Download Search Results as CSV",
-        data=csv,
-        file_name="jee_search_results.csv",
-        mime="text/csv",
-        help="Download your filtered search results."
-    )
+    with span("search.export"):
+        csv = public_seat_columns(filtered_df).to_csv(index=False).encode("utf-8")
+        st.download_button(
+            label="📥 Download Search Results as CSV",
+            data=csv,
+            file_name="jee_search_results.csv",
+            mime="text/csv",
+            help="Download your filtered search results."
+        )
+        pdf_download_widget(
+            "results",
+            filtered_df,
+            ("JEE Cutoff Report",),
+            label="📄 Download Search Results as PDF",
+            file_name="jee_search_results.pdf"
+        )
     
     # Feedback Section
     st.markdown("---")
@@ -214,27 +310,38 @@ def logged_in_search_page():
     """, unsafe_allow_html=True)
     
     # Device detection for responsive layout
-    width = st_javascript("window.innerWidth")
+    with span("search.st_javascript"):
+        width = st_javascript("window.innerWidth")
     is_mobile = width is not None and width < 768
     
     # Get data and apply filters
-    df = get_jee_data()
+    with span("search.get_jee_data"):
+        df = get_jee_data()
     
     # Responsive filter placement
-    if is_mobile:
-        st.markdown("### 🔍 Filters")
-        selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs = filter_widgets()
-    else:
-        with st.sidebar:
-            st.header("🔍 Filters")
+    with span("search.filter_widgets"):
+        if is_mobile:
+            st.markdown("### 🔍 Filters")
             selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs = filter_widgets()
+        else:
+            with st.sidebar:
+                st.header("🔍 Filters")
+                selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs = filter_widgets()
     
-    # Apply filters and format
-    filtered_df = apply_filters(df, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs)
+    top_k = top_k_widgets()
     
-    # Reset index to ensure proper indexing for selection
-    filtered_df = filtered_df.reset_index(drop=True)
-    display_df = format_dataframe_for_display(filtered_df)
+    # Apply filters and format
+    # Reruns that leave the filters unchanged (selections, checkboxes) reuse this session's previous results
+    filter_key = filter_cache_key(selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, top_k)
+    with span("search.apply_filters"):
+        # Reset index to ensure proper indexing for selection
+        filtered_df = cache_intermediate("search_results", filter_key, lambda: search_results(
+            df, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs, top_k
+        ).reset_index(drop=True))
+    with span("search.format"):
+        display_df = cache_intermediate("search_display", filter_key, lambda: format_dataframe_for_display(
+            filtered_df, seat_data_cache.get_trends()
+        ))
     
     # Display results
     st.subheader("🎯 Matching Programs")
@@ -259,11 +366,27 @@ def logged_in_search_page():
     col1, col2, col3 = st.columns([2, 2, 3])
     with col1:
         current_selection_count = len(st.session_state.selected_items)
-        select_all = st.checkbox("Select All", key=f"select_all_{current_selection_count}")
-        if select_all:
-            st.session_state.selected_items = set(range(len(filtered_df)))
-        elif not select_all and len(st.session_state.selected_items) == len(filtered_df):
-            st.session_state.selected_items = set()
+        if top_k is None:
+            # The database applies the filters itself; no rows go through the session or the loop below
+            if st.button("⭐ Shortlist All Matching Options",
+                         help="Add every option matching the current filters (options already saved are skipped)"):
+                try:
+                    added = add_matching_to_shortlist(
+                        st.session_state.user_id, selected_types, selected_colleges, program_group,
+                        rank_range, gender, quota, seat_type
+                    )
+                    if added:
+                        st.success(f"✅ Added {added} options to shortlist!")
+                    else:
+                        st.info("All matching options are already in your shortlist.")
+                except Exception as e:
+                    st.error(f"Error adding matching options: {e}")
+        else:
+            select_all = st.checkbox("Select All", key=f"select_all_{current_selection_count}")
+            if select_all:
+                st.session_state.selected_items = set(range(len(filtered_df)))
+            elif not select_all and len(st.session_state.selected_items) == len(filtered_df):
+                st.session_state.selected_items = set()
     
     with col2:
         st.write(f"**Selected: {len(st.session_state.selected_items)}**")
@@ -289,7 +412,8 @@ def logged_in_search_page():
                             row['Closing Rank'],
                             row['Seat Type'],
                             row['Quota'],
-                            row['Gender']
+                            row['Gender'],
+                            option_id=row['option_id']
                         )
                         if success:
                             success_count += 1
@@ -320,50 +444,55 @@ def logged_in_search_page():
     enhanced_df = display_df.copy()
     enhanced_df.insert(0, 'Select', False)
     
-    # Display the main results table with checkboxes
-    edited_df = st.data_editor(
-        enhanced_df,
-        column_config={
-            "Select": st.column_config.CheckboxColumn(
-                "Select",
-                help="Select rows to add to shortlist",
-                default=False,
-            ),
-            "Institute": st.column_config.TextColumn(
-                "Institute",
-                width="medium",
-            ),
-            "Academic Program Name": st.column_config.TextColumn(
-                "Program",
-                width="large",
-            ),
-            "Closing Rank": st.column_config.TextColumn(
-                "Closing Rank",
-                width="small",
-            ),
-            "Opening Rank": st.column_config.TextColumn(
-                "Opening Rank",
-                width="small",
-            ),
-            "Seat Type": st.column_config.TextColumn(
-                "Seat Type",
-                width="small",
-            ),
-            "Quota": st.column_config.TextColumn(
-                "Quota",
-                width="small",
-            ),
-            "Gender": st.column_config.TextColumn(
-                "Gender",
-                width="medium",
-            ),
-        },
-        disabled=["Institute", "Academic Program Name", "Type", "Closing Rank", "Opening Rank", "Seat Type", "Quota", "Gender", "Year"],
-        hide_index=True,
-        use_container_width=True,
-        height=400,
-        key="results_table"
-    )
+    # Display the main results table with checkboxes, with the rank curves beside it
+    table_col, chart_col = (st.container(), st.container()) if is_mobile else st.columns([3, 2])
+    with chart_col:
+        rank_curve_chart(df, rank_range)
+    with table_col, span("search.render_table"):
+        edited_df = st.data_editor(
+            enhanced_df,
+            column_config={
+                "Select": st.column_config.CheckboxColumn(
+                    "Select",
+                    help="Select rows to add to shortlist",
+                    default=False,
+                ),
+                "Institute": st.column_config.TextColumn(
+                    "Institute",
+                    width="medium",
+                ),
+                "Academic Program Name": st.column_config.TextColumn(
+                    "Program",
+                    width="large",
+                ),
+                "Closing Rank": st.column_config.TextColumn(
+                    "Closing Rank",
+                    width="small",
+                ),
+                "Trend": TREND_COLUMN,
+                "Opening Rank": st.column_config.TextColumn(
+                    "Opening Rank",
+                    width="small",
+                ),
+                "Seat Type": st.column_config.TextColumn(
+                    "Seat Type",
+                    width="small",
+                ),
+                "Quota": st.column_config.TextColumn(
+                    "Quota",
+                    width="small",
+                ),
+                "Gender": st.column_config.TextColumn(
+                    "Gender",
+                    width="medium",
+                ),
+            },
+            disabled=["Score", "Institute", "Academic Program Name", "Type", "Closing Rank", "Trend", "Closing Δ", "Opening Rank", "Seat Type", "Quota", "Gender", "Year"],
+            hide_index=True,
+            use_container_width=True,
+            height=400,
+            key="results_table"
+        )
     
     # Update selected items based on table selections
     if edited_df is not None:
@@ -372,14 +501,22 @@ def logged_in_search_page():
         
     # Download search results as CSV
     st.markdown("---")
-    csv = filtered_df.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="📥 Download Search Results as CSV",
-        data=csv,
-        file_name="jee_search_results.csv",
-        mime="text/csv",
-        help="Download your filtered search results."
-    )
+    with span("search.export"):
+        csv = public_seat_columns(filtered_df).to_csv(index=False).encode("utf-8")
+        st.download_button(
+            label="📥 Download Search Results as CSV",
+            data=csv,
+            file_name="jee_search_results.csv",
+            mime="text/csv",
+            help="Download your filtered search results."
+        )
+        pdf_download_widget(
+            "results",
+            filtered_df,
+            ("JEE Cutoff Report",),
+            label="📄 Download Search Results as PDF",
+            file_name="jee_search_results.pdf"
+        )
     
     # Feedback Section
     st.markdown("---")
@@ -403,52 +540,180 @@ def logged_in_search_page():
 def admin_page():
     """Admin panel for adding new seat records"""
     st.subheader("🔒 Admin Panel")
-    username = st.text_input("Username")
-    password = st.text_input("Password", type="password")
     
     # SHA-256 hash for password
     ADMIN_HASH = "c7282ea501f7b9491be0a7e2409293f4ee823d9f7247d986695a975f894259ce"
     
-    if st.button("Login"):
-        if username == "admin" and sha256(password.encode('utf-8')).hexdigest() == ADMIN_HASH:
-            st.success("Logged in successfully!")
-            st.markdown("---")
-            st.subheader("➕ Add New Seat Record")
-            
-            df = get_jee_data()
-            existing_institutes = sorted(df["Institute"].dropna().unique())
-            existing_locations = sorted(df["Location"].dropna().unique()) if "Location" in df.columns else []
-            existing_programs = sorted(df["Academic Program Name"].dropna().unique())
-            
-            with st.form("data_entry_form"):
-                institute = st.selectbox("Institute", options=[""] + existing_institutes)
-                location = st.selectbox("Location", options=[""] + existing_locations) if existing_locations else st.text_input("Location")
-                inst_type = st.selectbox("Type", ["IIT", "NIT", "IIIT", "GFTI"])
-                program = st.selectbox("Academic Program Name", options=[""] + existing_programs)
-                quota = st.selectbox("Quota", ["AI", "HS", "OS"])
-                seat_type = st.text_input("Seat Type")
-                gender = st.selectbox("Gender", ["Gender-Neutral", "Female-only (including Supernumerary)"])
-                opening = st.number_input("Opening Rank", min_value=0, step=1)
-                closing = st.number_input("Closing Rank", min_value=0, step=1)
-                year = st.selectbox("Year", [2021, 2022, 2023, 2024, 2025])
-                
-                submitted = st.form_submit_button("Add Record")
-                if submitted:
-                    conn = get_connection()
-                    cursor = conn.cursor()
-                    try:
-                        cursor.execute("""
-                            INSERT INTO jee_seats (Institute, Location, Type, `Academic Program Name`, Quota, `Seat Type`, Gender, `Opening Rank`, `Closing Rank`, Year)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (institute, location, inst_type, program, quota, seat_type, gender, opening, closing, year))
-                        conn.commit()
-                        st.success("✅ Record added successfully!")
-                    except Exception as e:
-                        st.error(f"Error adding record: {e}")
-                    finally:
-                        conn.close()
+    if not st.session_state.get('admin_authenticated'):
+        username = st.text_input("Username")
+        password = st.text_input("Password", type="password")
+        if st.button("Login"):
+            if username == "admin" and sha256(password.encode('utf-8')).hexdigest() == ADMIN_HASH:
+                # Keep the admin unlocked across reruns so forms and uploads can submit
+                st.session_state.admin_authenticated = True
+                st.rerun()
+            else:
+                st.error("Invalid credentials.")
+        return
+    
+    st.success("Logged in successfully!")
+    st.markdown("---")
+    st.subheader("➕ Add New Seat Record")
+    
+    df = get_jee_data()
+    existing_institutes = seat_data_cache.get_facet_options("Institute")
+    existing_locations = sorted(df["Location"].dropna().unique()) if "Location" in df.columns else []
+    existing_programs = seat_data_cache.get_facet_options("Academic Program Name")
+    
+    with st.form("data_entry_form"):
+        institute = st.selectbox("Institute", options=[""] + existing_institutes)
+        location = st.selectbox("Location", options=[""] + existing_locations) if existing_locations else st.text_input("Location")
+        inst_type = st.selectbox("Type", ["IIT", "NIT", "IIIT", "GFTI"])
+        program = st.selectbox("Academic Program Name", options=[""] + existing_programs)
+        quota = st.selectbox("Quota", ["AI", "HS", "OS"])
+        seat_type = st.text_input("Seat Type")
+        gender = st.selectbox("Gender", ["Gender-Neutral", "Female-only (including Supernumerary)"])
+        opening = st.number_input("Opening Rank", min_value=0, step=1)
+        closing = st.number_input("Closing Rank", min_value=0, step=1)
+        year = st.selectbox("Year", [2021, 2022, 2023, 2024, 2025])
+        
+        submitted = st.form_submit_button("Add Record")
+        if submitted:
+            record = pd.DataFrame([{
+                'Institute': institute, 'Location': location, 'Type': inst_type,
+                'Academic Program Name': program, 'Quota': quota, 'Seat Type': seat_type,
+                'Gender': gender, 'Opening Rank': opening, 'Closing Rank': closing, 'Year': year
+            }])
+            valid_df, rejected_df = validate_seat_upload(record)
+            if len(rejected_df) > 0:
+                st.error(f"Error adding record: {rejected_df['Reason'].iloc[0]}")
+            else:
+                try:
+                    bulk_upsert_seats(valid_df)
+                    st.success("✅ Record added successfully!")
+                except Exception as e:
+                    st.error(f"Error adding record: {e}")
+    
+    st.markdown("---")
+    seat_upload_section()
+    
+    st.markdown("---")
+    with st.expander("📈 Performance (last 10 minutes)"):
+        stage_summary = pd.DataFrame(get_latency_summary())
+        sql_summary = pd.DataFrame(get_latency_summary("jee_sql_duration_seconds"))
+        if len(stage_summary) == 0 and len(sql_summary) == 0:
+            st.info("No timings recorded yet.")
         else:
-            st.error("Invalid credentials.")
+            st.caption("Latency per stage in milliseconds")
+            st.dataframe(stage_summary.round(1), use_container_width=True, hide_index=True)
+            st.caption("Latency per SQL statement in milliseconds")
+            st.dataframe(sql_summary.round(2), use_container_width=True, hide_index=True)
+        statements = pd.DataFrame(get_statement_stats())
+        if len(statements) > 0:
+            # Registered statements (see querycheck.py) are shown by name
+            names = {normalize_sql(entry["sql"]): name for name, entry in QUERY_REGISTRY.items()}
+            statements.insert(0, "name", statements["sql"].map(names).fillna(""))
+            st.caption("Every distinct statement since start, by total time (milliseconds)")
+            st.dataframe(statements.round(2), use_container_width=True, hide_index=True)
+        if st.button("🧹 Reset Timings"):
+            reset_metrics()
+            st.rerun()
+    
+    with st.expander("🧠 Memory"):
+        if not MEMPROFILE_ENABLED:
+            st.info("Start the app with JEE_MEMPROFILE=1 to record allocations per page render.")
+        report = get_memory_report()
+        process = report["process"]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Max RSS", f"{process['max_rss'] / 1e6:.0f} MB")
+        col2.metric("Peak traced", f"{process['traced_peak'] / 1e6:.0f} MB")
+        col3.metric("Largest render peak", f"{process['max_render_peak'] / 1e6:.1f} MB")
+        col4.metric("Session state (all)", f"{process['session_state_total'] / 1e6:.1f} MB")
+        if SESSION_MEMORY_CAP:
+            st.caption(f"Per-session cap: {SESSION_MEMORY_CAP / 1e6:.0f} MB (cached results are evicted first)")
+        if report["sessions"]:
+            sessions_df = pd.DataFrame(report["sessions"])
+            for col in ["state_bytes", "last_render_peak", "max_render_peak", "last_retained"]:
+                sessions_df[col] = (sessions_df[col] / 1e6).round(2)
+            st.caption("Per session, in MB")
+            st.dataframe(sessions_df, use_container_width=True, hide_index=True)
+        if report["top_sites"]:
+            st.caption("Largest allocation changes in the latest render")
+            st.dataframe(
+                pd.DataFrame(report["top_sites"], columns=["Site", "Change (bytes)", "Size (bytes)"]),
+                use_container_width=True, hide_index=True
+            )
+    
+    with st.expander("🧹 Database Maintenance"):
+        if MAINTENANCE_INTERVAL:
+            st.caption(f"Runs every {MAINTENANCE_INTERVAL / 3600:.1f} h once writes have been quiet for a while.")
+        else:
+            st.caption("Set JEE_MAINTENANCE_INTERVAL (seconds) to run this in the background.")
+        if st.button("🧹 Run Maintenance Now"):
+            with st.spinner("Analyzing, checkpointing and vacuuming..."):
+                run_maintenance()
+        report = get_last_maintenance_report()
+        if report["steps"]:
+            steps_df = pd.DataFrame(report["steps"])
+            steps_df["ms"] = (steps_df.pop("seconds") * 1000).round(0)
+            for col in ["db_bytes_before", "db_bytes_after", "wal_bytes_before", "wal_bytes_after"]:
+                steps_df[col.replace("bytes", "mb")] = (steps_df.pop(col) / 1e6).round(2)
+            st.caption(f"Last run finished {pd.Timestamp(report['finished_at'], unit='s'):%Y-%m-%d %H:%M:%S} UTC")
+            st.dataframe(steps_df, use_container_width=True, hide_index=True)
+    
+    if st.button("🔒 Lock Admin Panel"):
+        st.session_state.admin_authenticated = False
+        st.rerun()
+
+def predictor_page():
+    """Safe / moderate / reach outlook for every option at the candidate's rank"""
+    st.subheader("🔮 Predict My Chances")
+    st.caption(
+        "Each option's chance is the share of its past cutoffs (all years and rounds, recent years weighted higher) "
+        "that closed at or above your rank. Use your CRL for OPEN seats and your category rank otherwise."
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        rank = st.number_input("🏅 Your Rank", min_value=1, max_value=1000000, value=10000, step=500, format="%d", key="predict_rank")
+        seat_type = st.multiselect("💺 Seat Type", options=seat_data_cache.get_facet_options("Seat Type"), default=["OPEN"], key="predict_seat_type")
+        types = st.multiselect("🏫 College Type", seat_data_cache.get_facet_options("Type"), key="predict_types", help="Leave empty for all")
+    with col2:
+        quota = st.multiselect("🎟️ Quota", options=seat_data_cache.get_facet_options("Quota"), default=["AI"], key="predict_quota")
+        gender = st.multiselect("⚧️ Gender", options=seat_data_cache.get_facet_options("Gender"), default=["Gender-Neutral"], key="predict_gender")
+
+    with span("predictor.get_jee_data"):
+        df = get_jee_data()
+    with span("predictor.predict"):
+        start = time.perf_counter()
+        predictions = predict_chances(df, rank, seat_type, quota, gender, types)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if len(predictions) == 0:
+        st.warning("No options found within reach of this rank. Try adjusting your selections.")
+        return
+
+    counts = predictions['Outlook'].value_counts()
+    for col, outlook in zip(st.columns(len(OUTLOOKS)), OUTLOOKS):
+        col.metric(outlook, int(counts.get(outlook, 0)))
+    st.caption(f"Scored {len(predictions)} options from {len(df):,} cutoffs in {elapsed_ms:.0f} ms")
+
+    st.dataframe(
+        predictions,
+        use_container_width=True,
+        height=500,
+        hide_index=True,
+        column_config={
+            "Chance": st.column_config.ProgressColumn("Chance", format="percent", min_value=0, max_value=1),
+        },
+    )
+    st.download_button(
+        label="📥 Download Predictions as CSV",
+        data=predictions.to_csv(index=False).encode("utf-8"),
+        file_name="jee_predictions.csv",
+        mime="text/csv",
+        key="predict_download"
+    )
 
 def main_app():
     """Main application after login with attractive navigation"""
@@ -465,20 +730,24 @@ def main_app():
     
     # Create navigation tabs
     if st.session_state.username == "admin":
-        tab1, tab2, tab3 = st.tabs(["🔍 Search Seats", "⭐ My Shortlist", "🔑 Admin Panel"])
+        tab1, tab2, tab3, tab4 = st.tabs(["🔍 Search Seats", "🔮 Predict My Chances", "⭐ My Shortlist", "🔑 Admin Panel"])
         
         with tab1:
             logged_in_search_page()
         with tab2:
-            shortlist_page()
+            predictor_page()
         with tab3:
+            shortlist_page()
+        with tab4:
             admin_page()
     else:
-        tab1, tab2 = st.tabs(["🔍 Search Seats", "⭐ My Shortlist"])
+        tab1, tab2, tab3 = st.tabs(["🔍 Search Seats", "🔮 Predict My Chances", "⭐ My Shortlist"])
         
         with tab1:
             logged_in_search_page()
         with tab2:
+            predictor_page()
+        with tab3:
             shortlist_page()
 
 # Footer
@@ -499,13 +768,25 @@ if 'selected_items' not in st.session_state:
 
 # --- MAIN APP LOGIC ---
 if st.session_state.show_login and not st.session_state.logged_in:
-    login_page()
-    if st.button("🔙 Back to Search"):
-        st.session_state.show_login = False
-        st.rerun()
+    current_view = "login"
 elif st.session_state.logged_in:
-    main_app()
+    current_view = "main"
 else:
-    guest_search_page()
+    current_view = "guest"
+
+with span("app.rerun"), profile_page(current_view):
+    if current_view == "login":
+        login_page()
+        if st.button("🔙 Back to Search"):
+            st.session_state.show_login = False
+            st.rerun()
+    elif current_view == "main":
+        main_app()
+    else:
+        tab1, tab2 = st.tabs(["🔍 Search Seats", "🔮 Predict My Chances"])
+        with tab1:
+            guest_search_page()
+        with tab2:
+            predictor_page()
 
 show_footer()
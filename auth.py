@@ -3,8 +3,29 @@
 import sqlite3
 import streamlit as st
 import time
+import threading
 import pandas as pd
-from database import get_connection, hash_password
+from database import get_connection, hash_password, register_query
+from db_writer import get_db_writer, run_write
+
+
+USER_CONFLICT_SQL = register_query(
+    "users.conflict", "SELECT username, email FROM users WHERE username = ? OR email = ?"
+)
+USER_CREATED_SQL = register_query(
+    "users.created", "SELECT id, username FROM users WHERE username = ? AND email = ?"
+)
+AUTHENTICATE_SQL = register_query(
+    "users.authenticate", "SELECT id, username, email FROM users WHERE username = ? AND password_hash = ?"
+)
+TOUCH_LAST_LOGIN_SQL = register_query(
+    "users.touch_last_login", "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?"
+)
+USER_BY_ID_SQL = register_query(
+    "users.by_id", "SELECT id, username, email, created_at, last_login FROM users WHERE id = ?"
+)
+EMAIL_TAKEN_SQL = register_query("users.email_taken", "SELECT id FROM users WHERE email = ? AND id != ?")
+DELETE_USER_SQL = register_query("users.delete", "DELETE FROM users WHERE id = ?")
 
 
 def initialize_session():
@@ -32,13 +53,35 @@ def initialize_session():
         st.session_state.signup_success = False
 
 
+def _insert_user(cursor, username, email, password_hash):
+    # Check if username or email already exists
+    cursor.execute(USER_CONFLICT_SQL, (username, email))
+    existing_user = cursor.fetchone()
+    
+    if existing_user:
+        if existing_user[0].lower() == username.lower():
+            return False, "Username already exists! Please choose a different username."
+        else:
+            return False, "Email already exists! Please use a different email."
+    
+    cursor.execute(
+        "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+        (username, email, password_hash)
+    )
+    
+    # Verify the user was actually created
+    cursor.execute(USER_CREATED_SQL, (username, email))
+    created_user = cursor.fetchone()
+    
+    if created_user:
+        return True, f"Account created successfully for {username}!"
+    else:
+        return False, "Account creation failed - user not found after insert"
+
+
 def create_user(username, email, password):
     """Create a new user account with proper error handling"""
-    conn = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
         # Validate inputs
         username = username.strip()
         email = email.strip().lower()
@@ -58,39 +101,7 @@ def create_user(username, email, password):
         # Hash the password
         password_hash = hash_password(password)
         
-        # Check if username or email already exists
-        cursor.execute(
-            "SELECT username, email FROM users WHERE LOWER(username) = LOWER(?) OR LOWER(email) = LOWER(?)",
-            (username, email)
-        )
-        existing_user = cursor.fetchone()
-        
-        if existing_user:
-            if existing_user[0].lower() == username.lower():
-                return False, "Username already exists! Please choose a different username."
-            else:
-                return False, "Email already exists! Please use a different email."
-        
-        # Insert user with explicit commit
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
-            (username, email, password_hash)
-        )
-        
-        # Commit the transaction
-        conn.commit()
-        
-        # Verify the user was actually created
-        cursor.execute(
-            "SELECT id, username FROM users WHERE LOWER(username) = LOWER(?) AND LOWER(email) = LOWER(?)",
-            (username, email)
-        )
-        created_user = cursor.fetchone()
-        
-        if created_user:
-            return True, f"Account created successfully for {username}!"
-        else:
-            return False, "Account creation failed - user not found after insert"
+        return run_write(_insert_user, username, email, password_hash)
             
     except sqlite3.IntegrityError as e:
         if "username" in str(e).lower():
@@ -101,9 +112,6 @@ def create_user(username, email, password):
             return False, f"Account creation failed: {str(e)}"
     except Exception as e:
         return False, f"Database error: {str(e)}"
-    finally:
-        if conn:
-            conn.close()
 
 
 def authenticate_user(username, password):
@@ -114,20 +122,14 @@ def authenticate_user(username, password):
         cursor = conn.cursor()
         password_hash = hash_password(password)
         
-        # Search case-insensitive
-        cursor.execute(
-            "SELECT id, username, email FROM users WHERE LOWER(username) = LOWER(?) AND password_hash = ?",
-            (username.strip(), password_hash)
-        )
+        # Search case-insensitive (username is COLLATE NOCASE, so this uses its index)
+        cursor.execute(AUTHENTICATE_SQL, (username.strip(), password_hash))
         user = cursor.fetchone()
         
         if user:
-            # Update last login
-            cursor.execute(
-                "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
-                (user[0],)
-            )
-            conn.commit()
+            # Update last login in the background; login doesn't wait for the commit
+            future = get_db_writer().execute(TOUCH_LAST_LOGIN_SQL, (user[0],))
+            future.add_done_callback(lambda _: invalidate_user_cache(user[0]))
             return True, user
         else:
             return False, None
@@ -276,6 +278,7 @@ def logout():
     st.session_state.selected_items = set()
     st.session_state.login_attempts = 0
     st.session_state.signup_success = False
+    st.session_state.admin_authenticated = False
     
     # Show logout message
     st.success("👋 You have been logged out successfully!")
@@ -299,27 +302,52 @@ def check_login_status():
             st.rerun()
 
 
+# Per-process cache of user records so session validation doesn't hit the DB every rerun
+USER_CACHE_TTL = 60
+USER_CACHE_MAX_ENTRIES = 10000
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+
+def invalidate_user_cache(user_id=None):
+    """Drop a cached user record (or all of them)"""
+    with _user_cache_lock:
+        if user_id is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(user_id, None)
+
+
 def get_user_info(user_id):
     """Get user information by user ID"""
+    now = time.monotonic()
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+        if cached and cached[0] > now:
+            return dict(cached[1])
+    
     conn = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
         
-        cursor.execute(
-            "SELECT id, username, email, created_at, last_login FROM users WHERE id = ?",
-            (user_id,)
-        )
+        cursor.execute(USER_BY_ID_SQL, (user_id,))
         user = cursor.fetchone()
         
         if user:
-            return {
+            user_info = {
                 'id': user[0],
                 'username': user[1],
                 'email': user[2],
                 'created_at': user[3],
                 'last_login': user[4]
             }
+            with _user_cache_lock:
+                if len(_user_cache) >= USER_CACHE_MAX_ENTRIES:
+                    # Evict the entry closest to expiry
+                    del _user_cache[min(_user_cache, key=lambda k: _user_cache[k][0])]
+                _user_cache[user_id] = (now + USER_CACHE_TTL, user_info)
+            return dict(user_info)
         return None
         
     except Exception as e:
@@ -330,47 +358,41 @@ def get_user_info(user_id):
             conn.close()
 
 
+def _update_user_profile(cursor, user_id, email, password_hash):
+    if email:
+        # Check if email already exists for another user
+        cursor.execute(EMAIL_TAKEN_SQL, (email.strip(), user_id))
+        if cursor.fetchone():
+            return False, "Email already exists for another user!"
+        
+        cursor.execute(
+            "UPDATE users SET email = ? WHERE id = ?",
+            (email.lower().strip(), user_id)
+        )
+    
+    if password_hash:
+        cursor.execute(
+            "UPDATE users SET password_hash = ? WHERE id = ?",
+            (password_hash, user_id)
+        )
+    
+    return True, "Profile updated successfully!"
+
+
 def update_user_profile(user_id, email=None, new_password=None):
     """Update user profile information"""
-    conn = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        if email:
-            # Check if email already exists for another user
-            cursor.execute(
-                "SELECT id FROM users WHERE LOWER(email) = LOWER(?) AND id != ?",
-                (email, user_id)
-            )
-            if cursor.fetchone():
-                return False, "Email already exists for another user!"
-            
-            cursor.execute(
-                "UPDATE users SET email = ? WHERE id = ?",
-                (email.lower().strip(), user_id)
-            )
-        
-        if new_password:
-            password_hash = hash_password(new_password)
-            cursor.execute(
-                "UPDATE users SET password_hash = ? WHERE id = ?",
-                (password_hash, user_id)
-            )
-        
-        conn.commit()
-        return True, "Profile updated successfully!"
+        password_hash = hash_password(new_password) if new_password else None
+        return run_write(_update_user_profile, user_id, email, password_hash)
         
     except Exception as e:
         return False, f"Error updating profile: {e}"
     finally:
-        if conn:
-            conn.close()
+        invalidate_user_cache(user_id)
 
 
 def delete_user_account(user_id, password):
     """Delete user account after password verification"""
-    conn = None
     try:
         # First verify password
         user_info = get_user_info(user_id)
@@ -382,20 +404,15 @@ def delete_user_account(user_id, password):
         if not success:
             return False, "Incorrect password!"
         
-        conn = get_connection()
-        cursor = conn.cursor()
-        
         # Delete user (shortlists will be deleted automatically due to CASCADE)
-        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        conn.commit()
+        run_write(lambda cursor: cursor.execute(DELETE_USER_SQL, (user_id,)))
         
         return True, "Account deleted successfully!"
         
     except Exception as e:
         return False, f"Error deleting account: {e}"
     finally:
-        if conn:
-            conn.close()
+        invalidate_user_cache(user_id)
 
 
 def validate_session():
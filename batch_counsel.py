@@ -0,0 +1,290 @@
+# batch_counsel.py - Eligible options for a whole file of student profiles in one pass
+#
+# Usage:
+#   python batch_counsel.py students.csv -o eligible.jsonl
+#   python batch_counsel.py students.jsonl --format csv -o eligible.csv --limit 150
+#   python batch_counsel.py students.csv --year 2023 --workers 8 -o -
+#
+# Profile fields: student_id (defaults to the line number), rank, and the optional
+# lists seat_types, quotas, genders and types. Lists are ';'-separated in CSV and
+# arrays or ';'-separated strings in JSONL; an empty list matches everything.
+#
+# An option is eligible when its closing rank in the final round of the chosen
+# year (the latest by default) is at or above the student's rank. Options are
+# sorted by closing rank once; every distinct eligibility profile selects its
+# options from that order and a binary search per student finds where its
+# eligible suffix starts, so a file of thousands of students costs one sort plus
+# a searchsorted per profile rather than one apply_filters() per student.
+# Formatting the output is the expensive part and is spread over worker processes.
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from predictor import category_mask
+
+
+BATCH_WORKERS = int(os.environ.get("JEE_BATCH_WORKERS", os.cpu_count() or 1))
+
+# Students handed to a worker at a time
+BATCH_CHUNK_SIZE = 500
+
+PROFILE_LIST_FIELDS = ["seat_types", "quotas", "genders", "types"]
+
+# Profile list field -> seat column it selects on
+PROFILE_FILTER_COLUMNS = {
+    "seat_types": "Seat Type",
+    "quotas": "Quota",
+    "genders": "Gender",
+    "types": "Type",
+}
+
+OPTION_COLUMNS = [
+    "Institute", "Academic Program Name", "Type", "Quota", "Seat Type", "Gender", "Closing Rank", "Year", "Round"
+]
+CSV_HEADER = ["student_id", "rank"] + OPTION_COLUMNS
+
+# Set in each worker by _init_worker
+_reference = None
+_fragments = None
+_profile_positions = {}
+
+
+def reference_options(df, year=None):
+    """
+    Final-round cutoff of every option in one year, sorted by closing rank
+
+    Args:
+        df (pandas.DataFrame): Seat snapshot from get_jee_data()
+        year (int): Year to use (latest in the data when None)
+
+    Returns:
+        pandas.DataFrame: One row per option in OPTION_COLUMNS, most competitive first
+    """
+    df = df[df["Closing Rank"].notna()]
+    if len(df) == 0:
+        return pd.DataFrame(columns=OPTION_COLUMNS)
+    if year is None:
+        year = int(df["Year"].max())
+    latest = df[df["Year"] == year]
+    latest = latest.sort_values(["option_id", "Round"], na_position="first", kind="stable")
+    latest = latest.drop_duplicates("option_id", keep="last")
+    return latest[OPTION_COLUMNS].sort_values("Closing Rank", kind="stable").reset_index(drop=True)
+
+
+def _as_list(value):
+    """Profile list field as a tuple of names ('' / None / NaN mean no restriction)"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(str(v).strip() for v in value if str(v).strip())
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ()
+    return tuple(part.strip() for part in str(value).split(";") if part.strip())
+
+
+def read_profiles(path):
+    """
+    Read and validate a CSV or JSONL file of student profiles
+
+    Returns:
+        tuple: (valid profiles with normalized list fields, rejected rows with a 'Reason' column)
+    """
+    if path.endswith(".jsonl") or path.endswith(".json"):
+        raw = pd.read_json(path, lines=True, dtype=False)
+    else:
+        raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+    if "rank" not in raw.columns:
+        raise ValueError("Missing required column: rank")
+
+    profiles = pd.DataFrame(index=raw.index)
+    # Line numbers as in the file (CSV has a header line)
+    first_line = 1 if path.endswith(".jsonl") or path.endswith(".json") else 2
+    if "student_id" in raw.columns:
+        profiles["student_id"] = raw["student_id"].astype(str)
+    else:
+        profiles["student_id"] = (raw.index + first_line).astype(str)
+    profiles["rank"] = pd.to_numeric(raw["rank"], errors="coerce")
+    for field in PROFILE_LIST_FIELDS:
+        profiles[field] = raw[field].map(_as_list) if field in raw.columns else [()] * len(raw)
+
+    ok = profiles["rank"].notna() & (profiles["rank"] >= 1) & (profiles["rank"].mod(1) == 0)
+    rejected = raw[~ok].copy()
+    rejected.insert(0, "Reason", "rank must be a positive whole number")
+    rejected.insert(0, "Line", rejected.index + first_line)
+
+    valid = profiles[ok].copy()
+    valid["rank"] = valid["rank"].astype("int64")
+    return valid.reset_index(drop=True), rejected.reset_index(drop=True)
+
+
+def _option_fragments(reference, fmt):
+    """Pre-rendered JSON object or CSV cells for every reference option"""
+    records = reference.astype(object).where(reference.notna(), None)
+    if fmt == "jsonl":
+        return np.array([
+            json.dumps(dict(zip(OPTION_COLUMNS, (v if not isinstance(v, np.integer) else int(v) for v in row))),
+                       ensure_ascii=False)
+            for row in records.itertuples(index=False, name=None)
+        ], dtype=object)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows(records.itertuples(index=False, name=None))
+    return np.array(buffer.getvalue().splitlines(), dtype=object)
+
+
+def _init_worker(reference, fmt):
+    global _reference, _fragments, _profile_positions
+    _reference = reference
+    _fragments = _option_fragments(reference, fmt)
+    _profile_positions = {}
+
+
+def _positions_for(profile):
+    """Reference rows (in closing rank order) a profile can take, cached per profile"""
+    positions = _profile_positions.get(profile)
+    if positions is None:
+        mask = np.ones(len(_reference), dtype=bool)
+        for field, values in zip(PROFILE_LIST_FIELDS, profile):
+            mask &= category_mask(_reference[PROFILE_FILTER_COLUMNS[field]], values)
+        positions = np.flatnonzero(mask)
+        _profile_positions[profile] = positions
+    return positions
+
+
+def _counsel_chunk(students, fmt, limit):
+    """Render the eligible options of a chunk of (student_id, rank, profile) tuples"""
+    closing = _reference["Closing Rank"].to_numpy()
+    by_profile = {}
+    for index, (_, _, profile) in enumerate(students):
+        by_profile.setdefault(profile, []).append(index)
+
+    # Sort-merge per profile: ranks are looked up in the profile's closing ranks in one call
+    starts = [0] * len(students)
+    for profile, indexes in by_profile.items():
+        positions = _positions_for(profile)
+        ranks = np.fromiter((students[i][1] for i in indexes), dtype=np.int64, count=len(indexes))
+        for i, start in zip(indexes, np.searchsorted(closing[positions], ranks, side="left")):
+            starts[i] = int(start)
+
+    lines = []
+    for (student_id, rank, profile), start in zip(students, starts):
+        positions = _positions_for(profile)
+        chosen = positions[start:start + limit] if limit else positions[start:]
+        fragments = _fragments[chosen]
+        if fmt == "jsonl":
+            lines.append(
+                f'{{"student_id": {json.dumps(student_id)}, "rank": {rank}, '
+                f'"eligible": {len(positions) - start}, "options": [{", ".join(fragments)}]}}\n'
+            )
+        else:
+            prefix = _csv_cells(student_id, rank)
+            lines.extend(f"{prefix},{fragment}\n" for fragment in fragments)
+    return "".join(lines)
+
+
+def _csv_cells(*values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(values)
+    return buffer.getvalue()
+
+
+def counsel(profiles, reference, fmt="jsonl", limit=0, workers=None):
+    """
+    Yield the rendered eligible options of every profile, in input order
+
+    Args:
+        profiles (pandas.DataFrame): Valid profiles from read_profiles()
+        reference (pandas.DataFrame): Options from reference_options()
+        fmt (str): 'jsonl' (one object per student) or 'csv' (one row per student and option)
+        limit (int): Keep at most this many options per student, the most competitive first (0 = all)
+        workers (int): Worker processes (1 renders in this process)
+
+    Yields:
+        str: Output text for consecutive chunks of students
+    """
+    workers = workers or BATCH_WORKERS
+    students = list(zip(
+        profiles["student_id"],
+        profiles["rank"].astype(int),
+        zip(*(profiles[field] for field in PROFILE_LIST_FIELDS)),
+    ))
+    chunks = [students[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(students), BATCH_CHUNK_SIZE)]
+
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(reference, fmt)
+        for chunk in chunks:
+            yield _counsel_chunk(chunk, fmt, limit)
+        return
+
+    # spawn, like the PDF pool, so workers never inherit open database connections
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(reference, fmt),
+    ) as pool:
+        yield from pool.map(_counsel_chunk, chunks, [fmt] * len(chunks), [limit] * len(chunks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List eligible options for a file of student profiles")
+    parser.add_argument("profiles", help="CSV or JSONL file of student profiles")
+    parser.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None,
+                        help="Output format (default: from the output file extension, else jsonl)")
+    parser.add_argument("--year", type=int, default=None, help="Cutoff year to use (default: latest)")
+    parser.add_argument("--limit", type=int, default=0,
+                        help="At most this many options per student, most competitive first (0 = all)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Worker processes")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+
+    try:
+        profiles, rejected = read_profiles(args.profiles)
+    except Exception as e:
+        print(f"❌ Could not read profiles: {e}", file=sys.stderr)
+        return 2
+    if len(rejected) > 0:
+        lines = ", ".join(str(line) for line in rejected["Line"].head(10))
+        print(f"⚠️ Skipped {len(rejected)} profiles with an invalid rank (lines {lines}"
+              f"{', ...' if len(rejected) > 10 else ''})", file=sys.stderr)
+
+    start = time.perf_counter()
+    # Database setup reports on stdout, which may be the output stream
+    with contextlib.redirect_stdout(sys.stderr):
+        from database import get_jee_data
+        reference = reference_options(get_jee_data(), args.year)
+    if len(reference) == 0:
+        print("❌ No cutoffs found for the requested year", file=sys.stderr)
+        return 1
+    loaded = time.perf_counter()
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        if fmt == "csv":
+            out.write(_csv_cells(*CSV_HEADER) + "\n")
+        for text in counsel(profiles, reference, fmt, args.limit, args.workers):
+            out.write(text)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - loaded
+    rate = len(profiles) / elapsed * 60 if elapsed else 0
+    print(f"✅ {len(profiles):,} profiles against {len(reference):,} options in {elapsed:.2f} s "
+          f"({rate:,.0f} profiles/min; seat data loaded in {loaded - start:.2f} s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# benchmark.py - Headless benchmarks for the search, shortlist and export hot paths
+#
+# Usage:
+#   python benchmark.py                                  # 10k, 100k and 1M rows
+#   python benchmark.py --sizes 10000 --save-baseline    # record a new baseline
+#   python benchmark.py --baseline benchmark_baseline.json --tolerance 1.3
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+# Representative filter combinations from the search page
+FILTER_CASES = {
+    "defaults": dict(types=None, colleges=["All"], programs=[], rank_range=(0, 1_000_000),
+                     gender=["Gender-Neutral"], quota=["AI"], seat_type=["OPEN"]),
+    "computers_top_10k": dict(types=None, colleges=["All"], programs=["Computers"], rank_range=(0, 10_000),
+                              gender=["Gender-Neutral"], quota=["AI"], seat_type=["OPEN"]),
+    "iit_only_all_categories": dict(types=["IIT"], colleges=["All"], programs=[], rank_range=(0, 1_000_000),
+                                    gender=[], quota=[], seat_type=[]),
+    "three_colleges_electronics": dict(types=None, colleges=3, programs=["Electronics"], rank_range=(1_000, 200_000),
+                                       gender=["Gender-Neutral", "Female-only (including Supernumerary)"],
+                                       quota=["AI", "HS", "OS"], seat_type=["OPEN", "OBC-NCL"]),
+}
+
+
+def _time(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "repeat": repeat,
+    }, result
+
+
+def _use_databases(workdir):
+    """Point the app modules at fresh databases inside workdir"""
+    import database
+    from db_writer import get_db_writer
+    from seat_cache import seat_data_cache
+
+    get_db_writer().stop()
+    database.DB_PATH = os.path.join(workdir, "jee_data.db")
+    database.SEAT_DB_PATH = os.path.join(workdir, "jee_seats.db")
+    database.initialize_database()
+    seat_data_cache.df = None
+    seat_data_cache.version = None
+
+
+def _load_seats(n_rows, seed):
+    import database
+    from generate_data import iter_seat_chunks, write_seats
+    conn = database.get_seat_connection(readonly=False)
+    write_seats(iter_seat_chunks(n_rows, seed, first_year=2021, years=4), conn=conn)
+    conn.commit()
+    database.mark_seat_data_reloaded(conn)
+    conn.close()
+
+
+def run_size(n_rows, repeat, shortlist_size, seed):
+    """Benchmark every hot path against a synthetic table of n_rows"""
+    import database
+    from seat_cache import seat_data_cache
+    from search import get_college_options, get_program_options, apply_filters, format_dataframe_for_display
+    from auth import create_user, authenticate_user
+    from shortlist import add_to_shortlist, add_matching_to_shortlist, get_user_shortlist, move_item_to_position, move_item_up
+    from pdf_generator import generate_shortlist_pdf, generate_results_pdf
+    from predictor import predict_chances
+    from topk import top_k_options, RankIndex
+    from rank_curves import RankCurves, curve_grid
+    from name_search import NameIndex
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        _use_databases(workdir)
+        _load_seats(n_rows, seed)
+
+        def cold_load():
+            seat_data_cache.df = None
+            return database.get_jee_data()
+
+        results["get_jee_data.cold"], df = _time(cold_load, repeat)
+        results["get_jee_data.warm"], _ = _time(database.get_jee_data, repeat)
+
+        all_types = seat_data_cache.get_facet_options("Type")
+        all_colleges = seat_data_cache.get_facet_options("Institute")
+
+        def filter_options():
+            colleges = get_college_options(df, all_types)
+            get_program_options(df, all_types, ["All"])
+            for col in ("Gender", "Quota", "Seat Type"):
+                sorted(df[col].dropna().unique())
+            return colleges
+
+        results["filter_widgets.options"], _ = _time(filter_options, repeat)
+
+        largest = None
+        for name, case in FILTER_CASES.items():
+            types = case["types"] or all_types
+            colleges = all_colleges[:case["colleges"]] if isinstance(case["colleges"], int) else case["colleges"]
+            programs_df, _ = get_program_options(df, types, colleges)
+            results[f"apply_filters.{name}"], filtered = _time(
+                lambda: apply_filters(df, types, colleges, case["programs"], case["rank_range"],
+                                      case["gender"], case["quota"], case["seat_type"], programs_df),
+                repeat
+            )
+            if largest is None or len(filtered) > len(largest):
+                largest = filtered
+
+        results["format_dataframe_for_display"], _ = _time(lambda: format_dataframe_for_display(largest), repeat)
+
+        results["predict_chances.open"], _ = _time(
+            lambda: predict_chances(df, 5000, ["OPEN"], ["AI", "HS"], ["Gender-Neutral"]), repeat
+        )
+        results["predict_chances.all"], _ = _time(lambda: predict_chances(df, 5000, [], [], []), repeat)
+
+        results["top_k.index"], rank_index = _time(lambda: RankIndex(df), repeat)
+        results["top_k.open"], _ = _time(
+            lambda: top_k_options(df, 5000, 50, ["OPEN"], ["AI"], ["Gender-Neutral"], branches=["Computers"], index=rank_index),
+            repeat
+        )
+        rank_curves = RankCurves(rank_index)
+        results["rank_curves.open_at"], _ = _time(
+            lambda: [rank_curves.open_at(dimension, curve_grid((0, 1_000_000))) for dimension in rank_curves.groups], repeat
+        )
+
+        results["name_search.index"], name_index = _time(lambda: NameIndex(rank_index), repeat)
+        results["name_search.search"], _ = _time(
+            lambda: [name_index.search(query) for query in ("IITB CSE", "mechnical", "trichy")], repeat
+        )
+
+        # Shortlist writes and reorders on one large list
+        create_user("benchuser", "bench@example.com", "benchpass")
+        _, user = authenticate_user("benchuser", "benchpass")
+        rows = df.sample(n=min(shortlist_size, len(df)), random_state=seed)
+
+        shortlist_columns = ["Institute", "Academic Program Name", "Closing Rank", "Seat Type", "Quota", "Gender"]
+
+        def add_all():
+            for institute, program, rank, seat_type, quota, gender in rows[shortlist_columns].itertuples(index=False, name=None):
+                add_to_shortlist(user[0], institute, program, int(rank), seat_type, quota, gender)
+
+        add_stats, _ = _time(add_all, 1)
+        add_stats["per_item"] = add_stats["median"] / max(len(rows), 1)
+        results["add_to_shortlist"] = add_stats
+
+        shortlist_df = get_user_shortlist(user[0])
+        results["get_user_shortlist"], shortlist_df = _time(lambda: get_user_shortlist(user[0]), repeat)
+        middle_id = int(shortlist_df["id"].iloc[len(shortlist_df) // 2])
+        results["move_item_to_position"], _ = _time(lambda: move_item_to_position(user[0], middle_id, 1), repeat)
+        results["move_item_up"], _ = _time(lambda: move_item_up(user[0], middle_id), repeat)
+
+        results["generate_shortlist_pdf"], _ = _time(lambda: generate_shortlist_pdf(shortlist_df, "benchuser"), 1)
+        report_rows = largest.head(10_000)
+        results["generate_results_pdf"], _ = _time(lambda: generate_results_pdf(report_rows), 1)
+        results["generate_results_pdf"]["rows"] = len(report_rows)
+
+        # Shortlist-all for a broad filter on a fresh list, then again when every option is already saved
+        create_user("benchbulk", "bulk@example.com", "benchpass")
+        _, bulk_user = authenticate_user("benchbulk", "benchpass")
+        add_matching = lambda: add_matching_to_shortlist(
+            bulk_user[0], all_types, ["All"], [], (0, 1_000_000), ["Gender-Neutral"], ["AI"], ["OPEN"]
+        )
+        results["add_matching_to_shortlist"], added = _time(add_matching, 1)
+        results["add_matching_to_shortlist"]["options"] = added
+        results["add_matching_to_shortlist.saved"], _ = _time(add_matching, repeat)
+
+        from db_writer import get_db_writer
+        get_db_writer().stop()
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of (size, benchmark, ratio) whose median regressed beyond tolerance"""
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base or base["median"] <= 0:
+                continue
+            ratio = stats["median"] / base["median"]
+            stats["baseline_ratio"] = round(ratio, 3)
+            if ratio > tolerance:
+                regressions.append((size, name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the JEE Seat Finder hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Seat table sizes to test")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per benchmark")
+    parser.add_argument("--shortlist-size", type=int, default=300, help="Items added to the benchmark shortlist")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Allowed slowdown ratio before failing")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    # Emoji images for the shortlist PDF are looked up relative to the app directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    # Keep the app's import-time setup away from real data
+    scratch = tempfile.mkdtemp(prefix="jee-bench-")
+    os.environ["JEE_DB_PATH"] = os.path.join(scratch, "jee_data.db")
+    os.environ["JEE_SEAT_DB_PATH"] = os.path.join(scratch, "jee_seats.db")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"⏱️ Benchmarking {size:,} rows...")
+        report["results"][str(size)] = run_size(size, args.repeat, args.shortlist_size, args.seed)
+        for name, stats in report["results"][str(size)].items():
+            print(f"   {name:<45} {stats['median'] * 1000:10.1f} ms")
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report["results"], json.load(f), args.tolerance)
+        report["regressions"] = [
+            {"size": size, "benchmark": name, "ratio": round(ratio, 3)} for size, name, ratio in regressions
+        ]
+
+    with open(args.baseline if args.save_baseline else args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f"❌ {len(regressions)} benchmarks regressed beyond {args.tolerance}x the baseline:")
+        for size, name, ratio in regressions:
+            print(f"   {size} rows: {name} is {ratio:.2f}x slower")
+        return 1
+    print("✅ Benchmarks complete")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 import pandas as pd
 import sqlite3
+from database import mark_seat_data_reloaded, SEAT_DB_PATH
+from seat_schema import load_seat_frame
 
 # Load CSV
 df = pd.read_csv("iiit.csv")
@@ -8,9 +10,12 @@ df = pd.read_csv("iiit.csv")
 df["Closing Rank"] = pd.to_numeric(df["Closing Rank"], errors="coerce")
 df["Opening Rank"] = pd.to_numeric(df["Opening Rank"], errors="coerce")
 
-# Create SQLite DB and write to table
-conn = sqlite3.connect("jee_data.db")
-df.to_sql("jee_seats", conn, if_exists="append", index=False)
+# Write rows into the normalized seat tables
+conn = sqlite3.connect(SEAT_DB_PATH)
+load_seat_frame(conn.cursor(), df)
+conn.commit()
+# Tell running app instances to reload seat data
+mark_seat_data_reloaded(conn)
 conn.close()
 
-print("✅ Data successfully loaded into jee_data.db")
+print(f"✅ Data successfully loaded into {SEAT_DB_PATH}")
@@ -1,20 +1,109 @@
 # Complete database.py content for JEE Seat Finder app
 
 import sqlite3
-import pandas as pd
 from hashlib import sha256
+from urllib.parse import quote
 import os
+from metrics import connection_factory
+from seat_schema import ensure_seat_schema, option_id_sql, refresh_seat_trends
 
 
-def get_connection():
-    """Get database connection with proper settings"""
+# User accounts and shortlists (read-write, WAL)
+DB_PATH = os.environ.get("JEE_DB_PATH", "jee_data.db")
+
+# Seat catalogue (read-mostly, replaced wholesale on each data release)
+SEAT_DB_PATH = os.environ.get("JEE_SEAT_DB_PATH", "jee_seats.db")
+SEAT_DB_MMAP_SIZE = int(os.environ.get("JEE_SEAT_DB_MMAP_SIZE", 256 * 1024 * 1024))
+
+# Only enable when the seat file is published with publish_seat_database() and
+# never written in place: immutable readers skip all locking and change detection
+SEAT_DB_IMMUTABLE = os.environ.get("JEE_SEAT_DB_IMMUTABLE", "0") == "1"
+
+
+# Statements on request paths, checked against a populated database by querycheck.py
+QUERY_REGISTRY = {}
+
+
+def register_query(name, sql, db="user", hot=True, allow_scan=(), setup=()):
+    """
+    Register a statement for the query-plan check and return it unchanged
+
+    Args:
+        name (str): Unique name shown in reports, e.g. 'shortlist.by_user'
+        sql (str): The statement; '{placeholders}' stands for a runtime list of '?'
+        db (str): 'user' (with the seat file attached as 'seats') or 'seat'
+        hot (bool): Runs on every request, so a full table scan fails the check
+        allow_scan (tuple): Tables/aliases that may be scanned (e.g. small staging tables)
+        setup (tuple): Statements creating temp tables the statement needs
+    """
+    QUERY_REGISTRY[name] = {
+        "sql": sql, "db": db, "hot": hot, "allow_scan": tuple(allow_scan), "setup": tuple(setup)
+    }
+    return sql
+
+
+def _sqlite_uri(path, **params):
+    """Build a file: URI for sqlite3.connect(..., uri=True)"""
+    query = "&".join(f"{key}={value}" for key, value in params.items())
+    uri = f"file:{quote(os.path.abspath(path))}"
+    return f"{uri}?{query}" if query else uri
+
+
+def _ensure_parent_dir(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+
+def get_connection(attach_seats=False):
+    """
+    Get user database connection with proper settings
+    
+    Args:
+        attach_seats (bool): Also attach the seat database read-only as schema 'seats'
+    """
     # Ensure database directory exists
-    os.makedirs(os.path.dirname("jee_data.db") if os.path.dirname("jee_data.db") else ".", exist_ok=True)
+    _ensure_parent_dir(DB_PATH)
     
-    conn = sqlite3.connect("jee_data.db", check_same_thread=False)
+    conn = sqlite3.connect(_sqlite_uri(DB_PATH), uri=True, check_same_thread=False, factory=connection_factory())
     # Enable foreign keys and WAL mode for better concurrency
     conn.execute("PRAGMA foreign_keys = ON")
+    # Only takes effect on a new file, and only before WAL mode writes the header
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
     conn.execute("PRAGMA journal_mode = WAL")
+    if attach_seats:
+        attach_seat_database(conn)
+    return conn
+
+
+def attach_seat_database(conn):
+    """Attach the seat database read-only as schema 'seats' (outside any transaction)"""
+    conn.execute("ATTACH DATABASE ? AS seats", (_seat_db_uri(),))
+
+
+def _seat_db_uri():
+    params = {"mode": "ro"}
+    if SEAT_DB_IMMUTABLE:
+        params["immutable"] = 1
+    return _sqlite_uri(SEAT_DB_PATH, **params)
+
+
+def get_seat_connection(readonly=True):
+    """
+    Get seat database connection
+    
+    Readers open the file read-only with a large mmap window. Writers (admin
+    uploads and loader scripts) use a rollback journal instead of WAL so the
+    main file is always complete for read-only/immutable readers.
+    """
+    if readonly:
+        conn = sqlite3.connect(_seat_db_uri(), uri=True, check_same_thread=False, factory=connection_factory())
+        conn.execute(f"PRAGMA mmap_size = {SEAT_DB_MMAP_SIZE}")
+        return conn
+    
+    _ensure_parent_dir(SEAT_DB_PATH)
+    conn = sqlite3.connect(SEAT_DB_PATH, check_same_thread=False, factory=connection_factory())
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.execute("PRAGMA busy_timeout = 5000")
     return conn
 
 
@@ -50,14 +139,22 @@ def setup_user_tables():
                 notes TEXT,
                 priority_order INTEGER DEFAULT 1,
                 added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                option_id INTEGER,
                 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
             )
         """)
         
+        # Seat option (dim_option.id in the seat database) the item refers to
+        shortlist_columns = [row[1] for row in cursor.execute("PRAGMA table_info(shortlists)")]
+        if 'option_id' not in shortlist_columns:
+            cursor.execute("ALTER TABLE shortlists ADD COLUMN option_id INTEGER")
+        
         # Create indexes for better performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_shortlists_user_id ON shortlists(user_id)")
+        # Reorders seek straight to the neighbouring priority; the user_id prefix also serves lookups
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_shortlists_user_priority ON shortlists(user_id, priority_order)")
+        cursor.execute("DROP INDEX IF EXISTS idx_shortlists_user_id")
         
         conn.commit()
         print("✅ User tables created successfully!")
@@ -76,20 +173,223 @@ def hash_password(password):
     return sha256(password.encode('utf-8')).hexdigest()
 
 
-def get_jee_data():
-    """Get JEE seats data"""
+# Natural key of a seat record; Round is part of the key when the data has rounds
+SEAT_KEY_COLUMNS = ['Institute', 'Academic Program Name', 'Quota', 'Seat Type', 'Gender', 'Year']
+
+# How many versions of row-level seat changes to keep for incremental refresh
+SEAT_CHANGE_RETENTION = 100
+
+
+def setup_seat_meta_table():
+    """Set up the metadata tables holding the seat data version and change log"""
+    conn = get_seat_connection(readonly=False)
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS seat_data_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        conn.execute("INSERT OR IGNORE INTO seat_data_meta (key, value) VALUES ('version', 1)")
+        # Row-level change log so in-memory copies can apply deltas instead of reloading
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS seat_changes (
+                version INTEGER NOT NULL,
+                seat_id INTEGER,
+                op TEXT NOT NULL CHECK (op IN ('insert', 'delete', 'reload'))
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_seat_changes_version ON seat_changes(version)")
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Error creating seat metadata table: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+SEAT_DATA_VERSION_SQL = register_query(
+    "seat_meta.version", "SELECT value FROM seat_data_meta WHERE key = 'version'", db="seat"
+)
+
+
+def get_seat_data_version(conn=None):
+    """Get the current seat data version (bumped on every admin write)"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_seat_connection()
+    try:
+        row = conn.execute(SEAT_DATA_VERSION_SQL).fetchone()
+        return row[0] if row else 0
+    except sqlite3.Error:
+        return 0
+    finally:
+        if own_conn:
+            conn.close()
+
+
+PRUNE_SEAT_CHANGES_SQL = register_query(
+    "seat_changes.prune", "DELETE FROM seat_changes WHERE version <= ?", db="seat"
+)
+
+
+def bump_seat_data_version(cursor):
+    """Increment the seat data version inside the caller's transaction"""
+    cursor.execute("UPDATE seat_data_meta SET value = value + 1 WHERE key = 'version'")
+    cursor.execute(SEAT_DATA_VERSION_SQL)
+    version = cursor.fetchone()[0]
+    cursor.execute(PRUNE_SEAT_CHANGES_SQL, (version - SEAT_CHANGE_RETENTION,))
+    return version
+
+
+def record_seat_changes(cursor, version, op, seat_ids_sql, params=()):
+    """Log the seat ids selected by seat_ids_sql as inserted/deleted in this version"""
+    cursor.execute(
+        f"INSERT INTO seat_changes (version, seat_id, op) SELECT ?, seat_id, ? FROM ({seat_ids_sql})",
+        (version, op, *params)
+    )
+
+
+def mark_seat_data_reloaded(conn):
+    """Rebuild the trend table, bump the version and ask every in-memory copy to reload (for offline scripts)"""
+    cursor = conn.cursor()
+    refresh_seat_trends(cursor)
+    version = bump_seat_data_version(cursor)
+    cursor.execute("INSERT INTO seat_changes (version, seat_id, op) VALUES (?, NULL, 'reload')", (version,))
+    conn.commit()
+    return version
+
+
+def setup_seat_schema():
+    """Create the normalized seat tables, converting an older wide jee_seats table"""
+    conn = get_seat_connection(readonly=False)
+    try:
+        status = ensure_seat_schema(conn.cursor())
+        conn.commit()
+        if status == 'migrated':
+            mark_seat_data_reloaded(conn)
+            # One-off: give the space of the wide table back instead of leaving it on the free list
+            conn.execute("VACUUM")
+        return status
+    finally:
+        conn.close()
+
+
+# Shortlist items store the names they were saved with; the option id is resolved from those
+_SHORTLIST_OPTION_SQL = option_id_sql({
+    'Institute': 'shortlists.institute',
+    'Academic Program Name': 'shortlists.program',
+    'Quota': 'shortlists.quota',
+    'Seat Type': 'shortlists.seat_type',
+    'Gender': 'shortlists.gender',
+}, schema="seats.")
+
+# One-off and after each data release, so it walks the whole table by design
+LINK_SHORTLIST_OPTIONS_SQL = register_query(
+    "shortlist.link_options",
+    f"UPDATE shortlists SET option_id = {_SHORTLIST_OPTION_SQL} WHERE option_id IS NULL",
+    hot=False
+)
+RELINK_SHORTLIST_OPTIONS_SQL = register_query(
+    "shortlist.relink_options", f"UPDATE shortlists SET option_id = {_SHORTLIST_OPTION_SQL}", hot=False
+)
+
+
+def link_shortlist_options(relink=False):
+    """
+    Point shortlist items at their seat option so cutoffs can be joined live
+
+    Args:
+        relink (bool): Resolve every item again (option ids are per seat file, so
+            this is needed after a rebuilt file is published)
+
+    Returns:
+        int: Items updated
+    """
+    conn = get_connection(attach_seats=True)
     try:
-        conn = get_connection()
-        df = pd.read_sql_query("SELECT * FROM jee_seats", conn)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        cursor = conn.execute(RELINK_SHORTLIST_OPTIONS_SQL if relink else LINK_SHORTLIST_OPTIONS_SQL)
+        conn.commit()
+        return cursor.rowcount
+    finally:
         conn.close()
-        return df
+
+
+def migrate_seat_data():
+    """Copy jee_seats out of the user database into the seat database (one-time)"""
+    if os.path.exists(SEAT_DB_PATH) or not os.path.exists(DB_PATH):
+        return False
+    
+    legacy = sqlite3.connect(DB_PATH)
+    try:
+        row = legacy.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='jee_seats'").fetchone()
+    finally:
+        legacy.close()
+    if not row:
+        return False
+    
+    conn = get_seat_connection(readonly=False)
+    try:
+        conn.execute("ATTACH DATABASE ? AS legacy", (DB_PATH,))
+        conn.execute(row[0])
+        conn.execute("INSERT INTO main.jee_seats SELECT * FROM legacy.jee_seats")
+        conn.commit()
+        conn.execute("DETACH DATABASE legacy")
+        print(f"✅ Copied jee_seats from {DB_PATH} to {SEAT_DB_PATH}")
+        return True
     except Exception as e:
-        print(f"Error getting JEE data: {e}")
-        # Return empty dataframe with expected columns if table doesn't exist
-        return pd.DataFrame(columns=[
-            'Institute', 'Academic Program Name', 'Type', 'Opening Rank', 
-            'Closing Rank', 'Seat Type', 'Quota', 'Gender', 'Year'
-        ])
+        conn.rollback()
+        conn.close()
+        os.remove(SEAT_DB_PATH)
+        print(f"❌ Error migrating seat data: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def publish_seat_database(new_path):
+    """
+    Atomically replace the seat database with a freshly built file
+    
+    The new file gets a version above the live one plus a reload marker, so
+    every running process swaps its in-memory copy on its next read.
+    """
+    conn = sqlite3.connect(new_path)
+    try:
+        if not conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name='jee_seats'").fetchone():
+            raise ValueError(f"{new_path} has no jee_seats table")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        ensure_seat_schema(conn.cursor())
+        refresh_seat_trends(conn.cursor())
+        conn.execute("CREATE TABLE IF NOT EXISTS seat_data_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS seat_changes (
+                version INTEGER NOT NULL,
+                seat_id INTEGER,
+                op TEXT NOT NULL CHECK (op IN ('insert', 'delete', 'reload'))
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_seat_changes_version ON seat_changes(version)")
+        version = max(get_seat_data_version(conn), get_seat_data_version()) + 1
+        conn.execute("INSERT OR REPLACE INTO seat_data_meta (key, value) VALUES ('version', ?)", (version,))
+        conn.execute("INSERT INTO seat_changes (version, seat_id, op) VALUES (?, NULL, 'reload')", (version,))
+        # Planner statistics ship with the file; immutable readers never get another chance
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    
+    os.replace(new_path, SEAT_DB_PATH)
+    link_shortlist_options(relink=True)
+    return version
+
+
+def get_jee_data():
+    """Get JEE seats data (kept in memory and refreshed with admin deltas)"""
+    from seat_cache import seat_data_cache
+    return seat_data_cache.get()
 
 
 def debug_database():
@@ -97,12 +397,13 @@ def debug_database():
     import streamlit as st
     
     # Check if database file exists
-    db_exists = os.path.exists("jee_data.db")
+    db_exists = os.path.exists(DB_PATH)
     st.write(f"Database file exists: {db_exists}")
+    st.write(f"Seat database file exists: {os.path.exists(SEAT_DB_PATH)}")
     
     if db_exists:
         # Check file size
-        file_size = os.path.getsize("jee_data.db")
+        file_size = os.path.getsize(DB_PATH)
         st.write(f"Database file size: {file_size} bytes")
         
         # Check if users table exists and has data
@@ -132,14 +433,14 @@ def debug_database():
                     st.write("No users found in database")
             
             # Check if jee_seats table exists
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='jee_seats';")
-            jee_table_exists = cursor.fetchone()
+            seat_conn = get_seat_connection()
+            jee_table_exists = seat_conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name='jee_seats';").fetchone()
             st.write(f"JEE seats table exists: {jee_table_exists is not None}")
             
             if jee_table_exists:
-                cursor.execute("SELECT COUNT(*) FROM jee_seats")
-                jee_count = cursor.fetchone()[0]
+                jee_count = seat_conn.execute("SELECT COUNT(*) FROM jee_seats").fetchone()[0]
                 st.write(f"Number of JEE seat records: {jee_count}")
+            seat_conn.close()
             
             # Check if shortlists table exists
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='shortlists';")
@@ -162,7 +463,7 @@ def debug_database():
 def check_write_permissions():
     """Check if we can write to the database directory"""
     try:
-        test_file = "test_write.tmp"
+        test_file = os.path.join(os.path.dirname(DB_PATH) or ".", "test_write.tmp")
         with open(test_file, 'w') as f:
             f.write("test")
         os.remove(test_file)
@@ -174,29 +475,12 @@ def check_write_permissions():
 def create_sample_jee_data():
     """Create sample JEE data if table is empty (for testing)"""
     try:
-        conn = get_connection()
+        conn = get_seat_connection(readonly=False)
         cursor = conn.cursor()
         
-        # Check if jee_seats table exists and is empty
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='jee_seats';")
-        if not cursor.fetchone():
-            # Create jee_seats table
-            cursor.execute("""
-                CREATE TABLE jee_seats (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    Institute TEXT,
-                    Location TEXT,
-                    Type TEXT,
-                    "Academic Program Name" TEXT,
-                    Quota TEXT,
-                    "Seat Type" TEXT,
-                    Gender TEXT,
-                    "Opening Rank" INTEGER,
-                    "Closing Rank" INTEGER,
-                    Year INTEGER
-                )
-            """)
-            
+        # Only seed an empty catalogue
+        cursor.execute("SELECT COUNT(*) FROM seat_cutoffs")
+        if cursor.fetchone()[0] == 0:
             # Insert sample data
             sample_data = [
                 ("IIT Delhi", "Delhi", "IIT", "Computer Science and Engineering", "AI", "OPEN", "Gender-Neutral", 1, 100, 2024),
@@ -210,6 +494,7 @@ def create_sample_jee_data():
                                      Gender, "Opening Rank", "Closing Rank", Year)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, sample_data)
+            refresh_seat_trends(cursor)
             
             conn.commit()
             print("✅ Sample JEE data created!")
@@ -225,26 +510,27 @@ def create_sample_jee_data():
 def verify_database_integrity():
     """Verify database integrity and fix common issues"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Check database integrity
-        cursor.execute("PRAGMA integrity_check")
-        integrity_result = cursor.fetchone()[0]
-        
-        if integrity_result != "ok":
-            print(f"⚠️ Database integrity issue: {integrity_result}")
-            return False
-        
-        # Check foreign key constraints
-        cursor.execute("PRAGMA foreign_key_check")
-        fk_violations = cursor.fetchall()
-        
-        if fk_violations:
-            print(f"⚠️ Foreign key violations found: {fk_violations}")
-            return False
+        for conn in (get_connection(), get_seat_connection()):
+            cursor = conn.cursor()
+            
+            # Check database integrity
+            cursor.execute("PRAGMA integrity_check")
+            integrity_result = cursor.fetchone()[0]
+            
+            if integrity_result != "ok":
+                print(f"⚠️ Database integrity issue: {integrity_result}")
+                return False
+            
+            # Check foreign key constraints
+            cursor.execute("PRAGMA foreign_key_check")
+            fk_violations = cursor.fetchall()
+            
+            if fk_violations:
+                print(f"⚠️ Foreign key violations found: {fk_violations}")
+                return False
+            
+            conn.close()
         
-        conn.close()
         print("✅ Database integrity verified!")
         return True
         
@@ -261,8 +547,14 @@ def initialize_database():
         if not setup_user_tables():
             return False
         
-        # Create sample JEE data if needed
-        create_sample_jee_data()
+        # Seat data lives in its own file; carry over data from older single-file setups
+        migrate_seat_data()
+        setup_seat_meta_table()
+        
+        # Create sample JEE data for brand new seat databases
+        if setup_seat_schema() == 'created':
+            create_sample_jee_data()
+        link_shortlist_options()
         
         # Verify database integrity
         verify_database_integrity()
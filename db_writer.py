@@ -0,0 +1,219 @@
+# db_writer.py - Single writer thread with group commit for database writes
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from database import attach_seat_database, get_connection, get_seat_connection
+from metrics import span
+
+
+# Busy handling: SQLite waits this long for a lock before we retry the whole batch
+WRITE_BUSY_TIMEOUT_MS = 5000
+WRITE_RETRIES = 5
+WRITE_RETRY_BACKOFF = 0.05
+
+# Group commit: up to this many queued writes share one transaction
+WRITE_MAX_BATCH = 128
+WRITE_BATCH_WINDOW = 0.002
+
+
+def _is_busy_error(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class DatabaseWriter:
+    """Serializes writes through one connection and commits concurrent requests together"""
+
+    def __init__(self, connect=get_connection, name="db-writer"):
+        self._connect = connect
+        self._name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.last_write_at = 0.0
+        self.stats = {'batches': 0, 'writes': 0, 'retries': 0, 'failures': 0}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args, attach_seats=False, **kwargs):
+        """
+        Queue a write
+
+        Args:
+            fn: Callable run on the writer thread as fn(cursor, *args, **kwargs)
+            attach_seats (bool): fn reads the seat database as schema 'seats'; it is
+                attached for that batch only, so other writes never lock the seat file
+
+        Returns:
+            concurrent.futures.Future: Resolves to fn's return value once committed
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((fn, args, kwargs, future, attach_seats))
+        return future
+
+    def execute(self, sql, params=()):
+        """Queue a single statement; the future resolves to its rowcount"""
+        def _execute(cursor):
+            cursor.execute(sql, params)
+            return cursor.rowcount
+        return self.submit(_execute)
+
+    def stop(self):
+        """Flush pending writes and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=10)
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + WRITE_BATCH_WINDOW
+        while len(batch) < WRITE_MAX_BATCH:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _open(self):
+        conn = self._connect()
+        # Manage transactions explicitly so a batch is one BEGIN ... COMMIT
+        conn.isolation_level = None
+        conn.execute(f"PRAGMA busy_timeout = {WRITE_BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _run(self):
+        conn = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [entry for entry in self._collect_batch(item) if entry[3].set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                if conn is None:
+                    try:
+                        conn = self._open()
+                    except Exception as e:
+                        for entry in batch:
+                            entry[3].set_exception(e)
+                        continue
+                self._commit_batch(conn, batch)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _commit_batch(self, conn, batch):
+        # Attached per batch: a fresh ATTACH also picks up a newly published seat file
+        attach_seats = any(entry[4] for entry in batch)
+        if attach_seats:
+            try:
+                attach_seat_database(conn)
+            except Exception as e:
+                self.stats['failures'] += 1
+                for entry in batch:
+                    entry[3].set_exception(e)
+                return
+        try:
+            self._commit_attached(conn, batch)
+        finally:
+            if attach_seats:
+                conn.execute("DETACH DATABASE seats")
+
+    def _commit_attached(self, conn, batch):
+        for attempt in range(WRITE_RETRIES + 1):
+            cursor = conn.cursor()
+            results = []
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                for fn, args, kwargs, _, _ in batch:
+                    # A savepoint per write keeps one failure from aborting the group
+                    cursor.execute("SAVEPOINT batch_write")
+                    try:
+                        results.append((True, fn(cursor, *args, **kwargs)))
+                        cursor.execute("RELEASE batch_write")
+                    except sqlite3.OperationalError as e:
+                        if _is_busy_error(e):
+                            raise
+                        cursor.execute("ROLLBACK TO batch_write")
+                        cursor.execute("RELEASE batch_write")
+                        results.append((False, e))
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO batch_write")
+                        cursor.execute("RELEASE batch_write")
+                        results.append((False, e))
+                cursor.execute("COMMIT")
+                break
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if _is_busy_error(e) and attempt < WRITE_RETRIES:
+                    self.stats['retries'] += 1
+                    time.sleep(WRITE_RETRY_BACKOFF * (2 ** attempt))
+                    continue
+                self.stats['failures'] += 1
+                for entry in batch:
+                    entry[3].set_exception(e)
+                return
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                self.stats['failures'] += 1
+                for entry in batch:
+                    entry[3].set_exception(e)
+                return
+
+        self.stats['batches'] += 1
+        self.stats['writes'] += len(batch)
+        self.last_write_at = time.time()
+        for (_, _, _, future, _), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_writer = DatabaseWriter()
+atexit.register(_writer.stop)
+
+# Admin writes to the seat catalogue have their own file and therefore their own writer
+_seat_writer = DatabaseWriter(connect=lambda: get_seat_connection(readonly=False), name="seat-db-writer")
+atexit.register(_seat_writer.stop)
+
+
+def get_db_writer():
+    """The process-wide writer for the main database"""
+    return _writer
+
+
+def get_seat_db_writer():
+    """The process-wide writer for the seat database"""
+    return _seat_writer
+
+
+def run_write(fn, *args, timeout=30, attach_seats=False, **kwargs):
+    """Run fn(cursor, *args) on the writer thread and wait for it to commit"""
+    with span("db.write"):
+        return _writer.submit(fn, *args, attach_seats=attach_seats, **kwargs).result(timeout=timeout)
+
+
+def run_seat_write(fn, *args, timeout=600, **kwargs):
+    """Run fn(cursor, *args) against the seat database and wait for it to commit"""
+    with span("db.seat_write"):
+        return _seat_writer.submit(fn, *args, **kwargs).result(timeout=timeout)
@@ -1,13 +1,17 @@
 import sqlite3
+from database import mark_seat_data_reloaded, SEAT_DB_PATH
 
 # Connect to the database
-conn = sqlite3.connect("jee_data.db")
+conn = sqlite3.connect(SEAT_DB_PATH)
 cursor = conn.cursor()
 
 # Delete rows where Gender column is exactly "Gender"
 cursor.execute("DELETE FROM jee_seats WHERE Gender = 'Gender'")
 conn.commit()
 
+# Tell running app instances to reload seat data
+mark_seat_data_reloaded(conn)
+
 # Optional: Check how many rows are left
 cursor.execute("SELECT COUNT(*) FROM jee_seats")
 row_count = cursor.fetchone()[0]
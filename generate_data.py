@@ -0,0 +1,514 @@
+# generate_data.py - Deterministic synthetic JoSAA-style data at any scale
+#
+# Usage:
+#   python generate_data.py --rows 100000                       # seats + users in ./synthetic_data
+#   python generate_data.py --rows 5000000 --rounds 6 --no-csv  # streamed, constant memory
+#   python generate_data.py --rows 20000 --users 0 --seed 7
+#
+# Point the app at the output with JEE_DB_PATH / JEE_SEAT_DB_PATH.
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# (name, city) per institute type, roughly in order of how competitive they are
+INSTITUTES = {
+    "IIT": [
+        ("Indian Institute of Technology Bombay", "Mumbai"), ("Indian Institute of Technology Delhi", "Delhi"),
+        ("Indian Institute of Technology Madras", "Chennai"), ("Indian Institute of Technology Kanpur", "Kanpur"),
+        ("Indian Institute of Technology Kharagpur", "Kharagpur"), ("Indian Institute of Technology Roorkee", "Roorkee"),
+        ("Indian Institute of Technology Guwahati", "Guwahati"), ("Indian Institute of Technology Hyderabad", "Hyderabad"),
+        ("Indian Institute of Technology (BHU) Varanasi", "Varanasi"), ("Indian Institute of Technology (ISM) Dhanbad", "Dhanbad"),
+        ("Indian Institute of Technology Indore", "Indore"), ("Indian Institute of Technology Gandhinagar", "Gandhinagar"),
+        ("Indian Institute of Technology Ropar", "Ropar"), ("Indian Institute of Technology Mandi", "Mandi"),
+        ("Indian Institute of Technology Patna", "Patna"), ("Indian Institute of Technology Bhubaneswar", "Bhubaneswar"),
+        ("Indian Institute of Technology Jodhpur", "Jodhpur"), ("Indian Institute of Technology Tirupati", "Tirupati"),
+        ("Indian Institute of Technology Palakkad", "Palakkad"), ("Indian Institute of Technology Jammu", "Jammu"),
+        ("Indian Institute of Technology Dharwad", "Dharwad"), ("Indian Institute of Technology Bhilai", "Bhilai"),
+        ("Indian Institute of Technology Goa", "Goa"),
+    ],
+    "NIT": [
+        ("National Institute of Technology, Tiruchirappalli", "Tiruchirappalli"),
+        ("National Institute of Technology Karnataka, Surathkal", "Surathkal"),
+        ("National Institute of Technology, Warangal", "Warangal"),
+        ("Motilal Nehru National Institute of Technology Allahabad", "Prayagraj"),
+        ("National Institute of Technology, Rourkela", "Rourkela"),
+        ("National Institute of Technology Calicut", "Kozhikode"),
+        ("Visvesvaraya National Institute of Technology, Nagpur", "Nagpur"),
+        ("Malaviya National Institute of Technology Jaipur", "Jaipur"),
+        ("Sardar Vallabhbhai National Institute of Technology, Surat", "Surat"),
+        ("National Institute of Technology, Kurukshetra", "Kurukshetra"),
+        ("Maulana Azad National Institute of Technology Bhopal", "Bhopal"),
+        ("National Institute of Technology Delhi", "Delhi"),
+        ("National Institute of Technology, Jamshedpur", "Jamshedpur"),
+        ("National Institute of Technology Durgapur", "Durgapur"),
+        ("National Institute of Technology, Silchar", "Silchar"),
+        ("Dr. B R Ambedkar National Institute of Technology, Jalandhar", "Jalandhar"),
+        ("National Institute of Technology Hamirpur", "Hamirpur"),
+        ("National Institute of Technology Patna", "Patna"),
+        ("National Institute of Technology, Raipur", "Raipur"),
+        ("National Institute of Technology Goa", "Goa"),
+        ("National Institute of Technology Puducherry", "Karaikal"),
+        ("National Institute of Technology, Srinagar", "Srinagar"),
+        ("National Institute of Technology, Uttarakhand", "Srinagar Garhwal"),
+        ("National Institute of Technology, Andhra Pradesh", "Tadepalligudem"),
+        ("National Institute of Technology Agartala", "Agartala"),
+        ("National Institute of Technology Meghalaya", "Shillong"),
+        ("National Institute of Technology, Manipur", "Imphal"),
+        ("National Institute of Technology, Mizoram", "Aizawl"),
+        ("National Institute of Technology Nagaland", "Dimapur"),
+        ("National Institute of Technology Sikkim", "Ravangla"),
+        ("National Institute of Technology Arunachal Pradesh", "Jote"),
+    ],
+    "IIIT": [
+        ("Indian Institute of Information Technology, Allahabad", "Prayagraj"),
+        ("Atal Bihari Vajpayee Indian Institute of Information Technology & Management Gwalior", "Gwalior"),
+        ("Indian Institute of Information Technology, Design & Manufacturing, Jabalpur", "Jabalpur"),
+        ("Indian Institute of Information Technology Design & Manufacturing Kancheepuram", "Chennai"),
+        ("Indian Institute of Information Technology Guwahati", "Guwahati"),
+        ("Indian Institute of Information Technology Lucknow", "Lucknow"),
+        ("Indian Institute of Information Technology (IIIT) Pune", "Pune"),
+        ("Indian Institute of Information Technology (IIIT) Nagpur", "Nagpur"),
+        ("Indian Institute of Information Technology Sri City, Chittoor", "Sri City"),
+        ("Indian Institute of Information Technology Vadodara", "Gandhinagar"),
+        ("Indian Institute of Information Technology Kota", "Kota"),
+        ("Indian Institute of Information Technology(IIIT) Dharwad", "Dharwad"),
+        ("Indian Institute of Information Technology Kottayam", "Kottayam"),
+        ("Indian Institute of Information Technology (IIIT) Ranchi", "Ranchi"),
+        ("Indian Institute of Information Technology Surat", "Surat"),
+        ("Indian Institute of Information Technology Bhopal", "Bhopal"),
+        ("Indian Institute of Information Technology Bhagalpur", "Bhagalpur"),
+        ("Indian Institute of Information Technology Manipur", "Imphal"),
+        ("Indian Institute of Information Technology Sonepat", "Sonepat"),
+        ("Indian Institute of Information Technology Una", "Una"),
+        ("Indian Institute of Information Technology Tiruchirappalli", "Tiruchirappalli"),
+        ("Indian Institute of Information Technology (IIIT) Kalyani", "Kalyani"),
+        ("Indian Institute of Information Technology(IIIT) Kilohrad, Sonepat", "Sonepat"),
+        ("Indian Institute of Information Technology Raichur", "Raichur"),
+        ("Indian Institute of Information Technology Agartala", "Agartala"),
+        ("Indian Institute of Information Technology, Vadodara International Campus Diu", "Diu"),
+    ],
+    "GFTI": [
+        ("Punjab Engineering College, Chandigarh", "Chandigarh"),
+        ("Birla Institute of Technology, Mesra, Ranchi", "Ranchi"),
+        ("Institute of Chemical Technology, Mumbai: Indian Oil Odisha Campus, Bhubaneswar", "Bhubaneswar"),
+        ("Jawaharlal Nehru University, Delhi", "Delhi"),
+        ("Indian Institute of Engineering Science and Technology, Shibpur", "Howrah"),
+        ("School of Planning & Architecture, New Delhi", "Delhi"),
+        ("Assam University, Silchar", "Silchar"),
+        ("Central University of Rajasthan, Rajasthan", "Ajmer"),
+        ("Gurukula Kangri Vishwavidyalaya, Haridwar", "Haridwar"),
+        ("Indian Institute of Carpet Technology, Bhadohi", "Bhadohi"),
+        ("Institute of Infrastructure, Technology, Research and Management-Ahmedabad", "Ahmedabad"),
+        ("Mizoram University, Aizawl", "Aizawl"),
+        ("National Institute of Food Technology Entrepreneurship and Management, Kundli", "Sonepat"),
+        ("Sant Longowal Institute of Engineering and Technology", "Longowal"),
+        ("Shri Mata Vaishno Devi University, Katra, Jammu & Kashmir", "Katra"),
+        ("Tezpur University, Napaam, Tezpur", "Tezpur"),
+        ("University of Hyderabad", "Hyderabad"),
+        ("Chhattisgarh Swami Vivekanada Technical University, Bhilai", "Bhilai"),
+        ("Ghani Khan Choudhary Institute of Engineering and Technology, Malda", "Malda"),
+        ("Central institute of Technology Kokrajar, Assam", "Kokrajhar"),
+    ],
+}
+
+# Prestige range per type, spread across the ordered lists above
+TYPE_PRESTIGE = {"IIT": (0.72, 1.0), "NIT": (0.42, 0.80), "IIIT": (0.35, 0.78), "GFTI": (0.05, 0.50)}
+
+# Typical number of programs offered per institute type (min, max)
+TYPE_PROGRAM_COUNT = {"IIT": (8, 26), "NIT": (7, 16), "IIIT": (2, 6), "GFTI": (2, 9)}
+
+# Quotas offered per type; state institutes fill seats through home/other state quotas
+TYPE_QUOTAS = {"IIT": ["AI"], "NIT": ["HS", "OS"], "IIIT": ["AI"], "GFTI": ["HS", "OS"]}
+
+# (program name, popularity) in JoSAA naming style
+PROGRAMS = [
+    ("Computer Science and Engineering (4 Years, Bachelor of Technology)", 1.00),
+    ("Artificial Intelligence and Data Science (4 Years, Bachelor of Technology)", 0.95),
+    ("Mathematics and Computing (4 Years, Bachelor of Technology)", 0.93),
+    ("Electronics and Communication Engineering (4 Years, Bachelor of Technology)", 0.85),
+    ("Electrical Engineering (4 Years, Bachelor of Technology)", 0.78),
+    ("Electronics and VLSI Engineering (4 Years, Bachelor of Technology)", 0.76),
+    ("Information Technology (4 Years, Bachelor of Technology)", 0.82),
+    ("Engineering Physics (4 Years, Bachelor of Technology)", 0.60),
+    ("Mechanical Engineering (4 Years, Bachelor of Technology)", 0.58),
+    ("Chemical Engineering (4 Years, Bachelor of Technology)", 0.48),
+    ("Aerospace Engineering (4 Years, Bachelor of Technology)", 0.55),
+    ("Civil Engineering (4 Years, Bachelor of Technology)", 0.40),
+    ("Instrumentation and Control Engineering (4 Years, Bachelor of Technology)", 0.45),
+    ("Production and Industrial Engineering (4 Years, Bachelor of Technology)", 0.33),
+    ("Metallurgical and Materials Engineering (4 Years, Bachelor of Technology)", 0.30),
+    ("Biotechnology (4 Years, Bachelor of Technology)", 0.28),
+    ("Mining Engineering (4 Years, Bachelor of Technology)", 0.20),
+    ("Ceramic Engineering (4 Years, Bachelor of Technology)", 0.15),
+    ("Textile Technology (4 Years, Bachelor of Technology)", 0.12),
+    ("Architecture (5 Years, Bachelor of Architecture)", 0.25),
+    ("Chemistry (5 Years, Bachelor of Science and Master of Science (Dual Degree))", 0.22),
+    ("Physics (5 Years, Bachelor of Science and Master of Science (Dual Degree))", 0.26),
+    ("Computer Science and Engineering (5 Years, Bachelor and Master of Technology (Dual Degree))", 0.90),
+    ("Electrical Engineering (5 Years, Bachelor and Master of Technology (Dual Degree))", 0.70),
+]
+
+# Category ranks are separate, shorter merit lists; PwD lists shorter still
+SEAT_TYPES = [
+    ("OPEN", 1.0), ("OPEN (PwD)", 0.03), ("EWS", 0.17), ("EWS (PwD)", 0.006),
+    ("OBC-NCL", 0.33), ("OBC-NCL (PwD)", 0.012), ("SC", 0.16), ("SC (PwD)", 0.005),
+    ("ST", 0.08), ("ST (PwD)", 0.003),
+]
+GENDERS = [("Gender-Neutral", 1.0), ("Female-only (including Supernumerary)", 1.7)]
+QUOTA_FACTORS = {"AI": 1.0, "HS": 1.35, "OS": 0.95}
+
+# Closing rank range for OPEN, Gender-Neutral seats in the first year
+BEST_CLOSING_RANK = 50
+WORST_CLOSING_RANK = 1_000_000
+
+# Closing ranks drift up each year and each later round
+YEAR_DRIFT = 1.04
+ROUND_DRIFT = 0.07
+
+SEAT_CSV_COLUMNS = [
+    'Institute', 'Location', 'Type', 'Academic Program Name', 'Quota',
+    'Seat Type', 'Gender', 'Opening Rank', 'Closing Rank', 'Year', 'Round'
+]
+
+DEFAULT_OUT_DIR = "synthetic_data"
+
+
+def _institute_table(copies):
+    """Flatten INSTITUTES, adding numbered extra campuses when more options are needed"""
+    names, cities, types, prestige = [], [], [], []
+    for copy in range(copies):
+        for inst_type, entries in INSTITUTES.items():
+            low, high = TYPE_PRESTIGE[inst_type]
+            for i, (name, city) in enumerate(entries):
+                names.append(name if copy == 0 else f"{name} (Campus {copy + 1})")
+                cities.append(city)
+                types.append(inst_type)
+                # Extra campuses are a little less sought after than the original
+                prestige.append(high - (high - low) * i / max(len(entries) - 1, 1) - 0.03 * copy)
+    return np.array(names, dtype=object), np.array(cities, dtype=object), np.array(types, dtype=object), np.array(prestige)
+
+
+def build_catalogue(n_options, seed=0):
+    """
+    Build the set of seat options (one row per institute, program, quota, seat type and gender)
+
+    Whole institute/program pairs are kept together so every sampled program has
+    its full quota, seat type and gender matrix, like the real seat matrix.
+
+    Args:
+        n_options (int): Options wanted per year and round
+        seed (int): Random seed
+
+    Returns:
+        dict: Integer-coded option arrays plus the lookup tables to decode them
+    """
+    rng = np.random.default_rng([seed, 0])
+    program_names = np.array([name for name, _ in PROGRAMS], dtype=object)
+    popularity = np.array([pop for _, pop in PROGRAMS])
+    seat_factor = np.array([factor for _, factor in SEAT_TYPES])
+    gender_factor = np.array([factor for _, factor in GENDERS])
+
+    copies = 1
+    while True:
+        names, cities, types, prestige = _institute_table(copies)
+        pair_inst, pair_prog, pair_quotas = [], [], []
+        for i, inst_type in enumerate(types):
+            low, high = TYPE_PROGRAM_COUNT[inst_type]
+            count = rng.integers(low, high + 1)
+            # Popular programs are offered almost everywhere; CSE always is
+            weights = popularity / popularity.sum()
+            chosen = rng.choice(len(PROGRAMS), size=min(count, len(PROGRAMS)), replace=False, p=weights)
+            chosen = np.union1d(chosen, [0])
+            pair_inst.extend([i] * len(chosen))
+            pair_prog.extend(chosen.tolist())
+            pair_quotas.extend([TYPE_QUOTAS[inst_type]] * len(chosen))
+        pair_sizes = np.array([len(q) * len(SEAT_TYPES) * len(GENDERS) for q in pair_quotas])
+        if pair_sizes.sum() >= n_options:
+            break
+        copies += 1
+
+    # Take a random subset of whole pairs, then restore catalogue order
+    order = rng.permutation(len(pair_sizes))
+    keep = np.sort(order[:np.searchsorted(np.cumsum(pair_sizes[order]), n_options) + 1])
+
+    quota_names = np.array(list(QUOTA_FACTORS), dtype=object)
+    inst_col, prog_col, quota_col, seat_col, gender_col = [], [], [], [], []
+    for p in keep:
+        for quota in pair_quotas[p]:
+            q = list(QUOTA_FACTORS).index(quota)
+            for s in range(len(SEAT_TYPES)):
+                for g in range(len(GENDERS)):
+                    inst_col.append(pair_inst[p])
+                    prog_col.append(pair_prog[p])
+                    quota_col.append(q)
+                    seat_col.append(s)
+                    gender_col.append(g)
+
+    inst = np.array(inst_col[:n_options], dtype=np.int32)
+    prog = np.array(prog_col[:n_options], dtype=np.int16)
+    quota = np.array(quota_col[:n_options], dtype=np.int8)
+    seat = np.array(seat_col[:n_options], dtype=np.int8)
+    gender = np.array(gender_col[:n_options], dtype=np.int8)
+
+    # Desirability combines institute prestige and program popularity
+    desirability = 0.65 * prestige[inst] + 0.35 * popularity[prog] + rng.normal(0, 0.04, len(inst))
+    desirability = np.clip(desirability, 0.0, 1.0)
+    log_best, log_worst = math.log(BEST_CLOSING_RANK), math.log(WORST_CLOSING_RANK)
+    base_close = np.exp(log_best + (1 - desirability) ** 0.7 * (log_worst - log_best))
+    base_close *= seat_factor[seat] * gender_factor[gender]
+    base_close *= np.array([QUOTA_FACTORS[q] for q in quota_names])[quota]
+
+    return {
+        "inst": inst,
+        "prog": prog,
+        "quota": quota,
+        "seat": seat,
+        "gender": gender,
+        "base_close": base_close,
+        # Where the opening rank sits below the closing rank, stable across years
+        "open_ratio": 1 - rng.beta(2, 3, len(inst)) * 0.9,
+        "institutes": names,
+        "cities": cities,
+        "types": types,
+        "programs": program_names,
+        "quotas": quota_names,
+        "seat_types": np.array([name for name, _ in SEAT_TYPES], dtype=object),
+        "genders": np.array([name for name, _ in GENDERS], dtype=object),
+    }
+
+
+def closing_ranks(catalogue, year_index, round_no, seed=0):
+    """Opening and closing ranks of every option for one year and round"""
+    # Year noise is shared by all rounds so closing ranks only rise within a year
+    rng = np.random.default_rng([seed, 1, year_index])
+    noise = rng.lognormal(0.0, 0.10, len(catalogue["base_close"]))
+    closing = catalogue["base_close"] * noise * YEAR_DRIFT ** year_index * (1 + ROUND_DRIFT * (round_no - 1))
+    closing = np.maximum(np.rint(closing), 1).astype(np.int64)
+    opening = np.maximum(np.floor(closing * catalogue["open_ratio"]), 1).astype(np.int64)
+    return opening, closing
+
+
+def _decode(catalogue, rows, opening, closing, year, round_no):
+    inst = catalogue["inst"][rows]
+    return pd.DataFrame({
+        "Institute": catalogue["institutes"][inst],
+        "Location": catalogue["cities"][inst],
+        "Type": catalogue["types"][inst],
+        "Academic Program Name": catalogue["programs"][catalogue["prog"][rows]],
+        "Quota": catalogue["quotas"][catalogue["quota"][rows]],
+        "Seat Type": catalogue["seat_types"][catalogue["seat"][rows]],
+        "Gender": catalogue["genders"][catalogue["gender"][rows]],
+        "Opening Rank": opening[rows],
+        "Closing Rank": closing[rows],
+        "Year": year,
+        "Round": round_no,
+    }, columns=SEAT_CSV_COLUMNS)
+
+
+def iter_seat_chunks(n_rows, seed=0, first_year=2020, years=5, rounds=1, chunk_size=100_000, catalogue=None):
+    """
+    Stream synthetic jee_seats rows as DataFrames of at most chunk_size rows
+
+    Rows are spread evenly over years x rounds, so memory stays proportional to
+    the number of options per round rather than the total row count.
+
+    Yields:
+        pandas.DataFrame: Rows in the seat CSV ingest format
+    """
+    slices = years * rounds
+    if catalogue is None:
+        catalogue = build_catalogue(math.ceil(n_rows / slices), seed)
+    n_options = len(catalogue["inst"])
+
+    remaining = n_rows
+    for year_index in range(years):
+        for round_no in range(1, rounds + 1):
+            opening, closing = closing_ranks(catalogue, year_index, round_no, seed)
+            for start in range(0, min(n_options, remaining), chunk_size):
+                stop = min(start + chunk_size, n_options, remaining)
+                rows = np.arange(start, stop)
+                yield _decode(catalogue, rows, opening, closing, first_year + year_index, round_no)
+            remaining -= min(n_options, remaining)
+            if remaining <= 0:
+                return
+
+
+def write_seats(chunks, conn=None, csv_path=None):
+    """
+    Write streamed seat chunks to the normalized seat tables and/or an ingest CSV
+
+    The seat tables are recreated. The caller commits and calls mark_seat_data_reloaded(),
+    which also rebuilds the trend table.
+
+    Returns:
+        int: Rows written
+    """
+    from seat_schema import drop_seat_schema, ensure_seat_schema, load_staged_seats, stage_seat_rows
+
+    if conn is not None:
+        cursor = conn.cursor()
+        drop_seat_schema(cursor)
+        ensure_seat_schema(cursor)
+
+    total = 0
+    for i, chunk in enumerate(chunks):
+        if conn is not None:
+            staging = stage_seat_rows(cursor, chunk)
+            load_staged_seats(cursor, staging)
+            cursor.execute(f"DROP TABLE {staging}")
+        if csv_path is not None:
+            chunk.to_csv(csv_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        total += len(chunk)
+    return total
+
+
+def write_synthetic_users(conn, catalogue, n_users, seed=0, last_year_index=0, last_round=1,
+                          shortlist_mean=15, shortlist_max=60, chunk_size=10_000):
+    """
+    Insert synthetic users with shortlists of plausible options for their rank
+
+    Earlier synthetic users (username 'synthetic_*') are replaced. Every user's
+    password is 'password'.
+
+    Returns:
+        tuple: (users created, shortlist items created)
+    """
+    from database import hash_password
+
+    rng = np.random.default_rng([seed, 2])
+    _, closing = closing_ranks(catalogue, last_year_index, last_round, seed)
+
+    # Options grouped by (seat type, gender) and sorted by closing rank for window lookups
+    group_key = catalogue["seat"].astype(np.int64) * len(GENDERS) + catalogue["gender"]
+    order = np.lexsort((closing, group_key))
+    sorted_keys = group_key[order]
+    sorted_closing = closing[order]
+    group_starts = np.searchsorted(sorted_keys, np.arange(len(SEAT_TYPES) * len(GENDERS) + 1))
+
+    seat_weights = np.array([0.42, 0.01, 0.10, 0.002, 0.27, 0.005, 0.14, 0.003, 0.05, 0.002])
+    seat_weights = seat_weights / seat_weights.sum()
+    password_hash = hash_password("password")
+
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM shortlists WHERE user_id IN (SELECT id FROM users WHERE username LIKE 'synthetic\\_%' ESCAPE '\\')")
+    cursor.execute("DELETE FROM users WHERE username LIKE 'synthetic\\_%' ESCAPE '\\'")
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+    next_id = cursor.fetchone()[0] + 1
+
+    users_created = items_created = 0
+    for start in range(0, n_users, chunk_size):
+        count = min(chunk_size, n_users - start)
+        user_ids = np.arange(next_id + start, next_id + start + count)
+        cursor.executemany(
+            "INSERT INTO users (id, username, email, password_hash) VALUES (?, ?, ?, ?)",
+            ((int(uid), f"synthetic_{start + i:07d}", f"synthetic_{start + i:07d}@example.com", password_hash)
+             for i, uid in enumerate(user_ids))
+        )
+
+        ranks = np.exp(rng.uniform(math.log(1), math.log(WORST_CLOSING_RANK), count))
+        seats = rng.choice(len(SEAT_TYPES), count, p=seat_weights)
+        seat_rank_factor = np.array([factor for _, factor in SEAT_TYPES])[seats]
+        ranks = np.maximum(ranks * seat_rank_factor, 1)
+        female = rng.random(count) < 0.3
+        genders = np.where(female & (rng.random(count) < 0.6), 1, 0)
+        sizes = np.clip(rng.poisson(shortlist_mean, count), 1, shortlist_max)
+
+        items = []
+        for uid, rank, s, g, size in zip(user_ids, ranks, seats, genders, sizes):
+            key = s * len(GENDERS) + g
+            lo_group, hi_group = group_starts[key], group_starts[key + 1]
+            if hi_group <= lo_group:
+                continue
+            # Options the user could realistically get: closing rank from 0.8x to 3x their rank
+            group_closing = sorted_closing[lo_group:hi_group]
+            lo = lo_group + np.searchsorted(group_closing, 0.8 * rank)
+            hi = lo_group + np.searchsorted(group_closing, 3 * rank)
+            if hi - lo < size:
+                lo, hi = max(lo_group, lo - size), min(hi_group, hi + size)
+            picks = order[rng.choice(np.arange(lo, hi), size=min(size, hi - lo), replace=False)]
+            picks = picks[np.argsort(closing[picks], kind="stable")]
+            for priority, option in enumerate(picks, start=1):
+                items.append((
+                    int(uid),
+                    catalogue["institutes"][catalogue["inst"][option]],
+                    catalogue["programs"][catalogue["prog"][option]],
+                    int(closing[option]),
+                    catalogue["seat_types"][catalogue["seat"][option]],
+                    catalogue["quotas"][catalogue["quota"][option]],
+                    catalogue["genders"][catalogue["gender"][option]],
+                    priority,
+                ))
+        cursor.executemany("""
+            INSERT INTO shortlists (user_id, institute, program, closing_rank, seat_type, quota, gender, priority_order)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, items)
+        users_created += count
+        items_created += len(items)
+    return users_created, items_created
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic JoSAA seat data, users and shortlists")
+    parser.add_argument("--rows", type=int, default=100_000, help="Total jee_seats rows")
+    parser.add_argument("--first-year", type=int, default=2020)
+    parser.add_argument("--years", type=int, default=5, help="Number of consecutive years")
+    parser.add_argument("--rounds", type=int, default=1, help="Counselling rounds per year")
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic users with shortlists")
+    parser.add_argument("--shortlist-mean", type=float, default=15, help="Average shortlist length")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows generated and written at a time")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR, help="Directory for jee_seats.db, jee_data.db and jee_seats.csv")
+    parser.add_argument("--no-csv", action="store_true", help="Skip the ingest CSV")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    seat_db_path = os.path.join(args.out_dir, "jee_seats.db")
+    user_db_path = os.path.join(args.out_dir, "jee_data.db")
+    csv_path = None if args.no_csv else os.path.join(args.out_dir, "jee_seats.csv")
+
+    # The database module sets up its files on import, so point it at the output first
+    os.environ["JEE_DB_PATH"] = user_db_path
+    os.environ["JEE_SEAT_DB_PATH"] = seat_db_path
+    from database import get_connection, get_seat_connection, link_shortlist_options, mark_seat_data_reloaded
+
+    slices = args.years * args.rounds
+    catalogue = build_catalogue(math.ceil(args.rows / slices), args.seed)
+    print(f"📚 {len(catalogue['inst']):,} options per round across {len(np.unique(catalogue['inst'])):,} institutes")
+
+    conn = get_seat_connection(readonly=False)
+    try:
+        chunks = iter_seat_chunks(args.rows, args.seed, args.first_year, args.years, args.rounds,
+                                  args.chunk_size, catalogue=catalogue)
+        total = write_seats(chunks, conn=conn, csv_path=csv_path)
+        conn.commit()
+        mark_seat_data_reloaded(conn)
+    finally:
+        conn.close()
+    print(f"✅ {total:,} seat rows written to {seat_db_path}" + (f" and {csv_path}" if csv_path else ""))
+
+    if args.users > 0:
+        # Shortlists are drawn from the final round of the latest year generated
+        last_slice = (min(args.rows, slices * len(catalogue["inst"])) - 1) // len(catalogue["inst"])
+        last_year_index, last_round = divmod(last_slice, args.rounds)
+        conn = get_connection()
+        try:
+            users, items = write_synthetic_users(
+                conn, catalogue, args.users, args.seed, last_year_index, last_round + 1, args.shortlist_mean
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"✅ {users:,} users with {items:,} shortlist items written to {user_db_path}")
+    # The seat tables were rebuilt, so existing items need their option ids resolved again
+    link_shortlist_options(relink=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+# loadtest.py - Concurrent simulated sessions against the real app.py using Streamlit's headless AppTest
+#
+# Usage:
+#   python loadtest.py                                  # 1, 2, 4, 8 and 16 concurrent sessions
+#   python loadtest.py --concurrency 8 32 --iterations 3 --rows 100000
+#   python loadtest.py --output loadtest_results.json
+#
+# Every session runs the same flow a student would: guest search with random
+# filters, login, bulk shortlist add, reorder, notes edit and PDF export.
+# AppTest swaps a process-wide Runtime singleton on every run, so each
+# concurrent session gets its own process, like separate app workers sharing
+# the same SQLite files.
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16]
+SCENARIO_STEPS = ["guest_search", "login", "bulk_add", "reorder", "edit_notes", "pdf_export"]
+LOADTEST_PASSWORD = "loadtest-password"
+
+# AppTest waits this long for one script run; PDF polling has its own limit
+RUN_TIMEOUT = 120
+PDF_TIMEOUT = 120
+
+
+def _is_lock_error(message):
+    message = str(message).lower()
+    return "locked" in message or "busy" in message
+
+
+def _by_label(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No element labelled {label!r}")
+
+
+def _check_run(at):
+    """Raise the first exception the script hit during the last run"""
+    if len(at.exception):
+        raise RuntimeError(at.exception[0].value)
+    for error in at.error:
+        if _is_lock_error(error.value):
+            raise RuntimeError(error.value)
+
+
+class Session:
+    """One simulated browser session driving app.py through AppTest"""
+
+    def __init__(self, username, rng):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_PATH, default_timeout=RUN_TIMEOUT)
+        self.username = username
+        self.rng = rng
+
+    def _run(self):
+        self.at.run()
+        _check_run(self.at)
+
+    def guest_search(self):
+        self._run()
+        # Headless runs report no window width, so filters render in the main area
+        quota = _by_label(self.at.multiselect, "🎟️ Quota")
+        seat_type = _by_label(self.at.multiselect, "💺 Seat Type")
+        quota.set_value(self.rng.sample(quota.options, self.rng.randint(1, len(quota.options))))
+        seat_type.set_value(self.rng.sample(seat_type.options, self.rng.randint(1, min(3, len(seat_type.options)))))
+        _by_label(self.at.number_input, "Maximum Closing Rank").set_value(self.rng.choice([5_000, 20_000, 100_000, 1_000_000]))
+        self._run()
+
+    def login(self):
+        _by_label(self.at.button, "🔐 Login / Sign Up").click()
+        self._run()
+        _by_label(self.at.text_input, "Username").input(self.username)
+        _by_label(self.at.text_input, "Password").input(LOADTEST_PASSWORD)
+        _by_label(self.at.button, "🚀 Login").click()
+        self._run()
+        if not self.at.session_state["logged_in"]:
+            raise RuntimeError("Login failed")
+
+    def bulk_add(self, count=10):
+        # The data editor cannot be driven headlessly, so select rows through session state
+        # and click the add button rendered for that selection
+        selection = set(range(count))
+        for _ in range(2):
+            # The shortlist tab renders on every run and resets the search page selection
+            self.at.session_state["current_page"] = "search"
+            self.at.session_state["selected_items"] = selection
+            if _ == 0:
+                self._run()
+        _by_label(self.at.button, "⭐ Add Selected to Shortlist").click()
+        self._run()
+
+    def _shortlist_ids(self):
+        return [int(b.key.split("_", 1)[1]) for b in self.at.button if b.key and b.key.startswith("up_")]
+
+    def reorder(self):
+        ids = self._shortlist_ids()
+        if not ids:
+            raise RuntimeError("Shortlist is empty")
+        item_id = self.rng.choice(ids)
+        action = self.rng.choice(["up", "down", "top", "bottom"])
+        button = self.at.button(key=f"{action}_{item_id}")
+        if button.disabled:
+            button = self.at.button(key=f"{'down' if action in ('up', 'top') else 'up'}_{item_id}")
+        button.click()
+        self._run()
+
+    def edit_notes(self):
+        ids = self._shortlist_ids()
+        if not ids:
+            raise RuntimeError("Shortlist is empty")
+        item_id = self.rng.choice(ids)
+        self.at.text_input(key=f"notes_{item_id}").input(f"Load test note {time.time():.6f}")
+        self._run()
+
+    def pdf_export(self):
+        from pdf_jobs import make_job_id, get_pdf_job_status
+        from shortlist import get_user_shortlist
+
+        prepare = [b for b in self.at.button if b.key == "prepare_pdf_job_shortlist"]
+        if prepare:
+            prepare[0].click()
+            self._run()
+        # The progress fragment does not poll headlessly, so wait on the job directly
+        job_id = make_job_id("shortlist", get_user_shortlist(self.at.session_state["user_id"]), self.username)
+        deadline = time.monotonic() + PDF_TIMEOUT
+        while time.monotonic() < deadline:
+            status = get_pdf_job_status(job_id)
+            if status["state"] == "done":
+                return
+            if status["state"] in ("failed", "unknown"):
+                raise RuntimeError(f"PDF job {status['state']}: {status['error']}")
+            time.sleep(0.05)
+        raise TimeoutError("PDF job did not finish in time")
+
+
+def run_session(username, seed, iterations, barrier, env):
+    """
+    Worker entry point: run the full scenario iterations times
+
+    Returns:
+        dict: (step, seconds, error) records, wall-clock start/end and writer stat deltas
+    """
+    os.environ.update(env)
+    os.chdir(APP_DIR)
+    from db_writer import get_db_writer
+    from pdf_jobs import shutdown_pdf_pool
+
+    rng = random.Random(seed)
+    records = []
+    stats_before = dict(get_db_writer().stats)
+    # Start every session together so they really overlap
+    barrier.wait()
+    started = time.time()
+    for _ in range(iterations):
+        session = Session(username, rng)
+        for step in SCENARIO_STEPS:
+            start = time.perf_counter()
+            error = None
+            try:
+                getattr(session, step)()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            records.append((step, time.perf_counter() - start, error))
+            if error is not None and step in ("guest_search", "login"):
+                # Later steps need a logged-in session
+                break
+    finished = time.time()
+    get_db_writer().stop()
+    shutdown_pdf_pool()
+    stats_after = get_db_writer().stats
+    return {
+        "records": records,
+        "started": started,
+        "finished": finished,
+        "writer": {key: stats_after[key] - stats_before[key] for key in ("retries", "failures")},
+    }
+
+
+def _setup(workdir, rows, users, seed):
+    """Point the app at scratch databases, load seats and create the load test accounts"""
+    os.environ["JEE_DB_PATH"] = os.path.join(workdir, "jee_data.db")
+    os.environ["JEE_SEAT_DB_PATH"] = os.path.join(workdir, "jee_seats.db")
+    os.environ.setdefault("JEE_PDF_CACHE_DIR", os.path.join(workdir, "pdf_cache"))
+
+    import database
+    from generate_data import iter_seat_chunks, write_seats
+    from auth import create_user
+
+    conn = database.get_seat_connection(readonly=False)
+    write_seats(iter_seat_chunks(rows, seed), conn=conn)
+    conn.commit()
+    database.mark_seat_data_reloaded(conn)
+    conn.close()
+
+    usernames = [f"loadtest_{i:04d}" for i in range(users)]
+    for username in usernames:
+        create_user(username, f"{username}@example.com", LOADTEST_PASSWORD)
+    return usernames
+
+
+def _percentiles(samples):
+    values = np.array(samples) * 1000
+    return {
+        "count": len(values),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def run_level(concurrency, usernames, iterations, seed):
+    """Run concurrency sessions at once and summarise throughput, latency and errors"""
+    env = {key: os.environ[key] for key in ("JEE_DB_PATH", "JEE_SEAT_DB_PATH", "JEE_PDF_CACHE_DIR")}
+    # Bare-mode warnings from every worker would drown the report
+    env["STREAMLIT_LOGGER_LEVEL"] = "error"
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        barrier = manager.Barrier(concurrency)
+        with ProcessPoolExecutor(max_workers=concurrency, mp_context=context) as pool:
+            futures = [
+                pool.submit(run_session, usernames[i], seed * 1000 + i, iterations, barrier, env)
+                for i in range(concurrency)
+            ]
+            results = [future.result() for future in futures]
+
+    samples = {step: [] for step in SCENARIO_STEPS}
+    errors = []
+    for result in results:
+        for step, seconds, error in result["records"]:
+            samples[step].append(seconds)
+            if error is not None:
+                errors.append({"step": step, "error": error})
+    elapsed = max(r["finished"] for r in results) - min(r["started"] for r in results)
+
+    completed = sum(len(v) for v in samples.values())
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "steps": completed,
+        "throughput_steps_per_s": completed / elapsed if elapsed else 0.0,
+        "scenarios_per_s": concurrency * iterations / elapsed if elapsed else 0.0,
+        "latency": {step: _percentiles(values) for step, values in samples.items() if values},
+        "errors": len(errors),
+        "lock_errors": sum(1 for e in errors if _is_lock_error(e["error"])),
+        "writer_retries": sum(r["writer"]["retries"] for r in results),
+        "writer_failures": sum(r["writer"]["failures"] for r in results),
+        "error_samples": errors[:10],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test app.py with concurrent headless sessions")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY, help="Concurrent sessions per level")
+    parser.add_argument("--iterations", type=int, default=1, help="Scenarios each session runs per level")
+    parser.add_argument("--rows", type=int, default=20_000, help="Synthetic seat rows to load")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    # app.py loads styles and emoji images relative to its own directory
+    os.chdir(APP_DIR)
+    workdir = tempfile.mkdtemp(prefix="jee-loadtest-")
+    # Fresh accounts for every level so shortlists start empty
+    usernames = _setup(workdir, args.rows, sum(args.concurrency), args.seed)
+    from db_writer import get_db_writer
+    get_db_writer().stop()
+
+    levels = []
+    offset = 0
+    for concurrency in args.concurrency:
+        print(f"🚦 {concurrency} concurrent sessions...")
+        level = run_level(concurrency, usernames[offset:offset + concurrency], args.iterations, args.seed)
+        offset += concurrency
+        levels.append(level)
+        print(
+            f"   {level['throughput_steps_per_s']:.2f} steps/s, {level['scenarios_per_s']:.2f} scenarios/s, "
+            f"{level['errors']} errors ({level['lock_errors']} lock errors, {level['writer_retries']} writer retries)"
+        )
+        for step, stats in level["latency"].items():
+            print(f"   {step:<14} p50 {stats['p50_ms']:8.1f} ms   p95 {stats['p95_ms']:8.1f} ms   p99 {stats['p99_ms']:8.1f} ms")
+        for sample in level["error_samples"][:3]:
+            print(f"   ⚠️ {sample['step']}: {sample['error']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "iterations": args.iterations, "levels": levels}, f, indent=2)
+    return 1 if any(level["lock_errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
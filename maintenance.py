@@ -0,0 +1,238 @@
+# maintenance.py - ANALYZE, WAL checkpoints and incremental vacuum for both databases
+#
+# Usage:
+#   python maintenance.py                            # analyze, checkpoint and vacuum both databases
+#   python maintenance.py --db user --full-analyze
+#   python maintenance.py --enable-incremental-vacuum   # one-off full VACUUM for files created before auto_vacuum
+#
+# The app runs the same steps in the background when JEE_MAINTENANCE_INTERVAL
+# is set, but only once no write has been committed for
+# JEE_MAINTENANCE_QUIET_SECONDS so a checkpoint never competes with users.
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import database
+from db_writer import get_db_writer, get_seat_db_writer, run_write, run_seat_write
+from metrics import span
+
+
+# Seconds between scheduled runs (0 disables the background scheduler)
+MAINTENANCE_INTERVAL = float(os.environ.get("JEE_MAINTENANCE_INTERVAL", 0))
+MAINTENANCE_QUIET_SECONDS = float(os.environ.get("JEE_MAINTENANCE_QUIET_SECONDS", 60))
+
+# Rows ANALYZE samples per index (0 = read everything); keeps big tables cheap to analyze
+ANALYSIS_LIMIT = int(os.environ.get("JEE_ANALYSIS_LIMIT", 1000))
+
+# Free pages returned to the OS per run (0 = all)
+VACUUM_MAX_PAGES = int(os.environ.get("JEE_VACUUM_MAX_PAGES", 0))
+
+CHECKPOINT_BUSY_TIMEOUT_MS = 2000
+
+# Tables that swing from empty to large between runs: statistics taken while they are
+# small would make the planner scan them, so they are left to the default estimates
+VOLATILE_TABLES = {"user": (), "seat": ("seat_changes",)}
+
+_last_report = {"finished_at": None, "steps": []}
+_report_lock = threading.Lock()
+
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _sizes(path):
+    return {"db_bytes": _file_size(path), "wal_bytes": _file_size(f"{path}-wal")}
+
+
+def _analyze(cursor, full=False, volatile_tables=()):
+    cursor.execute(f"PRAGMA analysis_limit = {0 if full else ANALYSIS_LIMIT}")
+    cursor.execute("ANALYZE")
+    cursor.execute("PRAGMA optimize")
+    for table in volatile_tables:
+        cursor.execute("DELETE FROM sqlite_stat1 WHERE tbl = ?", (table,))
+    return "full" if full else f"sampled {ANALYSIS_LIMIT} rows per index"
+
+
+def _incremental_vacuum(cursor, max_pages=0):
+    if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return "skipped: auto_vacuum is not INCREMENTAL (run with --enable-incremental-vacuum once)"
+    free = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    pages = min(free, max_pages) if max_pages else free
+    # sqlite3 steps a statement once, and each step of incremental_vacuum frees one page
+    for _ in range(pages):
+        cursor.execute("PRAGMA incremental_vacuum(1)")
+    return f"freed {pages} of {free} free pages"
+
+
+def _checkpoint():
+    """TRUNCATE checkpoint on its own connection; gives up if readers hold the WAL"""
+    conn = database.get_connection()
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {CHECKPOINT_BUSY_TIMEOUT_MS}")
+        busy, wal_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    finally:
+        conn.close()
+    if busy:
+        return f"busy: {checkpointed} of {wal_pages} WAL pages copied, readers kept the WAL from being truncated"
+    return "WAL copied into the database and truncated"
+
+
+def _run_step(db, step, path, fn):
+    before = _sizes(path)
+    start = time.perf_counter()
+    try:
+        with span(f"maintenance.{db}.{step}"):
+            detail = fn()
+        ok = True
+    except Exception as e:
+        detail = f"error: {e}"
+        ok = False
+    seconds = time.perf_counter() - start
+    after = _sizes(path)
+    print(
+        f"{'🧹' if ok else '❌'} {db} {step}: {detail} in {seconds * 1000:.0f} ms "
+        f"(db {before['db_bytes'] / 1e6:.1f} → {after['db_bytes'] / 1e6:.1f} MB, "
+        f"WAL {before['wal_bytes'] / 1e6:.1f} → {after['wal_bytes'] / 1e6:.1f} MB)"
+    )
+    return {
+        "db": db, "step": step, "ok": ok, "detail": detail, "seconds": seconds,
+        "db_bytes_before": before["db_bytes"], "db_bytes_after": after["db_bytes"],
+        "wal_bytes_before": before["wal_bytes"], "wal_bytes_after": after["wal_bytes"],
+    }
+
+
+def run_maintenance(databases=("user", "seat"), full_analyze=False, vacuum_max_pages=None):
+    """
+    Analyze, checkpoint and incrementally vacuum the databases
+
+    Statistics and vacuum go through the writer threads like any other write;
+    the checkpoint uses its own connection because it cannot run inside a
+    transaction. The seat database is skipped when it is opened immutable.
+
+    Returns:
+        list: One dict per step with timings and before/after file sizes
+    """
+    vacuum_max_pages = VACUUM_MAX_PAGES if vacuum_max_pages is None else vacuum_max_pages
+    steps = []
+    if "user" in databases:
+        path = database.DB_PATH
+        steps.append(_run_step("user", "analyze", path, lambda: run_write(
+            _analyze, full_analyze, VOLATILE_TABLES["user"], timeout=600
+        )))
+        steps.append(_run_step("user", "vacuum", path, lambda: run_write(
+            _incremental_vacuum, vacuum_max_pages, timeout=600
+        )))
+        # Last, so the WAL frames written by the steps above are folded in as well
+        steps.append(_run_step("user", "checkpoint", path, _checkpoint))
+    if "seat" in databases:
+        if database.SEAT_DB_IMMUTABLE:
+            print("➖ seat: skipped, the file is immutable (publish_seat_database() analyzes new files)")
+        else:
+            path = database.SEAT_DB_PATH
+            steps.append(_run_step("seat", "analyze", path, lambda: run_seat_write(
+                _analyze, full_analyze, VOLATILE_TABLES["seat"]
+            )))
+            steps.append(_run_step("seat", "vacuum", path, lambda: run_seat_write(
+                _incremental_vacuum, vacuum_max_pages
+            )))
+
+    with _report_lock:
+        _last_report["finished_at"] = time.time()
+        _last_report["steps"] = steps
+    return steps
+
+
+def get_last_maintenance_report():
+    """Steps of the most recent run in this process"""
+    with _report_lock:
+        return {"finished_at": _last_report["finished_at"], "steps": list(_last_report["steps"])}
+
+
+def enable_incremental_vacuum(db):
+    """
+    Switch an existing file to auto_vacuum=INCREMENTAL with a full VACUUM
+
+    Rewrites the whole file and blocks writers meanwhile, so run it offline.
+    """
+    if db == "user":
+        conn = database.get_connection()
+    else:
+        conn = database.get_seat_connection(readonly=False)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
+    finally:
+        conn.close()
+
+
+def _is_quiet(now):
+    last_write = max(get_db_writer().last_write_at, get_seat_db_writer().last_write_at)
+    return now - last_write >= MAINTENANCE_QUIET_SECONDS
+
+
+def _scheduler_loop(interval):
+    last_run = time.time()
+    while True:
+        time.sleep(min(interval, MAINTENANCE_QUIET_SECONDS))
+        now = time.time()
+        if now - last_run < interval or not _is_quiet(now):
+            continue
+        try:
+            run_maintenance()
+        except Exception as e:
+            print(f"Error running database maintenance: {e}")
+        last_run = time.time()
+
+
+_scheduler_lock = threading.Lock()
+_scheduler_started = False
+
+
+def start_maintenance_scheduler(interval=None):
+    """
+    Run maintenance every interval seconds during quiet periods (safe to call on every rerun)
+
+    Args:
+        interval (float): Seconds between runs (defaults to JEE_MAINTENANCE_INTERVAL; 0 disables)
+    """
+    global _scheduler_started
+    interval = interval or MAINTENANCE_INTERVAL
+    with _scheduler_lock:
+        if _scheduler_started or not interval:
+            return
+        _scheduler_started = True
+    threading.Thread(target=_scheduler_loop, args=(interval,), name="db-maintenance", daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze, checkpoint and vacuum the JEE Seat Finder databases")
+    parser.add_argument("--db", nargs="+", choices=["user", "seat"], default=["user", "seat"])
+    parser.add_argument("--full-analyze", action="store_true", help="Read every row instead of sampling")
+    parser.add_argument("--vacuum-pages", type=int, default=None, help="Free at most this many pages (0 = all)")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Convert older files with a full VACUUM before the usual steps")
+    args = parser.parse_args(argv)
+
+    if args.enable_incremental_vacuum:
+        for db in args.db:
+            start = time.perf_counter()
+            converted = enable_incremental_vacuum(db)
+            print(f"{'✅' if converted else '➖'} {db}: "
+                  f"{'converted to incremental vacuum' if converted else 'already incremental'} "
+                  f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    steps = run_maintenance(args.db, args.full_analyze, args.vacuum_pages)
+    get_db_writer().stop()
+    get_seat_db_writer().stop()
+    return 0 if all(step["ok"] for step in steps) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# memprofile.py - Opt-in memory profiling with per-session accounting and a per-session cap
+
+import os
+import sys
+import time
+import resource
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+# JEE_MEMPROFILE=1 snapshots allocations around every page render (adds noticeable overhead)
+MEMPROFILE_ENABLED = os.environ.get("JEE_MEMPROFILE", "0") == "1"
+MEMPROFILE_FRAMES = int(os.environ.get("JEE_MEMPROFILE_FRAMES", 1))
+MEMPROFILE_TOP_SITES = 10
+
+# Per-session cap on session-state memory in MB (0 disables); cached intermediates are evicted first
+SESSION_MEMORY_CAP = int(os.environ.get("JEE_SESSION_MEMORY_CAP_MB", 0)) * 1024 * 1024
+
+# Session-state keys with this prefix hold derived data that can be recomputed
+INTERMEDIATE_PREFIX = "_cached_"
+
+# Sessions that have not rendered for this long are dropped from the report
+SESSION_IDLE_SECONDS = 3600
+
+_sessions = {}
+_process = {"render_peak": 0, "top_sites": []}
+_lock = threading.Lock()
+
+
+def estimate_size(value, _depth=0):
+    """Approximate retained bytes of a session-state value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if _depth >= 3:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+def session_key_sizes(session_state):
+    """Bytes held by each session-state key, largest first"""
+    sizes = {}
+    for key in list(session_state.keys()):
+        try:
+            sizes[str(key)] = estimate_size(session_state[key])
+        except Exception:
+            continue
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+
+def enforce_session_cap(session_state, key_sizes, cap=None):
+    """
+    Drop cached intermediates, largest first, until the session is under the cap
+
+    Returns:
+        list: Evicted keys
+    """
+    cap = SESSION_MEMORY_CAP if cap is None else cap
+    if not cap:
+        return []
+    total = sum(key_sizes.values())
+    evicted = []
+    for key, size in key_sizes.items():
+        if total <= cap:
+            break
+        if key.startswith(INTERMEDIATE_PREFIX) and key in session_state:
+            del session_state[key]
+            total -= size
+            evicted.append(key)
+    if total > cap:
+        print(f"⚠️ Session state is {total / 1e6:.1f} MB after evicting intermediates (cap {cap / 1e6:.1f} MB)")
+    return evicted
+
+
+def cache_intermediate(name, key, compute):
+    """
+    Session-scoped cache for derived data, reused while key is unchanged
+
+    Entries live in session state under INTERMEDIATE_PREFIX so the memory cap can evict them.
+    """
+    state_key = INTERMEDIATE_PREFIX + name
+    entry = st.session_state.get(state_key)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    value = compute()
+    st.session_state[state_key] = (key, value)
+    return value
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "bare"
+
+
+def _record(session_id, page, render_peak, retained, key_sizes, evicted):
+    now = time.time()
+    with _lock:
+        entry = _sessions.setdefault(session_id, {"max_render_peak": 0, "evictions": 0})
+        entry.update({
+            "page": page,
+            "updated_at": now,
+            "last_render_peak": render_peak,
+            "last_retained": retained,
+            "state_bytes": sum(key_sizes.values()),
+            "top_keys": list(key_sizes.items())[:5],
+        })
+        entry["max_render_peak"] = max(entry["max_render_peak"], render_peak)
+        entry["evictions"] += len(evicted)
+        _process["render_peak"] = max(_process["render_peak"], render_peak)
+        for stale in [sid for sid, e in _sessions.items() if now - e["updated_at"] > SESSION_IDLE_SECONDS]:
+            del _sessions[stale]
+
+
+@contextmanager
+def profile_page(page):
+    """
+    Account memory for one page render of the current session
+
+    With profiling enabled the render is bracketed by tracemalloc: the peak is
+    the most memory allocated at once during the render and retained is what
+    was still allocated afterwards. Other sessions rendering at the same time
+    share the process-wide tracer, so per-session numbers are upper bounds
+    under concurrency. The session cap is enforced either way.
+    """
+    profiling = MEMPROFILE_ENABLED
+    if profiling:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMPROFILE_FRAMES)
+        before_snapshot = tracemalloc.take_snapshot()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        if profiling or SESSION_MEMORY_CAP:
+            key_sizes = session_key_sizes(st.session_state)
+            evicted = enforce_session_cap(st.session_state, key_sizes)
+            render_peak = retained = 0
+            if profiling:
+                after, peak = tracemalloc.get_traced_memory()
+                render_peak, retained = peak - before, after - before
+                # Leave out the tracer's own bookkeeping
+                exclude = [tracemalloc.Filter(False, tracemalloc.__file__)]
+                stats = tracemalloc.take_snapshot().filter_traces(exclude).compare_to(
+                    before_snapshot.filter_traces(exclude), "lineno"
+                )[:MEMPROFILE_TOP_SITES]
+                with _lock:
+                    _process["top_sites"] = [(str(stat.traceback), stat.size_diff, stat.size) for stat in stats]
+            _record(_session_id(), page, render_peak, retained, key_sizes, evicted)
+
+
+def get_memory_report():
+    """
+    Process-wide and per-session memory figures
+
+    Returns:
+        dict: 'process' totals, 'sessions' rows (bytes) and the 'top_sites' of the latest render
+    """
+    traced_current, traced_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    # ru_maxrss is in kilobytes on Linux
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    with _lock:
+        sessions = [
+            {
+                "session": session_id[:8],
+                "page": entry["page"],
+                "state_bytes": entry["state_bytes"],
+                "last_render_peak": entry["last_render_peak"],
+                "max_render_peak": entry["max_render_peak"],
+                "last_retained": entry["last_retained"],
+                "evictions": entry["evictions"],
+                "top_keys": ", ".join(f"{key} ({size / 1e6:.1f} MB)" for key, size in entry["top_keys"]),
+            }
+            for session_id, entry in _sessions.items()
+        ]
+        top_sites = list(_process["top_sites"])
+        render_peak = _process["render_peak"]
+    return {
+        "process": {
+            "traced_current": traced_current,
+            "traced_peak": traced_peak,
+            "max_render_peak": render_peak,
+            "max_rss": max_rss,
+            "sessions": len(sessions),
+            "session_state_total": sum(s["state_bytes"] for s in sessions),
+        },
+        "sessions": sorted(sessions, key=lambda s: s["max_render_peak"], reverse=True),
+        "top_sites": top_sites,
+    }
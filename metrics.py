@@ -0,0 +1,359 @@
+# metrics.py - Lightweight stage timing, rolling latency histograms and Prometheus export
+
+import bisect
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+# Set JEE_METRICS=0 to turn every span into a no-op
+METRICS_ENABLED = os.environ.get("JEE_METRICS", "1") != "0"
+
+# Exporters: a textfile for node_exporter-style collection and/or a side HTTP port
+METRICS_FILE = os.environ.get("JEE_METRICS_FILE")
+METRICS_PORT = int(os.environ.get("JEE_METRICS_PORT", 0))
+METRICS_FLUSH_INTERVAL = float(os.environ.get("JEE_METRICS_FLUSH_INTERVAL", 15))
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Percentiles are computed over the most recent samples inside this window
+ROLLING_WINDOW_SECONDS = 600
+ROLLING_MAX_SAMPLES = 2048
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyStats:
+    """Cumulative histogram plus a bounded window of recent samples for one series"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=ROLLING_MAX_SAMPLES)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, now):
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            self.recent.append((now, seconds))
+
+    def snapshot(self, now):
+        """Cumulative counts and the recent samples still inside the rolling window"""
+        with self._lock:
+            counts = list(self.bucket_counts)
+            count, total = self.count, self.total
+            recent = [seconds for at, seconds in self.recent if now - at <= ROLLING_WINDOW_SECONDS]
+        return counts, count, total, recent
+
+
+# (metric, label value) -> LatencyStats
+_series = {}
+_series_lock = threading.Lock()
+
+METRIC_HELP = {
+    "jee_stage_duration_seconds": "Time spent in each stage of a page rerun",
+    "jee_sql_duration_seconds": "Time spent executing SQL statements",
+}
+METRIC_LABEL = {
+    "jee_stage_duration_seconds": "stage",
+    "jee_sql_duration_seconds": "statement",
+}
+
+
+def observe(metric, label, seconds):
+    """Record one duration for a series"""
+    key = (metric, label)
+    stats = _series.get(key)
+    if stats is None:
+        with _series_lock:
+            stats = _series.setdefault(key, LatencyStats())
+    stats.observe(seconds, time.time())
+
+
+@contextmanager
+def span(stage):
+    """Time a block of code as one stage: with span("search.apply_filters"): ..."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("jee_stage_duration_seconds", stage, time.perf_counter() - start)
+
+
+def traced(stage):
+    """Decorator form of span()"""
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorator
+
+
+_SQL_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?["\[]?([\w.]+)', re.IGNORECASE)
+_sql_labels = {}
+
+# Distinct statements tracked individually; anything beyond is counted under OTHER_STATEMENT
+MAX_TRACKED_STATEMENTS = 4096
+OTHER_STATEMENT = "(other statements)"
+
+
+def normalize_sql(sql):
+    """Statement text with whitespace collapsed, used as the per-statement key"""
+    return " ".join(sql.split())
+
+
+def sql_label(sql):
+    """Low-cardinality label for a statement, e.g. 'SELECT shortlists'"""
+    label = _sql_labels.get(sql)
+    if label is None:
+        words = sql.split(None, 1)
+        verb = words[0].upper() if words else "EMPTY"
+        table = _SQL_TABLE.search(sql)
+        label = f"{verb} {table.group(1)}" if table and verb not in ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK") else verb
+        if len(_sql_labels) < MAX_TRACKED_STATEMENTS:
+            _sql_labels[sql] = label
+    return label
+
+
+# normalized sql -> [label, count, total seconds, max seconds]
+_statements = {}
+_statements_lock = threading.Lock()
+
+
+def _observe_statement(sql, label, seconds):
+    key = normalize_sql(sql)
+    with _statements_lock:
+        entry = _statements.get(key)
+        if entry is None:
+            if len(_statements) >= MAX_TRACKED_STATEMENTS:
+                key, label = OTHER_STATEMENT, "OTHER"
+            entry = _statements.setdefault(key, [label, 0, 0.0, 0.0])
+        entry[1] += 1
+        entry[2] += seconds
+        entry[3] = max(entry[3], seconds)
+
+
+def _observe_sql(sql, start):
+    seconds = time.perf_counter() - start
+    label = sql_label(sql)
+    observe("jee_sql_duration_seconds", label, seconds)
+    _observe_statement(sql, label, seconds)
+
+
+def get_statement_stats():
+    """
+    Cumulative count and latency of every distinct statement since start (or the last reset)
+
+    Returns:
+        list: dicts with sql, label, count, total_ms, mean_ms and max_ms, most total time first
+    """
+    with _statements_lock:
+        items = [(sql, list(entry)) for sql, entry in _statements.items()]
+    rows = [
+        {
+            "sql": sql,
+            "label": label,
+            "count": count,
+            "total_ms": total * 1000,
+            "mean_ms": total / count * 1000,
+            "max_ms": worst * 1000,
+        }
+        for sql, (label, count, total, worst) in items
+    ]
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that times and counts every execute call"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _observe_sql(sql, start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _observe_sql(sql, start)
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors time every statement"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """Factory to pass to sqlite3.connect(..., factory=...)"""
+    return TracedConnection if METRICS_ENABLED else sqlite3.Connection
+
+
+def _quantile(samples, q):
+    return float(np.quantile(samples, q)) if len(samples) else float("nan")
+
+
+def get_latency_summary(metric="jee_stage_duration_seconds"):
+    """
+    Rolling-window percentiles per series
+
+    Returns:
+        list: dicts with name, count (in window), p50, p95, p99 and max in milliseconds
+    """
+    now = time.time()
+    with _series_lock:
+        items = [(label, stats) for (name, label), stats in _series.items() if name == metric]
+    summary = []
+    for label, stats in sorted(items):
+        _, _, _, recent = stats.snapshot(now)
+        if not recent:
+            continue
+        samples = np.array(recent)
+        row = {"name": label, "count": len(recent)}
+        for q in QUANTILES:
+            row[f"p{int(q * 100)}"] = _quantile(samples, q) * 1000
+        row["max"] = float(samples.max()) * 1000
+        summary.append(row)
+    return summary
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus():
+    """All series in the Prometheus text exposition format"""
+    now = time.time()
+    with _series_lock:
+        items = sorted(_series.items())
+    lines = []
+    for metric in METRIC_HELP:
+        series = [(label, stats) for (name, label), stats in items if name == metric]
+        if not series:
+            continue
+        label_name = METRIC_LABEL[metric]
+        lines.append(f"# HELP {metric} {METRIC_HELP[metric]}")
+        lines.append(f"# TYPE {metric} histogram")
+        rolling = []
+        for label, stats in series:
+            counts, count, total, recent = stats.snapshot(now)
+            label_value = _escape(label)
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{label_name}="{label_value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label_name}="{label_value}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{{label_name}="{label_value}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{{label_name}="{label_value}"}} {count}')
+            if recent:
+                rolling.append((label_value, np.array(recent)))
+        if rolling:
+            lines.append(f"# HELP {metric}_rolling Percentiles over the last {ROLLING_WINDOW_SECONDS}s")
+            lines.append(f"# TYPE {metric}_rolling gauge")
+            for label_value, samples in rolling:
+                for q in QUANTILES:
+                    lines.append(
+                        f'{metric}_rolling{{{label_name}="{label_value}",quantile="{q}"}} {_quantile(samples, q):.6f}'
+                    )
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path=None):
+    """Write the exposition text atomically (for a textfile collector)"""
+    path = path or METRICS_FILE
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+
+def _flush_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_metrics_file(path)
+        except Exception as e:
+            print(f"Error writing metrics file: {e}")
+
+
+def start_metrics_exporter(port=None, path=None):
+    """
+    Start the configured exporters once per process (safe to call on every rerun)
+
+    Args:
+        port (int): Serve /metrics on this port (defaults to JEE_METRICS_PORT)
+        path (str): Rewrite this file every JEE_METRICS_FLUSH_INTERVAL seconds (defaults to JEE_METRICS_FILE)
+    """
+    global _exporter_started
+    port = port or METRICS_PORT
+    path = path or METRICS_FILE
+    with _exporter_lock:
+        if _exporter_started or not METRICS_ENABLED:
+            return
+        _exporter_started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"📈 Metrics available on http://0.0.0.0:{port}/metrics")
+        except OSError as e:
+            print(f"Error starting metrics server on port {port}: {e}")
+    if path:
+        threading.Thread(target=_flush_loop, args=(path, METRICS_FLUSH_INTERVAL), name="metrics-file", daemon=True).start()
+
+
+def reset_metrics():
+    """Forget every recorded series and statement"""
+    with _series_lock:
+        _series.clear()
+    with _statements_lock:
+        _statements.clear()
@@ -0,0 +1,233 @@
+# name_search.py - Typo-tolerant quick find over institute, location and program names
+#
+# Every institute, location and program of the seat snapshot is a row of an
+# in-memory SQLite FTS5 table with the trigram tokenizer, alongside generated
+# abbreviations ("IITB", "IIT Bombay", "CSE", "BTech"). A query is split into
+# words and each word into trigrams; OR-ing the trigrams finds every name sharing
+# part of a word, so prefixes and misspellings ("mechnical") are still candidates.
+# Candidates are then ranked by how closely each query word matches a word of
+# the name, and each query word is credited to the kind of name (institute,
+# program or location) it matches best, so "IITB CSE" finds both the institute
+# and the program rather than neither.
+
+import difflib
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+
+import pandas as pd
+
+from search import name_initials, significant_words
+from topk import get_rank_index
+
+
+# Words and degree names in program names and their usual short forms
+PROGRAM_ALIASES = {
+    "Engineering": "Engg",
+    "Bachelor of Technology": "BTech B.Tech",
+    "Bachelor of Architecture": "BArch B.Arch",
+    "Bachelor of Planning": "BPlan B.Plan",
+    "Bachelor of Science": "BS BSc",
+    "Master of Technology": "MTech M.Tech",
+    "Master of Science": "MS MSc",
+    "Dual Degree": "DD",
+}
+
+# Trigram candidates fetched per query, best BM25 first
+FTS_CANDIDATES = 200
+
+# Matches scoring below this are dropped (1.0 = every query word matched exactly)
+MIN_MATCH_SCORE = 0.8
+
+# A query word matching a prefix of a name word scores this much; other
+# near-misses score their edit similarity ratio times FUZZY_SCORE
+PREFIX_SCORE = 0.95
+FUZZY_SCORE = 0.9
+
+# Older or everyday names of locations, searchable alongside the official one
+LOCATION_ALIASES = {
+    "Tiruchirappalli": "Trichy",
+    "Mumbai": "Bombay",
+    "Chennai": "Madras",
+    "Kolkata": "Calcutta",
+    "Bengaluru": "Bangalore",
+    "Thiruvananthapuram": "Trivandrum",
+    "Prayagraj": "Allahabad",
+    "Varanasi": "Banaras Benares",
+    "Surathkal": "Mangalore",
+}
+
+DEFAULT_LIMIT = 20
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def institute_aliases(name, institute_type=None, location=None):
+    """Abbreviations of an institute name, e.g. 'IITB' and 'IIT Bombay'"""
+    words = significant_words(name)
+    initials = name_initials(name)
+    aliases = [initials] if len(words) > 1 else []
+    if institute_type and initials.startswith(institute_type) and len(words) > len(institute_type):
+        aliases.append(" ".join([institute_type] + words[len(institute_type):]))
+    if location in LOCATION_ALIASES:
+        aliases.append(LOCATION_ALIASES[location])
+    return aliases
+
+
+def program_aliases(name):
+    """Abbreviations of a program name, e.g. 'CSE' and 'BTech'"""
+    aliases = [name_initials(name)] if len(significant_words(name)) > 1 else []
+    aliases.extend(alias for phrase, alias in PROGRAM_ALIASES.items() if phrase in name)
+    return aliases
+
+
+@lru_cache(maxsize=100_000)
+def _word_similarity(query_word, word):
+    """1.0 for an exact match, PREFIX_SCORE for a prefix, else the scaled edit similarity"""
+    if query_word == word:
+        return 1.0
+    if word.startswith(query_word):
+        return PREFIX_SCORE
+    return FUZZY_SCORE * difflib.SequenceMatcher(None, query_word, word).ratio()
+
+
+def _fts_query(words):
+    """FTS5 query OR-ing the trigrams of every word of three letters or more"""
+    trigrams = {word[i:i + 3] for word in words for i in range(len(word) - 2)}
+    return " OR ".join(f'"{trigram}"' for trigram in sorted(trigrams))
+
+
+class NameIndex:
+    """FTS5 trigram index over the institute, location and program names of a seat snapshot"""
+
+    def __init__(self, rank_index):
+        self.rank_index = rank_index
+        codes = pd.DataFrame({
+            column: rank_index.codes[column] for column in ("Institute", "Location", "Type")
+        }).drop_duplicates("Institute")
+        codes = codes[codes["Institute"] >= 0]
+
+        def name_of(column, code):
+            return str(rank_index.categories[column][code]) if code >= 0 else ""
+
+        self.institutes = pd.DataFrame({
+            "Institute": [name_of("Institute", code) for code in codes["Institute"]],
+            "Location": [name_of("Location", code) for code in codes["Location"]],
+            "Type": [name_of("Type", code) for code in codes["Type"]],
+        }).sort_values("Institute", ignore_index=True)
+
+        rows = [
+            ("Institute", row.Institute, row.Location, " ".join(institute_aliases(row.Institute, row.Type, row.Location)))
+            for row in self.institutes.itertuples(index=False)
+        ]
+        rows += [("Program", str(name), "", " ".join(program_aliases(str(name))))
+                 for name in rank_index.categories["Academic Program Name"]]
+        rows += [("Location", location, "", LOCATION_ALIASES.get(location, ""))
+                 for location in sorted(set(self.institutes["Location"]) - {""})]
+
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE names USING fts5(kind UNINDEXED, name, location, aliases, tokenize='trigram')"
+        )
+        self.conn.executemany("INSERT INTO names (kind, name, location, aliases) VALUES (?, ?, ?, ?)", rows)
+        self.conn.commit()
+        self.lock = threading.Lock()
+        # Words of every row, looked up by rowid when ranking candidates
+        self.row_words = {
+            rowid: set(_words(f"{name} {location} {aliases}"))
+            for rowid, (_, name, location, aliases) in enumerate(rows, start=1)
+        }
+
+    def _candidates(self, words):
+        """(rowid, kind, name, location) of every row sharing a trigram or a short word with the query"""
+        clauses, params = [], []
+        fts_query = _fts_query(words)
+        if fts_query:
+            clauses.append("rowid IN (SELECT rowid FROM names WHERE names MATCH ? ORDER BY bm25(names) LIMIT ?)")
+            params.extend([fts_query, FTS_CANDIDATES])
+        # Words too short for a trigram ("ee", "me") can only match an abbreviation
+        for word in words:
+            if len(word) < 3:
+                clauses.append("aliases LIKE ?")
+                params.append(f"%{word}%")
+        if not clauses:
+            return []
+        with self.lock:
+            return self.conn.execute(
+                f"SELECT rowid, kind, name, location FROM names WHERE {' OR '.join(clauses)}", params
+            ).fetchall()
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Institutes, programs and locations best matching a free-text query
+
+        Args:
+            query (str): Names, abbreviations or fragments, e.g. 'IITB CSE' or 'mechnical trichy'
+            limit (int): Most matches to return
+
+        Returns:
+            pandas.DataFrame: Kind, Name, Location and Score columns, best match first
+        """
+        words = list(dict.fromkeys(_words(query)))
+        candidates = self._candidates(words)
+        if not candidates:
+            return pd.DataFrame(columns=["Kind", "Name", "Location", "Score"])
+
+        # Best match of each query word within each candidate's words
+        similarity = [
+            [max((_word_similarity(word, row_word) for row_word in self.row_words[rowid]), default=0.0)
+             for word in words]
+            for rowid, _, _, _ in candidates
+        ]
+        # Credit each query word to the kinds it matches best
+        best_by_kind = {}
+        for (_, kind, _, _), scores in zip(candidates, similarity):
+            best = best_by_kind.setdefault(kind, [0.0] * len(words))
+            best_by_kind[kind] = [max(a, b) for a, b in zip(best, scores)]
+        top = [max(best[i] for best in best_by_kind.values()) for i in range(len(words))]
+
+        matches = []
+        for (_, kind, name, location), scores in zip(candidates, similarity):
+            credited = [i for i in range(len(words)) if best_by_kind[kind][i] == top[i] and top[i] > 0]
+            if not credited:
+                continue
+            score = round(sum(scores[i] for i in credited) / len(credited), 3)
+            if score >= MIN_MATCH_SCORE:
+                matches.append((kind, name, location, score))
+
+        result = pd.DataFrame(matches, columns=["Kind", "Name", "Location", "Score"])
+        # Shorter names first among equal scores: the main campus before its extra campuses
+        result["length"] = result["Name"].str.len()
+        result = result.sort_values(["Score", "length", "Name"], ascending=[False, True, True], kind="stable")
+        return result.drop(columns="length").head(limit).reset_index(drop=True)
+
+    def selections(self, matches):
+        """
+        Filter selections for chosen matches: a location selects every institute in it
+
+        Returns:
+            tuple: (institute names, program names)
+        """
+        institutes = list(matches.loc[matches["Kind"] == "Institute", "Name"])
+        locations = set(matches.loc[matches["Kind"] == "Location", "Name"])
+        institutes += [name for name in self.institutes.loc[self.institutes["Location"].isin(locations), "Institute"]
+                       if name not in institutes]
+        programs = list(matches.loc[matches["Kind"] == "Program", "Name"])
+        return institutes, programs
+
+
+_name_index = None
+_name_index_lock = threading.Lock()
+
+
+def get_name_index(df):
+    """Shared NameIndex for the cached seat frame, rebuilt with its rank index"""
+    global _name_index
+    rank_index = get_rank_index(df)
+    with _name_index_lock:
+        if _name_index is None or _name_index.rank_index is not rank_index:
+            _name_index = NameIndex(rank_index)
+        return _name_index
@@ -5,6 +5,9 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.colors import HexColor, white
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
 import datetime
 import pandas as pd
 import io
@@ -366,7 +369,7 @@ def generate_shortlist_pdf(df, username):
                 priority = str(int(row.get('priority_order', 0)))
                 institute = str(row.get('institute', ''))
                 program = str(row.get('program', ''))
-                closing_rank = f"{int(row.get('closing_rank', 0)):,}"
+                closing_rank = _shortlist_cutoff_text(row)
                 seat_type = str(row.get('seat_type', ''))
                 quota = str(row.get('quota', ''))
                 gender = str(row.get('gender', ''))
@@ -442,6 +445,192 @@ def generate_shortlist_pdf(df, username):
         raise Exception(f"PDF generation failed: {str(e)}")
 
 
+# Columns of the search results report: (column, header, width share, alignment)
+RESULTS_REPORT_COLUMNS = [
+    ('Institute', 'Institute', 0.30, 'left'),
+    ('Academic Program Name', 'Program', 0.34, 'left'),
+    ('Gender', 'Gender', 0.12, 'left'),
+    ('Year', 'Year', 0.06, 'right'),
+    ('Opening Rank', 'Opening', 0.09, 'right'),
+    ('Closing Rank', 'Closing', 0.09, 'right'),
+]
+
+
+def _fit_text(text, width, font_name, font_size, cache):
+    """Truncate text with an ellipsis so it fits in width, returning (text, text width)"""
+    key = (text, width)
+    fitted = cache.get(key)
+    if fitted is not None:
+        return fitted
+    
+    text_width = stringWidth(text, font_name, font_size)
+    if text_width > width:
+        # Binary search the longest prefix that fits with the ellipsis
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if stringWidth(text[:mid] + '…', font_name, font_size) <= width:
+                low = mid
+            else:
+                high = mid - 1
+        text = text[:low] + '…'
+        text_width = stringWidth(text, font_name, font_size)
+    fitted = (text, text_width)
+    cache[key] = fitted
+    return fitted
+
+
+def _format_rank(value):
+    return f"{int(value):,}" if pd.notnull(value) else ""
+
+
+def _shortlist_cutoff_text(row):
+    """Latest closing rank with its year, plus the previous year's on a second line"""
+    text = _format_rank(row.get('closing_rank'))
+    if pd.notnull(row.get('cutoff_year')):
+        text += f" ({int(row['cutoff_year'])})"
+    if pd.notnull(row.get('previous_closing_rank')):
+        text += f"<br/><font size=7>{int(row['previous_year'])}: {_format_rank(row['previous_closing_rank'])}</font>"
+    return text
+
+
+def generate_results_pdf(df, title="JEE Cutoff Report", group_by=('Quota', 'Seat Type')):
+    """
+    Generate a printable cutoff book for search results with a streaming canvas writer
+    
+    Rows are drawn directly on the page canvas with precomputed column widths and
+    fonts, one page at a time, so large result sets avoid the per-cell layout
+    cost of platypus tables.
+    
+    Args:
+        df (pandas.DataFrame): Search results in jee_seats column format
+        title (str): Report title printed on every page
+        group_by (tuple): Columns that start a new section (e.g. quota/category)
+    
+    Returns:
+        bytes: PDF file as bytes
+    """
+    try:
+        page_width, page_height = landscape(A4)
+        margin = 36
+        row_height = 12
+        font_name, font_size = 'Helvetica', 7.5
+        bold_font = 'Helvetica-Bold'
+        usable_width = page_width - 2 * margin
+        
+        columns = [c for c in RESULTS_REPORT_COLUMNS if c[0] in df.columns]
+        share_total = sum(c[2] for c in columns) or 1
+        col_widths = [usable_width * c[2] / share_total for c in columns]
+        col_x = [margin + sum(col_widths[:i]) for i in range(len(columns))]
+        group_cols = [c for c in group_by if c in df.columns]
+        
+        sort_cols = group_cols + (['Closing Rank'] if 'Closing Rank' in df.columns else [])
+        report_df = df.sort_values(sort_cols, kind='stable') if sort_cols else df
+        
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=(page_width, page_height), pageCompression=1)
+        pdf.setTitle(title)
+        generated_on = datetime.datetime.now().strftime("%B %d, %Y")
+        fit_cache = {}
+        header_fill = HexColor('#667eea')
+        stripe_fill = HexColor('#f8f9fa')
+        page_number = 0
+        
+        def start_page(section):
+            nonlocal page_number
+            page_number += 1
+            pdf.setFont(bold_font, 14)
+            pdf.setFillColor(header_fill)
+            pdf.drawString(margin, page_height - margin, title)
+            pdf.setFont(font_name, 8)
+            pdf.setFillColor(HexColor('#666666'))
+            pdf.drawRightString(page_width - margin, page_height - margin,
+                                f"Generated on {generated_on} | Page {page_number}")
+            y = page_height - margin - 20
+            if section:
+                pdf.setFont(bold_font, 10)
+                pdf.setFillColor(HexColor('#333333'))
+                pdf.drawString(margin, y, section)
+                y -= 16
+            
+            # Column header band
+            pdf.setFillColor(header_fill)
+            pdf.rect(margin, y - 3, usable_width, row_height + 2, stroke=0, fill=1)
+            pdf.setFillColor(white)
+            pdf.setFont(bold_font, font_size)
+            for (_, header, _, align), x, w in zip(columns, col_x, col_widths):
+                if align == 'right':
+                    pdf.drawRightString(x + w - 3, y, header)
+                else:
+                    pdf.drawString(x + 3, y, header)
+            pdf.setFont(font_name, font_size)
+            return y - row_height - 2
+        
+        # Pre-format every cell column once instead of per drawn cell
+        cell_columns = []
+        for name, _, _, _ in columns:
+            if name in ('Opening Rank', 'Closing Rank'):
+                cell_columns.append(report_df[name].map(_format_rank))
+            else:
+                series = report_df[name]
+                if pd.api.types.is_float_dtype(series) and series.dropna().mod(1).eq(0).all():
+                    series = series.astype('Int64')
+                cell_columns.append(series.astype(object).where(series.notnull(), "").astype(str))
+        group_columns = [report_df[c].astype(str) for c in group_cols]
+        sections = (
+            pd.Series([" | ".join(f"{c}: {v}" for c, v in zip(group_cols, vals)) for vals in zip(*group_columns)])
+            if group_cols else pd.Series([None] * len(report_df))
+        )
+        
+        text_color = HexColor('#222222')
+        section = None
+        text = None
+        y = None
+        row_index = 0
+        
+        for row_section, *cells in zip(sections, *cell_columns):
+            if y is None or row_section != section or y < margin:
+                if text is not None:
+                    pdf.drawText(text)
+                    pdf.showPage()
+                if row_section != section:
+                    row_index = 0
+                section = row_section
+                y = start_page(section)
+                # One text object per page keeps the canvas operator stream compact
+                text = pdf.beginText()
+                text.setFont(font_name, font_size)
+                text.setFillColor(text_color)
+            
+            if row_index % 2:
+                pdf.setFillColor(stripe_fill)
+                pdf.rect(margin, y - 3, usable_width, row_height, stroke=0, fill=1)
+            
+            for cell, (_, _, _, align), x, w in zip(cells, columns, col_x, col_widths):
+                cell, cell_width = _fit_text(cell, w - 6, font_name, font_size, fit_cache)
+                text.setTextOrigin(x + w - 3 - cell_width if align == 'right' else x + 3, y)
+                text.textOut(cell)
+            
+            y -= row_height
+            row_index += 1
+        
+        if text is not None:
+            pdf.drawText(text)
+        else:
+            start_page(None)
+            pdf.setFillColor(text_color)
+            pdf.drawString(margin, page_height - margin - 60, "No matching programs.")
+        
+        pdf.showPage()
+        pdf.save()
+        pdf_bytes = buffer.getvalue()
+        buffer.close()
+        return pdf_bytes
+        
+    except Exception as e:
+        raise Exception(f"Results PDF generation failed: {str(e)}")
+
+
 def validate_dataframe_for_pdf(df):
     """Validate DataFrame for PDF generation"""
     if df is None or len(df) == 0:
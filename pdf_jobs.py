@@ -0,0 +1,211 @@
+# pdf_jobs.py - Background PDF rendering on a bounded process pool
+
+import os
+import time
+import uuid
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from pdf_generator import generate_shortlist_pdf, generate_results_pdf
+from metrics import observe
+
+
+# Rendered PDFs live here for a short while so reruns and repeat downloads are free
+PDF_CACHE_DIR = os.environ.get("JEE_PDF_CACHE_DIR", "pdf_cache")
+PDF_CACHE_TTL = int(os.environ.get("JEE_PDF_CACHE_TTL", 15 * 60))
+
+# Pool size and the maximum number of jobs allowed to wait for a worker
+PDF_MAX_WORKERS = int(os.environ.get("JEE_PDF_WORKERS", min(4, os.cpu_count() or 1)))
+PDF_MAX_PENDING = int(os.environ.get("JEE_PDF_MAX_PENDING", 32))
+
+# Renderers that can run in a worker process, keyed by job kind
+PDF_RENDERERS = {
+    "shortlist": generate_shortlist_pdf,
+    "results": generate_results_pdf,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_jobs = {}
+
+
+class PDFQueueFull(Exception):
+    """Raised when too many PDF jobs are already waiting for a worker"""
+
+
+def _get_pool():
+    """Create the shared process pool on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps the Streamlit server threads out of the workers
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _render_job(kind, args, output_path):
+    """Worker entry point: render one PDF and write it atomically to the cache"""
+    pdf_bytes = PDF_RENDERERS[kind](*args)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def make_job_id(kind, df, *args):
+    """Build a stable job id from the job kind, its arguments and the data"""
+    digest = hashlib.sha256(kind.encode("utf-8"))
+    for arg in args:
+        digest.update(repr(arg).encode("utf-8"))
+    digest.update(",".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()[:24]
+
+
+def _cache_path(job_id):
+    return os.path.join(PDF_CACHE_DIR, f"{job_id}.pdf")
+
+
+def _is_fresh(path):
+    return os.path.exists(path) and time.time() - os.path.getmtime(path) < PDF_CACHE_TTL
+
+
+def purge_expired_pdfs():
+    """Delete cached PDFs older than the TTL and forget their jobs"""
+    if not os.path.isdir(PDF_CACHE_DIR):
+        return 0
+    removed = 0
+    now = time.time()
+    for name in os.listdir(PDF_CACHE_DIR):
+        path = os.path.join(PDF_CACHE_DIR, name)
+        try:
+            if now - os.path.getmtime(path) >= PDF_CACHE_TTL:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    with _pool_lock:
+        for job_id in [j for j, job in _jobs.items() if job["future"].done() and not _is_fresh(_cache_path(j))]:
+            del _jobs[job_id]
+    return removed
+
+
+def _pending_count():
+    return sum(1 for job in _jobs.values() if not job["future"].done())
+
+
+def submit_pdf_job(kind, df, *args):
+    """
+    Queue a PDF render in the background pool
+
+    Args:
+        kind (str): Renderer name from PDF_RENDERERS
+        df (pandas.DataFrame): Data to render, passed as the first renderer argument
+        *args: Remaining renderer arguments
+
+    Returns:
+        str: Job id to poll with get_pdf_job_status()
+    """
+    global _pool
+    if kind not in PDF_RENDERERS:
+        raise ValueError(f"Unknown PDF job kind: {kind}")
+
+    job_id = make_job_id(kind, df, *args)
+    output_path = _cache_path(job_id)
+
+    with _pool_lock:
+        job = _jobs.get(job_id)
+        if job and (not job["future"].done() or _is_fresh(output_path)):
+            return job_id
+
+    if _is_fresh(output_path):
+        return job_id
+
+    purge_expired_pdfs()
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+
+    for attempt in range(2):
+        pool = _get_pool()
+        with _pool_lock:
+            if _pending_count() >= PDF_MAX_PENDING:
+                raise PDFQueueFull("PDF export is busy right now. Please try again in a minute.")
+            try:
+                future = pool.submit(_render_job, kind, (df, *args), output_path)
+            except BrokenProcessPool:
+                # A worker killed mid-render (OOM or a signal) leaves the pool unusable for good
+                if attempt:
+                    raise
+                pool.shutdown(wait=False, cancel_futures=True)
+                if _pool is pool:
+                    _pool = None
+                continue
+            submitted_at = time.time()
+            _jobs[job_id] = {
+                "future": future,
+                "kind": kind,
+                "submitted_at": submitted_at
+            }
+            break
+    # Queue wait plus render time, recorded in this process when the worker finishes
+    future.add_done_callback(
+        lambda f: observe("jee_stage_duration_seconds", f"pdf.{kind}.render", time.time() - submitted_at)
+    )
+    return job_id
+
+
+def get_pdf_job_status(job_id):
+    """
+    Get the state of a PDF job
+
+    Returns:
+        dict: state ('unknown', 'queued', 'running', 'done' or 'failed'),
+              elapsed seconds and an error message for failed jobs
+    """
+    output_path = _cache_path(job_id)
+    with _pool_lock:
+        job = _jobs.get(job_id)
+
+    if job is None:
+        state = "done" if _is_fresh(output_path) else "unknown"
+        return {"state": state, "elapsed": 0.0, "error": None}
+
+    future = job["future"]
+    elapsed = time.time() - job["submitted_at"]
+    if future.done():
+        error = future.exception()
+        if error is not None:
+            return {"state": "failed", "elapsed": elapsed, "error": str(error)}
+        if not os.path.exists(output_path):
+            return {"state": "failed", "elapsed": elapsed, "error": "PDF expired from cache"}
+        return {"state": "done", "elapsed": elapsed, "error": None}
+    if future.running():
+        return {"state": "running", "elapsed": elapsed, "error": None}
+    return {"state": "queued", "elapsed": elapsed, "error": None}
+
+
+def get_pdf_job_result(job_id):
+    """Return the rendered PDF bytes for a finished job, or None"""
+    try:
+        with open(_cache_path(job_id), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def shutdown_pdf_pool():
+    """Stop the worker pool (used by scripts and tests)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+        _jobs.clear()
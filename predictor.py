@@ -0,0 +1,112 @@
+# predictor.py - Admission chances for a rank across every matching option in one vectorized pass
+#
+# Each past cutoff of an option (every year and round in the seat snapshot) is
+# a sample of where that option closes. An option's chance for a rank is the
+# recency-weighted share of those cutoffs the rank would have cleared
+# (closing rank >= rank), so a program that closed above the rank in most
+# recent rounds is safe and one that only did so in old or early rounds is a reach.
+
+import numpy as np
+import pandas as pd
+
+
+# Weight of a cutoff relative to the same cutoff one year later
+YEAR_DECAY = 0.7
+
+SAFE_CHANCE = 0.8
+MODERATE_CHANCE = 0.4
+
+# Options that never closed at the rank are still listed as reach when the rank
+# is within this fraction of their highest closing rank
+REACH_MARGIN = 0.1
+
+OUTLOOKS = ["Safe", "Moderate", "Reach"]
+
+PREDICTION_COLUMNS = [
+    'Outlook', 'Chance', 'Institute', 'Academic Program Name', 'Type', 'Quota', 'Seat Type', 'Gender',
+    'Latest Closing Rank', 'Latest Year', 'Best Closing Rank', 'Cutoffs Seen'
+]
+
+
+def category_mask(series, values):
+    """Boolean mask of rows whose value is in values (all rows when values is empty)"""
+    if values is None or len(values) == 0:
+        return np.ones(len(series), dtype=bool)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Look the integer codes up in a per-category table instead of comparing values
+        allowed = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+        allowed[series.cat.categories.get_indexer(list(values))] = True
+        allowed[-1] = False
+        return allowed[series.cat.codes.to_numpy()]
+    return series.isin(values).to_numpy()
+
+
+def predict_chances(df, rank, seat_types, quotas, genders, types=None):
+    """
+    Classify every option open to a candidate as safe, moderate or reach
+
+    Args:
+        df (pandas.DataFrame): Seat snapshot from get_jee_data() (needs option_id)
+        rank (int): Candidate's rank in the seat type's list (CRL for OPEN)
+        seat_types, quotas, genders (list): Categories the candidate is eligible for
+        types (list): Optional institute types to keep
+
+    Returns:
+        pandas.DataFrame: One row per option in PREDICTION_COLUMNS, best outlook first
+    """
+    mask = (
+        category_mask(df['Seat Type'], seat_types) & category_mask(df['Quota'], quotas)
+        & category_mask(df['Gender'], genders) & category_mask(df['Type'], types)
+        & df['Closing Rank'].notna().to_numpy()
+    )
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+
+    # Only the columns the arithmetic needs are gathered for every matching row.
+    # Option ids are small dense integers, so they index the per-option arrays directly.
+    option = df['option_id'].to_numpy()[positions].astype(np.int64)
+    closing = df['Closing Rank'].to_numpy(dtype=np.float64, na_value=np.nan)[positions]
+    year = df['Year'].to_numpy()[positions].astype(np.int64)
+    if 'Round' in df.columns:
+        round_no = df['Round'].to_numpy(dtype=np.int64, na_value=0)[positions]
+    else:
+        round_no = np.zeros(len(positions), dtype=np.int64)
+    n_options = option.max() + 1
+
+    weights = YEAR_DECAY ** (year.max() - year)
+    total = np.bincount(option, weights=weights, minlength=n_options)
+    cleared = np.bincount(option, weights=weights * (closing >= rank), minlength=n_options)
+    with np.errstate(invalid='ignore'):
+        chance = cleared / total
+    cutoffs_seen = np.bincount(option, minlength=n_options)
+    best = np.full(n_options, -np.inf)
+    np.maximum.at(best, option, closing)
+
+    # Latest cutoff per option: highest (year, round), with the row number packed into the low digits
+    row = np.arange(len(positions), dtype=np.int64)
+    latest_key = np.full(n_options, -1, dtype=np.int64)
+    np.maximum.at(latest_key, option, (year * 1000 + round_no) * len(positions) + row)
+    present = np.flatnonzero(cutoffs_seen)
+    last = latest_key[present] % len(positions)
+
+    chance, best, cutoffs_seen = chance[present], best[present], cutoffs_seen[present]
+    keep = (chance > 0) | (rank <= best * (1 + REACH_MARGIN))
+    outlook_code = np.where(chance >= SAFE_CHANCE, 0, np.where(chance >= MODERATE_CHANCE, 1, 2))
+
+    latest = df.iloc[positions[last]]
+    result = pd.DataFrame({
+        'Outlook': pd.Categorical.from_codes(outlook_code, categories=OUTLOOKS, ordered=True),
+        'Chance': chance,
+        'Institute': latest['Institute'].array,
+        'Academic Program Name': latest['Academic Program Name'].array,
+        'Type': latest['Type'].array,
+        'Quota': latest['Quota'].array,
+        'Seat Type': latest['Seat Type'].array,
+        'Gender': latest['Gender'].array,
+        'Latest Closing Rank': closing[last].astype(np.int64),
+        'Latest Year': year[last],
+        'Best Closing Rank': best.astype(np.int64),
+        'Cutoffs Seen': cutoffs_seen,
+    }, columns=PREDICTION_COLUMNS)[keep]
+    return result.sort_values(['Outlook', 'Latest Closing Rank'], kind='stable').reset_index(drop=True)
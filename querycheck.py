@@ -0,0 +1,150 @@
+# querycheck.py - Fail when a registered hot-path statement falls back to a full table scan
+#
+# Usage:
+#   python querycheck.py                          # against freshly generated synthetic databases
+#   python querycheck.py --rows 500000 --users 5000
+#   python querycheck.py --db-dir /srv/jee        # against existing jee_data.db and jee_seats.db
+#   python querycheck.py --verbose                # print every plan
+#
+# Statements are registered with database.register_query() next to the code
+# that runs them. Each one is run through EXPLAIN QUERY PLAN and any
+# "SCAN <table>" step (including full scans of a covering index) on a hot
+# statement fails the check, unless the table is listed in its allow_scan.
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+
+# Modules whose import registers the statements they run
+QUERY_MODULES = ["auth", "shortlist", "seat_cache", "seat_upload", "allocation_sim"]
+
+_SCAN = re.compile(r"^SCAN (\S+)")
+
+
+def _dummy_params(sql):
+    return (None,) * sql.count("?")
+
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN detail lines for a statement"""
+    sql = sql.replace("{placeholders}", "?")
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", _dummy_params(sql))]
+
+
+def full_scans(plan, allow_scan=()):
+    """Tables (or aliases) a plan reads from start to end"""
+    scans = []
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if not match:
+            continue
+        table = match.group(1)
+        # Constant rows and materialized subqueries are not table scans
+        if table == "CONSTANT" or table.startswith("(") or table in allow_scan:
+            continue
+        scans.append(table)
+    return scans
+
+
+def check_queries(registry, connect, analyze=False):
+    """
+    Explain every registered statement
+
+    Args:
+        registry (dict): database.QUERY_REGISTRY
+        connect (dict): 'user'/'seat' -> function returning a new connection
+        analyze (bool): Run ANALYZE first so the planner sees real table statistics
+
+    Returns:
+        list: dicts with name, db, hot, plan, scans, temp_btree, error and failed
+    """
+    if analyze:
+        for db, factory in connect.items():
+            conn = factory()
+            try:
+                # Only the file the connection owns; attached files are read-only
+                conn.execute("ANALYZE main")
+                conn.commit()
+            finally:
+                conn.close()
+
+    results = []
+    for name, entry in sorted(registry.items()):
+        result = {"name": name, "db": entry["db"], "hot": entry["hot"], "plan": [], "scans": [],
+                  "temp_btree": False, "error": None}
+        conn = connect[entry["db"]]()
+        try:
+            for statement in entry["setup"]:
+                conn.execute(statement)
+            result["plan"] = explain(conn, entry["sql"])
+            result["scans"] = full_scans(result["plan"], entry["allow_scan"])
+            result["temp_btree"] = any("USE TEMP B-TREE" in detail for detail in result["plan"])
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            conn.close()
+        result["failed"] = result["error"] is not None or (entry["hot"] and bool(result["scans"]))
+        results.append(result)
+    return results
+
+
+def _generate(workdir, rows, users, seed):
+    from generate_data import main as generate_main
+    generate_main(["--rows", str(rows), "--users", str(users), "--seed", str(seed),
+                   "--out-dir", workdir, "--no-csv"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that hot-path SQL uses indexes")
+    parser.add_argument("--db-dir", default=None, help="Directory with jee_data.db and jee_seats.db (default: generate)")
+    parser.add_argument("--rows", type=int, default=100_000, help="Synthetic seat rows when generating")
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic users when generating")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--analyze", action="store_true", help="Run ANALYZE on the databases first (writes sqlite_stat1)")
+    parser.add_argument("--verbose", action="store_true", help="Print the plan of every statement")
+    args = parser.parse_args(argv)
+
+    if args.db_dir:
+        os.environ["JEE_DB_PATH"] = os.path.join(args.db_dir, "jee_data.db")
+        os.environ["JEE_SEAT_DB_PATH"] = os.path.join(args.db_dir, "jee_seats.db")
+    else:
+        # Sets the database paths before anything imports database.py
+        _generate(tempfile.mkdtemp(prefix="jee-querycheck-"), args.rows, args.users, args.seed)
+
+    import importlib
+    import database
+    for module in QUERY_MODULES:
+        importlib.import_module(module)
+
+    connect = {
+        "user": lambda: database.get_connection(attach_seats=True),
+        "seat": lambda: database.get_seat_connection(readonly=False),
+    }
+    results = check_queries(database.QUERY_REGISTRY, connect, analyze=args.analyze)
+
+    for result in results:
+        if result["error"]:
+            status = f"❌ error: {result['error']}"
+        elif result["scans"]:
+            status = ("❌" if result["hot"] else "➖") + f" full scan of {', '.join(result['scans'])}"
+        else:
+            status = "✅"
+        note = " (sorts in a temp b-tree)" if result["temp_btree"] else ""
+        print(f"{result['name']:<32} {result['db']:<5} {status}{note}")
+        if args.verbose or result["failed"]:
+            for detail in result["plan"]:
+                print(f"      {detail}")
+
+    failed = [r for r in results if r["failed"]]
+    if failed:
+        print(f"❌ {len(failed)} of {len(results)} registered statements need attention")
+        return 1
+    print(f"✅ {len(results)} registered statements use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
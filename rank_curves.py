@@ -0,0 +1,103 @@
+# rank_curves.py - "Options still open at rank X" counts from arrays built once per seat snapshot
+#
+# For each grouping (institute type, branch group, quota, seat type) the latest
+# closing rank of every option is kept sorted within its group, with all groups
+# in one array keyed by (group, closing rank). The number of options in a group
+# still open at rank X is the group size minus the position of X in the group,
+# so any rank, or a whole grid of ranks for a chart, is a binary search away.
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from search import PROGRAM_TAGS
+from topk import get_rank_index
+
+
+CURVE_DIMENSIONS = {
+    "Institute Type": "Type",
+    "Branch Group": None,
+    "Quota": "Quota",
+    "Seat Type": "Seat Type",
+}
+
+# Programs matching none of the PROGRAM_TAGS
+OTHER_BRANCHES = "Other"
+
+CURVE_POINTS = 80
+
+
+class RankCurves:
+    """Per-group sorted closing ranks of every option for O(log n) open-option counts"""
+
+    def __init__(self, index):
+        self.index = index
+        self.groups = {}
+        for name, column in CURVE_DIMENSIONS.items():
+            if column is None:
+                labels, codes = self._branch_groups()
+            else:
+                labels = list(index.categories[column])
+                codes = index.codes[column].astype(np.int64)
+            # Options are already in closing rank order; a stable sort by group keeps it within each group
+            keep = codes >= 0
+            codes, closing = codes[keep], index.closing[keep]
+            order = np.argsort(codes, kind="stable")
+            keys = (codes[order] << 32) + closing[order]
+            sizes = np.bincount(codes, minlength=len(labels))
+            self.groups[name] = (labels, keys, sizes)
+
+    def _branch_groups(self):
+        """Branch group of every option: the first PROGRAM_TAGS entry its program matches"""
+        labels = list(PROGRAM_TAGS) + [OTHER_BRANCHES]
+        names = pd.Series(self.index.categories["Academic Program Name"], dtype=object)
+        group_of_program = np.full(len(names) + 1, len(labels) - 1, dtype=np.int64)
+        unmatched = np.ones(len(names), dtype=bool)
+        for code, pattern in enumerate(PROGRAM_TAGS.values()):
+            match = unmatched & names.str.contains(pattern, case=False, na=False).to_numpy()
+            group_of_program[:-1][match] = code
+            unmatched &= ~match
+        return labels, group_of_program[self.index.codes["Academic Program Name"]]
+
+    def open_at(self, dimension, ranks):
+        """
+        Options per group whose closing rank is at or above each rank
+
+        Returns:
+            pandas.DataFrame: One row per rank, one column per group
+        """
+        labels, keys, sizes = self.groups[dimension]
+        ranks = np.asarray(ranks, dtype=np.int64)
+        group = np.arange(len(labels), dtype=np.int64)
+        group_start = np.searchsorted(keys, group << 32)
+        positions = np.searchsorted(keys, (group[:, None] << 32) + ranks[None, :])
+        counts = sizes[:, None] - (positions - group_start[:, None])
+        return pd.DataFrame(counts.T, index=pd.Index(ranks, name="Rank"), columns=labels)
+
+    def closing_between(self, dimension, low, high):
+        """Options per group whose closing rank falls in [low, high]"""
+        labels, keys, _ = self.groups[dimension]
+        group = np.arange(len(labels), dtype=np.int64) << 32
+        counts = np.searchsorted(keys, group + int(high), side="right") - np.searchsorted(keys, group + int(low))
+        return pd.Series(counts, index=labels)
+
+
+_curves = None
+_curves_lock = threading.Lock()
+
+
+def get_rank_curves(df):
+    """Shared RankCurves for the cached seat frame, rebuilt with its rank index"""
+    global _curves
+    index = get_rank_index(df)
+    with _curves_lock:
+        if _curves is None or _curves.index is not index:
+            _curves = RankCurves(index)
+        return _curves
+
+
+def curve_grid(rank_range, points=CURVE_POINTS):
+    """Evenly spaced ranks across the selected closing-rank range"""
+    low, high = int(rank_range[0]), int(rank_range[1])
+    return np.unique(np.linspace(max(low, 1), max(high, low, 1), points).astype(np.int64))
@@ -0,0 +1,186 @@
+# search.py - Seat search logic shared by the app pages, benchmarks and batch tools
+
+import bisect
+import json
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+
+# Keys the seat cache carries for joins, not for users
+INTERNAL_SEAT_COLUMNS = ['option_id']
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+# Program groups offered next to the program names, matched against the program name
+PROGRAM_TAGS = {
+    "Computers": "Computer|Data|AI|Artificial|Intelligence",
+    "Electronics": "Electronics",
+    "Electrical": "Electrical",
+    "Mechanical": "Mechanical",
+    "Civil": "Civil",
+    "Chemical": "Chemical",
+}
+
+
+# Options a facet picker sends to the browser besides the selected ones
+FACET_PICKER_LIMIT = 50
+
+# Words left out of abbreviations ("Indian Institute of Technology Bombay" -> "IITB")
+ABBREVIATION_STOPWORDS = {"of", "and", "the", "in", "for", "at"}
+
+
+def significant_words(name):
+    """Words of a name before any parenthesis, without ABBREVIATION_STOPWORDS"""
+    return [word for word in re.findall(r"[A-Za-z]+", str(name).split("(")[0])
+            if word.lower() not in ABBREVIATION_STOPWORDS]
+
+
+def name_initials(name):
+    """'Indian Institute of Technology Bombay' -> 'IITB'; words already in capitals are kept whole"""
+    return "".join(word if word.isupper() else word[0] for word in significant_words(name)).upper()
+
+
+def _facet_words(text):
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+class PrefixIndex:
+    """
+    Sorted (word, option) pairs over facet values for search-as-you-type
+
+    An option matches when every query word is a prefix of one of its words
+    or of its initials ('nit' finds 'National Institute of Technology Goa').
+    """
+
+    def __init__(self, options):
+        self.options = list(options)
+        pairs = sorted({
+            (word, i) for i, option in enumerate(self.options)
+            for word in _facet_words(option) + [name_initials(option).lower()] if word
+        })
+        self.words = [word for word, _ in pairs]
+        self.option_of = [i for _, i in pairs]
+
+    def match(self, query, limit=FACET_PICKER_LIMIT):
+        """Up to limit options matching query: names starting with it first, then in option order"""
+        words = _facet_words(query)
+        if not words:
+            return self.options[:limit]
+        matched = None
+        for word in words:
+            # Every word with this prefix sorts between the prefix and the prefix followed by the last code point
+            lo = bisect.bisect_left(self.words, word)
+            hi = bisect.bisect_left(self.words, word + "\U0010ffff", lo)
+            found = set(self.option_of[lo:hi])
+            matched = found if matched is None else matched & found
+        prefix = query.strip().lower()
+        ranked = sorted(matched, key=lambda i: (not self.options[i].lower().startswith(prefix), i))
+        return [self.options[i] for i in ranked[:limit]]
+
+
+@lru_cache(maxsize=32)
+def _prefix_index(options):
+    return PrefixIndex(options)
+
+
+def get_prefix_index(options):
+    """PrefixIndex over a list of facet values, reused while the list is unchanged"""
+    return _prefix_index(tuple(options))
+
+
+def get_college_options(df, selected_types):
+    """Institute names available for the selected college types"""
+    return sorted(df.loc[df["Type"].isin(selected_types), "Institute"].dropna().unique())
+
+
+def get_program_options(df, selected_types, selected_colleges):
+    """Rows and program names available for the selected types and colleges"""
+    filtered_df_for_programs = df[df["Type"].isin(selected_types)]
+    if selected_colleges and "All" not in selected_colleges:
+        filtered_df_for_programs = filtered_df_for_programs[filtered_df_for_programs["Institute"].isin(selected_colleges)]
+    all_programs = sorted(filtered_df_for_programs["Academic Program Name"].dropna().unique().tolist())
+    return filtered_df_for_programs, all_programs
+
+
+def apply_filters(df, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type, filtered_df_for_programs):
+    """Apply all filters to the dataframe"""
+    filtered_df = df[df["Type"].isin(selected_types)]
+    if selected_colleges and "All" not in selected_colleges:
+        filtered_df = filtered_df[filtered_df["Institute"].isin(selected_colleges)]
+    filtered_df = filtered_df[
+        (filtered_df["Closing Rank"] >= rank_range[0]) &
+        (filtered_df["Closing Rank"] <= rank_range[1])
+    ]
+    
+    if gender:
+        filtered_df = filtered_df[filtered_df["Gender"].isin(gender)]
+    if seat_type:
+        filtered_df = filtered_df[filtered_df["Seat Type"].isin(seat_type)]
+    if quota:
+        filtered_df = filtered_df[filtered_df["Quota"].isin(quota)]
+    
+    selected_programs = expand_program_group(program_group, filtered_df_for_programs)
+    if selected_programs:
+        filtered_df = filtered_df[filtered_df["Academic Program Name"].isin(selected_programs)]
+    
+    return filtered_df.sort_values(by="Closing Rank")
+
+def expand_program_group(program_group, filtered_df_for_programs):
+    """Program names selected by a mix of PROGRAM_TAGS and individual program names"""
+    selected_programs = []
+    for tag, pattern in PROGRAM_TAGS.items():
+        if tag in program_group:
+            selected_programs += filtered_df_for_programs[
+                filtered_df_for_programs["Academic Program Name"].str.contains(pattern, case=False, na=False)
+            ]["Academic Program Name"].unique().tolist()
+    selected_programs += [pg for pg in program_group if pg not in PROGRAM_TAGS]
+    return selected_programs
+
+def public_seat_columns(df):
+    """Drop internal keys, and Round when no row has one, before showing or exporting seat rows"""
+    hidden = [c for c in INTERNAL_SEAT_COLUMNS if c in df.columns]
+    if "Round" in df.columns and df["Round"].isna().all():
+        hidden.append("Round")
+    return df.drop(columns=hidden)
+
+
+def sparkline(values):
+    """Text sparkline of a series of ranks, e.g. '▂▃▅█'"""
+    values = [v for v in values if v is not None]
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARS[0] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[round((v - low) * scale)] for v in values)
+
+
+def add_trend_columns(df, trends):
+    """
+    Add each row's option trend from the materialized trend table
+
+    Adds 'Trend' (closing rank per year, for a line chart column) and
+    'Closing Δ' (change against the previous year) after 'Closing Rank'.
+    """
+    df = df.copy()
+    option_trends = trends.reindex(pd.unique(df["option_id"]))
+    closing_ranks = option_trends["closing_ranks"].map(lambda text: json.loads(text) if isinstance(text, str) else [])
+    position = df.columns.get_loc("Closing Rank") + 1 if "Closing Rank" in df.columns else len(df.columns)
+    df.insert(position, "Trend", df["option_id"].map(closing_ranks).to_numpy())
+    df.insert(position + 1, "Closing Δ", df["option_id"].map(option_trends["closing_delta"]).astype("Int64").to_numpy())
+    return df
+
+
+def format_dataframe_for_display(df, trends=None):
+    """Format dataframe with commas in ranks (and trend columns when the option trends are given)"""
+    if trends is not None and "option_id" in df.columns:
+        df = add_trend_columns(df, trends)
+    display_df = public_seat_columns(df)
+    if "Closing Rank" in display_df.columns:
+        display_df["Closing Rank"] = display_df["Closing Rank"].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "")
+    if "Opening Rank" in display_df.columns:
+        display_df["Opening Rank"] = display_df["Opening Rank"].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "")
+    return display_df
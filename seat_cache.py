@@ -0,0 +1,258 @@
+# seat_cache.py - Long-lived in-memory seat data refreshed with deltas
+
+import threading
+from collections import Counter
+import numpy as np
+import pandas as pd
+from database import get_seat_connection, get_seat_data_version, register_query
+from seat_schema import DIMENSION_TABLES, OPTION_KEYS, SEAT_VIEW_COLUMNS, read_dimensions
+
+
+# Columns whose distinct values feed the filter widgets
+FACET_COLUMNS = ['Type', 'Institute', 'Location', 'Academic Program Name', 'Gender', 'Quota', 'Seat Type']
+
+# Above this share of changed rows a full reload is cheaper than applying deltas
+MAX_DELTA_FRACTION = 0.25
+
+EMPTY_SEAT_COLUMNS = SEAT_VIEW_COLUMNS + ['option_id']
+
+# Ids bound per query when reading changed rows, well under SQLite's variable limit
+ID_QUERY_CHUNK = 500
+
+# Facts are read with integer keys and decoded against the small dimension tables,
+# so names are held once per category rather than once per row
+_FACTS_SQL = """
+    SELECT f.id AS seat_id, f.option_id, o.institute_id, o.program_id, o.quota_id, o.seat_type_id, o.gender_id,
+           f.opening_rank AS "Opening Rank", f.closing_rank AS "Closing Rank", f.year AS Year, f.round AS Round
+    FROM seat_cutoffs f JOIN dim_option o ON o.id = f.option_id
+"""
+
+# A full reload reads the whole table by design
+ALL_SEATS_SQL = register_query("seat_cache.all_seats", _FACTS_SQL, db="seat", hot=False)
+SEAT_CHANGES_SQL = register_query(
+    "seat_cache.changes", "SELECT version, seat_id, op FROM seat_changes WHERE version > ? AND version <= ?", db="seat"
+)
+SEATS_BY_ID_SQL = register_query(
+    "seat_cache.seats_by_id", _FACTS_SQL + " WHERE f.id IN ({placeholders})", db="seat"
+)
+
+# Trend rows stay as JSON text; only the displayed rows are decoded
+_TRENDS_SQL = "SELECT option_id, years, closing_ranks, closing_delta, closing_slope FROM seat_trends"
+ALL_TRENDS_SQL = register_query("seat_cache.all_trends", _TRENDS_SQL, db="seat", hot=False)
+TRENDS_BY_OPTION_SQL = register_query(
+    "seat_cache.trends_by_option", _TRENDS_SQL + " WHERE option_id IN ({placeholders})", db="seat"
+)
+
+
+def _read_by_ids(sql, conn, ids, index_col):
+    """Run a '{placeholders}' query over a list of ids, ID_QUERY_CHUNK ids at a time"""
+    ids = [int(i) for i in ids]
+    chunks = [ids[i:i + ID_QUERY_CHUNK] for i in range(0, len(ids), ID_QUERY_CHUNK)] or [[]]
+    return pd.concat([
+        pd.read_sql_query(sql.format(placeholders=", ".join("?" for _ in chunk)), conn, params=chunk, index_col=index_col)
+        for chunk in chunks
+    ])
+
+
+def _categorical(ids, values):
+    """Categorical of the values for each dimension id, with categories in sorted order"""
+    categories = sorted(values.dropna().unique())
+    lookup = np.full(int(values.index.max()) + 1 if len(values) else 1, -1, dtype=np.int32)
+    positions = pd.Index(categories).get_indexer(values)
+    lookup[values.index.to_numpy()] = positions
+    return pd.Categorical.from_codes(lookup[ids], categories=categories)
+
+
+def _seat_frame(facts, dims):
+    """Decode fact rows into the jee_seats column layout"""
+    institutes = dims['Institute']
+    institute_ids = facts['institute_id'].to_numpy()
+    columns = {
+        'Institute': _categorical(institute_ids, institutes['name']),
+        'Location': _categorical(institute_ids, institutes['location']),
+        'Type': _categorical(institute_ids, institutes['type']),
+    }
+    for column in list(DIMENSION_TABLES)[1:]:
+        columns[column] = _categorical(facts[OPTION_KEYS[column]].to_numpy(), dims[column]['name'])
+    df = pd.DataFrame(columns, index=facts.index)
+    for column in ['Opening Rank', 'Closing Rank', 'Year']:
+        df[column] = facts[column]
+    df['Round'] = facts['Round'].astype('Int64')
+    df['option_id'] = facts['option_id']
+    return df[EMPTY_SEAT_COLUMNS]
+
+
+def _institutes_changed(old, new):
+    """Whether any institute in both dimension snapshots now has another location or type"""
+    common = old.index.intersection(new.index)
+    before = old.loc[common, ['location', 'type']]
+    after = new.loc[common, ['location', 'type']]
+    return not before.equals(after)
+
+
+def _align_categories(*frames):
+    """Give categorical columns the same (sorted union) categories so concat keeps them categorical"""
+    for column in frames[0].columns:
+        if not isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            continue
+        categories = sorted(set().union(*(frame[column].cat.categories for frame in frames)))
+        for frame in frames:
+            if list(frame[column].cat.categories) != categories:
+                frame[column] = frame[column].cat.set_categories(categories)
+
+
+class SeatDataCache:
+    """In-memory seat DataFrame, facet counts and derived indexes kept in sync with the DB"""
+
+    def __init__(self):
+        self.version = None
+        self.df = None
+        self.dims = None
+        self.trends = None
+        self.facet_counts = {}
+        self._facet_options = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def register_listener(self, callback):
+        """
+        Register a derived structure to keep in sync
+
+        callback(df, removed, inserted) is called after every refresh. On a full
+        reload removed and inserted are both None and the structure should rebuild.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def get(self):
+        """Return the current seat DataFrame (indexed by seat_id)"""
+        with self._lock:
+            self.sync()
+            return self.df
+
+    def get_trends(self):
+        """Return the year-over-year trend of every option (indexed by option_id)"""
+        with self._lock:
+            self.sync()
+            return self.trends
+
+    def get_facet_options(self, column):
+        """Sorted distinct values of a facet column"""
+        with self._lock:
+            self.sync()
+            options = self._facet_options.get(column)
+            if options is None:
+                options = sorted(value for value, count in self.facet_counts.get(column, {}).items() if count > 0)
+                self._facet_options[column] = options
+            return options
+
+    def sync(self):
+        """Bring the cache up to the database version, applying deltas when possible"""
+        with self._lock:
+            conn = None
+            try:
+                conn = get_seat_connection()
+                version = get_seat_data_version(conn)
+                if self.df is not None and version == self.version:
+                    return
+                applied = False
+                if self.df is not None:
+                    try:
+                        applied = self._apply_deltas(conn, version)
+                    except Exception as e:
+                        # Retrying the same delta on every call would serve stale data for good
+                        print(f"Error applying seat data changes, reloading: {e}")
+                if not applied:
+                    self._full_reload(conn, version)
+            except Exception as e:
+                print(f"Error getting JEE data: {e}")
+                if self.df is None:
+                    # Return empty dataframe with expected columns if table doesn't exist
+                    self.df = pd.DataFrame(columns=EMPTY_SEAT_COLUMNS)
+                    self.trends = None
+                    self.facet_counts = {}
+                    self._facet_options = {}
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _full_reload(self, conn, version):
+        dims = read_dimensions(conn)
+        df = _seat_frame(pd.read_sql_query(ALL_SEATS_SQL, conn, index_col="seat_id"), dims)
+        self.df = df
+        self.dims = dims
+        self.trends = pd.read_sql_query(ALL_TRENDS_SQL, conn, index_col="option_id")
+        self.version = version
+        self.facet_counts = {
+            col: Counter(df[col].dropna().value_counts().to_dict()) for col in FACET_COLUMNS if col in df.columns
+        }
+        self._facet_options = {}
+        self._notify(None, None)
+
+    def _apply_deltas(self, conn, version):
+        """Apply logged changes since the cached version; False means a full reload is needed"""
+        changes = pd.read_sql_query(
+            SEAT_CHANGES_SQL, conn, params=(self.version, version)
+        )
+        # Every version bump logs at least one row, so a gap means the log was pruned
+        if changes['version'].nunique() != version - self.version or (changes['op'] == 'reload').any():
+            return False
+        if len(changes) > MAX_DELTA_FRACTION * max(len(self.df), 1):
+            return False
+        # Inserts through the view update an institute's location and type, which cached rows
+        # outside the delta carry too
+        dims = read_dimensions(conn)
+        if self.dims is None or _institutes_changed(self.dims['Institute'], dims['Institute']):
+            return False
+
+        # Replay in order so a row inserted and deleted within the window disappears
+        deleted_ids = set()
+        inserted_ids = set()
+        for seat_id, op in changes.sort_values('version', kind='stable')[['seat_id', 'op']].itertuples(index=False):
+            if op == 'delete':
+                if seat_id in inserted_ids:
+                    inserted_ids.discard(seat_id)
+                else:
+                    deleted_ids.add(seat_id)
+            else:
+                inserted_ids.add(seat_id)
+
+        removed = self.df.loc[self.df.index.intersection(list(deleted_ids))]
+        if inserted_ids:
+            inserted = _seat_frame(_read_by_ids(SEATS_BY_ID_SQL, conn, inserted_ids, "seat_id"), dims)
+        else:
+            inserted = self.df.iloc[0:0]
+
+        # Build a new frame rather than mutating the one handed out to readers
+        remaining = self.df.drop(index=removed.index)
+        if len(inserted):
+            _align_categories(remaining, inserted)
+        self.df = pd.concat([remaining, inserted]) if len(inserted) else remaining
+        self.trends = self._refresh_trends(conn, set(removed['option_id']) | set(inserted['option_id']))
+        self.dims = dims
+        self.version = version
+
+        for col, counts in self.facet_counts.items():
+            counts.subtract(removed[col].dropna().value_counts().to_dict())
+            if col in inserted.columns:
+                counts.update(inserted[col].dropna().value_counts().to_dict())
+        self._facet_options = {}
+        self._notify(removed, inserted)
+        return True
+
+    def _refresh_trends(self, conn, option_ids):
+        if not option_ids:
+            return self.trends
+        option_ids = [int(option_id) for option_id in option_ids]
+        changed = _read_by_ids(TRENDS_BY_OPTION_SQL, conn, option_ids, "option_id")
+        return pd.concat([self.trends.drop(index=self.trends.index.intersection(option_ids)), changed])
+
+    def _notify(self, removed, inserted):
+        for callback in self._listeners:
+            try:
+                callback(self.df, removed, inserted)
+            except Exception as e:
+                print(f"Error refreshing seat data listener {callback}: {e}")
+
+
+seat_data_cache = SeatDataCache()
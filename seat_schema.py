@@ -0,0 +1,412 @@
+# seat_schema.py - Star schema for seat cutoffs: integer-keyed dimensions, a narrow fact table
+# and a jee_seats compatibility view
+#
+# dim_institute (with location and type), dim_program, dim_quota, dim_seat_type and
+# dim_gender hold each name once. dim_option is one seat option, i.e. one
+# (institute, program, quota, seat type, gender) combination, and stays stable
+# across years and rounds. seat_cutoffs holds (option, year, round, opening,
+# closing) per row; its id is the seat_id used by the cache and change log.
+#
+# jee_seats is a view with the old column names. INSTEAD OF triggers turn
+# inserts, updates and deletes on it into dimension and fact writes, so older
+# scripts keep working. Bulk loads use stage_seat_rows() + load_staged_seats().
+
+import pandas as pd
+
+
+SEAT_VIEW_COLUMNS = [
+    'Institute', 'Location', 'Type', 'Academic Program Name', 'Quota',
+    'Seat Type', 'Gender', 'Opening Rank', 'Closing Rank', 'Year', 'Round'
+]
+
+# Seat option columns stored as dimensions: view column -> table
+DIMENSION_TABLES = {
+    'Institute': 'dim_institute',
+    'Academic Program Name': 'dim_program',
+    'Quota': 'dim_quota',
+    'Seat Type': 'dim_seat_type',
+    'Gender': 'dim_gender',
+}
+
+# dim_option key column for each dimension
+OPTION_KEYS = {
+    'Institute': 'institute_id',
+    'Academic Program Name': 'program_id',
+    'Quota': 'quota_id',
+    'Seat Type': 'seat_type_id',
+    'Gender': 'gender_id',
+}
+
+SEAT_TABLES = ['seat_trends', 'seat_cutoffs', 'dim_option'] + list(DIMENSION_TABLES.values())
+
+
+def _quote(column):
+    return f'"{column}"'
+
+
+_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS dim_institute (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        location TEXT,
+        type TEXT
+    )
+    """,
+    *[f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)"
+      for table in list(DIMENSION_TABLES.values())[1:]],
+    """
+    CREATE TABLE IF NOT EXISTS dim_option (
+        id INTEGER PRIMARY KEY,
+        institute_id INTEGER NOT NULL REFERENCES dim_institute (id),
+        program_id INTEGER NOT NULL REFERENCES dim_program (id),
+        quota_id INTEGER NOT NULL REFERENCES dim_quota (id),
+        seat_type_id INTEGER NOT NULL REFERENCES dim_seat_type (id),
+        gender_id INTEGER NOT NULL REFERENCES dim_gender (id),
+        UNIQUE (institute_id, program_id, quota_id, seat_type_id, gender_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS seat_cutoffs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        option_id INTEGER NOT NULL REFERENCES dim_option (id),
+        year INTEGER,
+        round INTEGER,
+        opening_rank INTEGER,
+        closing_rank INTEGER
+    )
+    """,
+    # Year-over-year pivot per option, rebuilt at ingest: JSON arrays of the years and
+    # the last round's ranks in each year, the change against the previous year and
+    # the least-squares slope of the closing rank (ranks per year)
+    """
+    CREATE TABLE IF NOT EXISTS seat_trends (
+        option_id INTEGER PRIMARY KEY REFERENCES dim_option (id),
+        years TEXT NOT NULL,
+        opening_ranks TEXT NOT NULL,
+        closing_ranks TEXT NOT NULL,
+        opening_delta INTEGER,
+        closing_delta INTEGER,
+        closing_slope REAL
+    )
+    """,
+]
+
+# Natural key lookups (uploads replacing rows) and per-option history
+FACT_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_seat_cutoffs_option ON seat_cutoffs (option_id, year, round)"
+
+_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS jee_seats AS
+    SELECT f.id AS id,
+           i.name AS Institute,
+           i.location AS Location,
+           i.type AS Type,
+           p.name AS "Academic Program Name",
+           q.name AS Quota,
+           s.name AS "Seat Type",
+           g.name AS Gender,
+           f.opening_rank AS "Opening Rank",
+           f.closing_rank AS "Closing Rank",
+           f.year AS Year,
+           f.round AS Round
+    FROM seat_cutoffs f
+    JOIN dim_option o ON o.id = f.option_id
+    JOIN dim_institute i ON i.id = o.institute_id
+    JOIN dim_program p ON p.id = o.program_id
+    JOIN dim_quota q ON q.id = o.quota_id
+    JOIN dim_seat_type s ON s.id = o.seat_type_id
+    JOIN dim_gender g ON g.id = o.gender_id
+"""
+
+
+def _trigger_dimensions_sql():
+    """Trigger body statements adding NEW's names to the dimensions and its option"""
+    statements = [
+        "SELECT RAISE(ABORT, 'jee_seats rows need Institute, Academic Program Name, Quota, Seat Type and Gender') "
+        "WHERE " + " OR ".join(f"NEW.{_quote(c)} IS NULL" for c in DIMENSION_TABLES),
+        "INSERT INTO dim_institute (name, location, type) VALUES (NEW.Institute, NEW.Location, NEW.Type) "
+        "ON CONFLICT (name) DO UPDATE SET location = COALESCE(excluded.location, location), "
+        "type = COALESCE(excluded.type, type)",
+    ]
+    for column, table in list(DIMENSION_TABLES.items())[1:]:
+        statements.append(f"INSERT OR IGNORE INTO {table} (name) VALUES (NEW.{_quote(column)})")
+    statements.append(
+        f"INSERT OR IGNORE INTO dim_option ({', '.join(OPTION_KEYS.values())}) VALUES ("
+        + ", ".join(f"(SELECT id FROM {table} WHERE name = NEW.{_quote(column)})"
+                    for column, table in DIMENSION_TABLES.items())
+        + ")"
+    )
+    return statements
+
+
+def option_id_sql(values, schema=""):
+    """
+    Scalar subquery for the dim_option id of five names, resolved through the unique name indexes
+
+    Args:
+        values (dict): View column -> SQL expression for that name (e.g. '?' or a column reference)
+        schema (str): Schema prefix such as 'seats.' when the seat file is attached
+    """
+    return f"(SELECT id FROM {schema}dim_option WHERE " + " AND ".join(
+        f"{OPTION_KEYS[column]} = (SELECT id FROM {schema}{table} WHERE name = {values[column]})"
+        for column, table in DIMENSION_TABLES.items()
+    ) + ")"
+
+
+def _trigger_option_id_sql():
+    """Scalar subquery for the dim_option id of NEW"""
+    return option_id_sql({column: f"NEW.{_quote(column)}" for column in DIMENSION_TABLES})
+
+
+def _triggers_sql():
+    dimensions = ";\n        ".join(_trigger_dimensions_sql())
+    option_id = _trigger_option_id_sql()
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS jee_seats_insert INSTEAD OF INSERT ON jee_seats
+        BEGIN
+            {dimensions};
+            INSERT INTO seat_cutoffs (id, option_id, year, round, opening_rank, closing_rank)
+            VALUES (NEW.id, {option_id}, NEW.Year, NEW.Round, NEW."Opening Rank", NEW."Closing Rank");
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS jee_seats_update INSTEAD OF UPDATE ON jee_seats
+        BEGIN
+            {dimensions};
+            UPDATE seat_cutoffs
+            SET option_id = {option_id}, year = NEW.Year, round = NEW.Round,
+                opening_rank = NEW."Opening Rank", closing_rank = NEW."Closing Rank"
+            WHERE id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS jee_seats_delete INSTEAD OF DELETE ON jee_seats
+        BEGIN
+            DELETE FROM seat_cutoffs WHERE id = OLD.id;
+        END
+        """,
+    ]
+
+
+def _create_schema(cursor):
+    for statement in _TABLES_SQL:
+        cursor.execute(statement)
+    cursor.execute(FACT_INDEX_SQL)
+    cursor.execute(_VIEW_SQL)
+    for statement in _triggers_sql():
+        cursor.execute(statement)
+
+
+def _trends_sql(option_filter):
+    """INSERT computing seat_trends rows for the options passing option_filter (SQL condition on option_id)"""
+    return f"""
+        INSERT INTO seat_trends (option_id, years, opening_ranks, closing_ranks, opening_delta, closing_delta, closing_slope)
+        WITH last_round AS (
+            SELECT option_id, year, opening_rank, closing_rank,
+                   ROW_NUMBER() OVER (PARTITION BY option_id, year ORDER BY round DESC) AS round_rank
+            FROM seat_cutoffs
+            WHERE year IS NOT NULL AND {option_filter}
+        ),
+        yearly AS (
+            SELECT option_id, year, opening_rank, closing_rank,
+                   -- The slope is fitted over the years that have a closing rank only
+                   CASE WHEN closing_rank IS NOT NULL THEN year END AS ranked_year,
+                   ROW_NUMBER() OVER (PARTITION BY option_id ORDER BY year DESC) AS recency
+            FROM last_round
+            WHERE round_rank = 1
+            ORDER BY option_id, year
+        )
+        SELECT option_id,
+               json_group_array(year),
+               json_group_array(opening_rank),
+               json_group_array(closing_rank),
+               MAX(CASE WHEN recency = 1 THEN opening_rank END) - MAX(CASE WHEN recency = 2 THEN opening_rank END),
+               MAX(CASE WHEN recency = 1 THEN closing_rank END) - MAX(CASE WHEN recency = 2 THEN closing_rank END),
+               CASE WHEN COUNT(closing_rank) > 1 THEN
+                   (COUNT(closing_rank) * SUM(ranked_year * closing_rank) - SUM(ranked_year) * SUM(closing_rank)) * 1.0
+                   / (COUNT(closing_rank) * SUM(ranked_year * ranked_year) - SUM(ranked_year) * SUM(ranked_year))
+               END
+        FROM yearly
+        GROUP BY option_id
+    """
+
+
+def refresh_seat_trends(cursor, option_ids_sql=None, params=()):
+    """
+    Rebuild seat_trends from the fact table
+
+    Args:
+        option_ids_sql (str): SELECT of the option ids whose facts changed (default: all)
+        params (tuple): Parameters of option_ids_sql
+
+    Returns:
+        int: Trend rows written
+    """
+    if option_ids_sql is None:
+        cursor.execute("DELETE FROM seat_trends")
+        cursor.execute(_trends_sql("1"))
+        return cursor.rowcount
+    option_filter = f"option_id IN ({option_ids_sql})"
+    cursor.execute(f"DELETE FROM seat_trends WHERE {option_filter}", params)
+    cursor.execute(_trends_sql(option_filter), params)
+    return cursor.rowcount
+
+
+def _jee_seats_type(cursor):
+    row = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'jee_seats'").fetchone()
+    return row[0] if row else None
+
+
+def ensure_seat_schema(cursor):
+    """
+    Create the star schema, converting a legacy wide jee_seats table in place
+
+    Legacy rows keep their rowid as seat id. Rows missing one of the option
+    columns cannot be keyed and are dropped. The caller commits.
+
+    Returns:
+        str: 'created', 'migrated' or 'ok'
+    """
+    kind = _jee_seats_type(cursor)
+    if kind == 'view':
+        has_trends = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'seat_trends'").fetchone()
+        _create_schema(cursor)
+        if not has_trends:
+            refresh_seat_trends(cursor)
+        return 'ok'
+    if kind is None:
+        _create_schema(cursor)
+        return 'created'
+
+    cursor.execute("DROP TABLE IF EXISTS jee_seats_legacy")
+    cursor.execute("ALTER TABLE jee_seats RENAME TO jee_seats_legacy")
+    legacy_columns = {row[1] for row in cursor.execute("PRAGMA table_info(jee_seats_legacy)")}
+    _create_schema(cursor)
+
+    select_sql = ", ".join(
+        f"{_quote(c)} AS {_quote(c)}" if c in legacy_columns else f"NULL AS {_quote(c)}" for c in SEAT_VIEW_COLUMNS
+    )
+    cursor.execute(f"CREATE TEMP TABLE seat_migration AS SELECT rowid AS id, {select_sql} FROM jee_seats_legacy")
+    total = cursor.execute("SELECT COUNT(*) FROM temp.seat_migration").fetchone()[0]
+    load_staged_seats(cursor, "temp.seat_migration", keep_ids=True)
+    loaded = cursor.execute("SELECT COUNT(*) FROM seat_cutoffs").fetchone()[0]
+    cursor.execute("DROP TABLE temp.seat_migration")
+    cursor.execute("DROP TABLE jee_seats_legacy")
+    if loaded < total:
+        print(f"⚠️ Dropped {total - loaded} legacy seat rows with a missing institute, program, quota, seat type or gender")
+    print(f"✅ Converted {loaded} jee_seats rows to the normalized schema")
+    return 'migrated'
+
+
+def drop_seat_schema(cursor):
+    """Remove every seat table and the compatibility view (for full rebuilds)"""
+    kind = _jee_seats_type(cursor)
+    if kind == 'view':
+        cursor.execute("DROP VIEW jee_seats")
+    elif kind == 'table':
+        cursor.execute("DROP TABLE jee_seats")
+    for table in SEAT_TABLES:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def stage_seat_rows(cursor, df, staging="seat_staging"):
+    """
+    Copy DataFrame rows in jee_seats column format into a new temp table
+
+    Missing columns are staged as NULL. Returns the qualified table name.
+    """
+    columns = SEAT_VIEW_COLUMNS + (['id'] if 'id' in df.columns else [])
+    cursor.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+    cursor.execute(f"CREATE TEMP TABLE {staging} ({', '.join(_quote(c) for c in columns)})")
+    staged = df.reindex(columns=columns).astype(object)
+    staged = staged.where(staged.notna(), None)
+    cursor.executemany(
+        f"INSERT INTO temp.{staging} VALUES ({', '.join('?' for _ in columns)})",
+        staged.itertuples(index=False, name=None)
+    )
+    return f"temp.{staging}"
+
+
+def staged_options_sql(staging):
+    """SELECT of every staged row plus its option_id (rows whose option is unknown drop out)"""
+    joins = "\n".join(
+        f"JOIN {table} d{n} ON d{n}.name = u.{_quote(column)}"
+        for n, (column, table) in enumerate(DIMENSION_TABLES.items())
+    )
+    option_match = " AND ".join(
+        f"o.{OPTION_KEYS[column]} = d{n}.id" for n, column in enumerate(DIMENSION_TABLES)
+    )
+    return f"SELECT u.*, o.id AS option_id FROM {staging} u\n{joins}\nJOIN dim_option o ON {option_match}"
+
+
+def load_staged_dimensions(cursor, staging):
+    """Add the names and options of staged rows to the dimension tables"""
+    cursor.execute(f"""
+        INSERT INTO dim_institute (name, location, type)
+        SELECT Institute, MAX(Location), MAX(Type) FROM {staging} WHERE Institute IS NOT NULL GROUP BY Institute
+        ON CONFLICT (name) DO UPDATE SET location = COALESCE(excluded.location, location),
+                                         type = COALESCE(excluded.type, type)
+    """)
+    for column, table in list(DIMENSION_TABLES.items())[1:]:
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {table} (name) "
+            f"SELECT DISTINCT {_quote(column)} FROM {staging} WHERE {_quote(column)} IS NOT NULL"
+        )
+    joins = "\n".join(
+        f"JOIN {table} d{n} ON d{n}.name = u.{_quote(column)}"
+        for n, (column, table) in enumerate(DIMENSION_TABLES.items())
+    )
+    cursor.execute(
+        f"INSERT OR IGNORE INTO dim_option ({', '.join(OPTION_KEYS.values())}) "
+        f"SELECT DISTINCT {', '.join(f'd{n}.id' for n in range(len(DIMENSION_TABLES)))} FROM {staging} u\n{joins}"
+    )
+
+
+def load_staged_seats(cursor, staging, keep_ids=False):
+    """
+    Insert staged rows as facts, adding any new dimension values first
+
+    Args:
+        staging (str): Temp table in jee_seats column format
+        keep_ids (bool): Use the staged id column as seat id
+
+    Returns:
+        int: Facts inserted
+    """
+    load_staged_dimensions(cursor, staging)
+    id_column = "id, " if keep_ids else ""
+    cursor.execute(f"""
+        INSERT INTO seat_cutoffs ({id_column}option_id, year, round, opening_rank, closing_rank)
+        SELECT {id_column}option_id, Year, Round, "Opening Rank", "Closing Rank"
+        FROM ({staged_options_sql(staging)})
+    """)
+    return cursor.rowcount
+
+
+def load_seat_frame(cursor, df, replace=False):
+    """
+    Load a DataFrame in jee_seats column format (e.g. a cutoff CSV)
+
+    Args:
+        replace (bool): Remove every existing fact first
+
+    Returns:
+        int: Facts inserted
+    """
+    ensure_seat_schema(cursor)
+    if replace:
+        cursor.execute("DELETE FROM seat_cutoffs")
+    staging = stage_seat_rows(cursor, df)
+    inserted = load_staged_seats(cursor, staging)
+    cursor.execute(f"DROP TABLE {staging}")
+    return inserted
+
+
+def read_dimensions(conn):
+    """Dimension tables as DataFrames indexed by id, keyed by view column"""
+    dims = {}
+    for column, table in DIMENSION_TABLES.items():
+        extra = ", location, type" if table == "dim_institute" else ""
+        dims[column] = pd.read_sql_query(f"SELECT id, name{extra} FROM {table}", conn, index_col="id")
+    return dims
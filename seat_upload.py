@@ -0,0 +1,190 @@
+# seat_upload.py - Admin bulk CSV upload of seat cutoffs
+
+import pandas as pd
+import streamlit as st
+from db_writer import run_seat_write
+from database import bump_seat_data_version, record_seat_changes, register_query, SEAT_KEY_COLUMNS
+from seat_schema import ensure_seat_schema, load_staged_dimensions, refresh_seat_trends, stage_seat_rows, staged_options_sql
+
+
+SEAT_UPLOAD_COLUMNS = [
+    'Institute', 'Location', 'Type', 'Academic Program Name', 'Quota',
+    'Seat Type', 'Gender', 'Opening Rank', 'Closing Rank', 'Year'
+]
+SEAT_TEXT_COLUMNS = ['Institute', 'Location', 'Type', 'Academic Program Name', 'Quota', 'Seat Type', 'Gender']
+SEAT_REQUIRED_TEXT_COLUMNS = ['Institute', 'Type', 'Academic Program Name', 'Quota', 'Seat Type', 'Gender']
+
+
+def validate_seat_upload(df):
+    """
+    Validate an uploaded cutoff file with column-wise checks
+
+    Args:
+        df (pandas.DataFrame): Raw CSV contents
+
+    Returns:
+        tuple: (valid rows ready for loading, rejected rows with a 'Reason' column)
+    """
+    missing = [col for col in SEAT_UPLOAD_COLUMNS if col not in df.columns and col != 'Location']
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    columns = SEAT_UPLOAD_COLUMNS + (['Round'] if 'Round' in df.columns else [])
+    clean = df.reindex(columns=columns).copy()
+
+    for col in SEAT_TEXT_COLUMNS:
+        clean[col] = clean[col].astype('string').str.strip().replace('', pd.NA)
+
+    numeric_columns = ['Opening Rank', 'Closing Rank', 'Year'] + (['Round'] if 'Round' in columns else [])
+    for col in numeric_columns:
+        clean[col] = pd.to_numeric(clean[col], errors='coerce')
+
+    reasons = pd.Series('', index=clean.index, dtype=object)
+
+    def reject(mask, reason):
+        reasons[mask & (reasons == '')] = reason
+
+    for col in SEAT_REQUIRED_TEXT_COLUMNS:
+        reject(clean[col].isna(), f"Missing {col}")
+    for col in numeric_columns:
+        reject(clean[col].isna(), f"{col} is not a number")
+        reject(clean[col].mod(1).ne(0) & clean[col].notna(), f"{col} must be a whole number")
+    reject((clean['Opening Rank'] < 1) | (clean['Closing Rank'] < 1), "Ranks must be positive")
+    reject(clean['Opening Rank'] > clean['Closing Rank'], "Opening Rank is greater than Closing Rank")
+    reject((clean['Year'] < 2000) | (clean['Year'] > 2100), "Year is out of range")
+    if 'Round' in columns:
+        reject(clean['Round'] < 1, "Round must be positive")
+
+    # Dedup on the natural key: the last occurrence in the file wins
+    key_columns = SEAT_KEY_COLUMNS + (['Round'] if 'Round' in columns else [])
+    ok = reasons == ''
+    duplicated = clean[ok].duplicated(subset=key_columns, keep='last')
+    reject(duplicated.reindex(clean.index, fill_value=False), "Duplicate of a later row with the same key")
+
+    ok = reasons == ''
+    valid = clean[ok].copy()
+    for col in numeric_columns:
+        valid[col] = valid[col].astype('int64')
+
+    rejected = df[~ok].copy()
+    rejected.insert(0, 'Reason', reasons[~ok])
+    # CSV line numbers (header is line 1)
+    rejected.insert(0, 'Line', rejected.index + 2)
+    return valid.reset_index(drop=True), rejected.reset_index(drop=True)
+
+
+# Staged rows resolved to their seat option; the natural key is (option, year, round)
+_OPTIONS_TABLE_SQL = 'CREATE TEMP TABLE seat_upload_options (option_id, Year, Round, "Opening Rank", "Closing Rank")'
+
+
+def _replaced_rows_sql():
+    """Seat ids sharing a natural key with a staged row, looked up through the option index"""
+    return (
+        "SELECT f.id AS seat_id FROM temp.seat_upload_options u JOIN seat_cutoffs f "
+        "ON f.option_id = u.option_id AND f.year IS u.Year AND f.round IS u.Round"
+    )
+
+
+def _delete_replaced_sql():
+    return f"DELETE FROM seat_cutoffs WHERE id IN ({_replaced_rows_sql()})"
+
+
+# The staged rows are read once; every other step is an index lookup
+register_query("seat_upload.replaced_rows", _replaced_rows_sql(), db="seat",
+               allow_scan=("u",), setup=(_OPTIONS_TABLE_SQL,))
+register_query("seat_upload.delete_replaced", _delete_replaced_sql(), db="seat",
+               allow_scan=("u",), setup=(_OPTIONS_TABLE_SQL,))
+
+
+def bulk_upsert_seats(valid_df):
+    """
+    Upsert validated seat rows in a single transaction
+
+    Rows whose natural key already exists are replaced, everything else is
+    inserted, and the seat data version is bumped so cached data refreshes.
+
+    Returns:
+        dict: loaded/replaced row counts and the new seat data version
+    """
+    return run_seat_write(_upsert_seats, valid_df)
+
+
+def _upsert_seats(cursor, valid_df):
+    ensure_seat_schema(cursor)
+
+    # New names go into the dimension tables first so every staged row resolves to an option
+    staging = stage_seat_rows(cursor, valid_df, "seat_upload")
+    load_staged_dimensions(cursor, staging)
+    cursor.execute("DROP TABLE IF EXISTS temp.seat_upload_options")
+    cursor.execute(_OPTIONS_TABLE_SQL)
+    cursor.execute(
+        'INSERT INTO temp.seat_upload_options SELECT option_id, Year, Round, "Opening Rank", "Closing Rank" '
+        f"FROM ({staged_options_sql(staging)})"
+    )
+    cursor.execute(f"DROP TABLE {staging}")
+
+    version = bump_seat_data_version(cursor)
+
+    record_seat_changes(cursor, version, 'delete', _replaced_rows_sql())
+    cursor.execute(_delete_replaced_sql())
+    replaced = cursor.rowcount
+
+    # New rows get ids above the current maximum
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM seat_cutoffs")
+    max_id = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO seat_cutoffs (option_id, year, round, opening_rank, closing_rank)
+        SELECT option_id, Year, Round, "Opening Rank", "Closing Rank" FROM temp.seat_upload_options
+    """)
+    inserted = cursor.rowcount
+    # Replaced rows share their staged row's option, so only the staged options' trends move
+    refresh_seat_trends(cursor, "SELECT option_id FROM temp.seat_upload_options")
+    cursor.execute("DROP TABLE temp.seat_upload_options")
+    record_seat_changes(cursor, version, 'insert', "SELECT id AS seat_id FROM seat_cutoffs WHERE id > ?", (max_id,))
+
+    return {'loaded': inserted, 'replaced': replaced, 'version': version}
+
+
+def seat_upload_section():
+    """Admin UI for uploading a whole round of cutoffs as CSV"""
+    st.subheader("📤 Bulk Upload Cutoffs (CSV)")
+    st.caption(
+        "Columns: " + ", ".join(SEAT_UPLOAD_COLUMNS) + " (optional: Round). "
+        "Rows with the same institute, program, quota, seat type, gender, year and round replace existing records."
+    )
+    uploaded = st.file_uploader("Cutoff CSV", type=["csv"], key="seat_upload_file")
+    if uploaded is None:
+        return
+
+    try:
+        raw_df = pd.read_csv(uploaded)
+        valid_df, rejected_df = validate_seat_upload(raw_df)
+    except Exception as e:
+        st.error(f"Could not read upload: {e}")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Rows in file", len(raw_df))
+    col2.metric("Valid rows", len(valid_df))
+    col3.metric("Rejected rows", len(rejected_df))
+
+    if len(rejected_df) > 0:
+        st.warning(f"⚠️ {len(rejected_df)} rows were rejected and will not be loaded.")
+        st.dataframe(rejected_df.head(1000), use_container_width=True, height=250)
+        st.download_button(
+            label="📥 Download Rejected Rows",
+            data=rejected_df.to_csv(index=False).encode("utf-8"),
+            file_name="rejected_seat_rows.csv",
+            mime="text/csv"
+        )
+
+    if len(valid_df) > 0 and st.button(f"✅ Load {len(valid_df)} Rows", type="primary", key="seat_upload_load"):
+        try:
+            with st.spinner("Loading cutoffs..."):
+                summary = bulk_upsert_seats(valid_df)
+            st.success(
+                f"✅ Loaded {summary['loaded']} records, replacing {summary['replaced']} existing ones "
+                f"(data version {summary['version']})."
+            )
+        except Exception as e:
+            st.error(f"Error loading records: {e}")
@@ -1,178 +1,345 @@
 # Complete shortlist.py content with intuitive reordering controls
 
+import json
 import pandas as pd
 import streamlit as st
-from database import get_connection
-from pdf_generator import generate_shortlist_pdf, validate_dataframe_for_pdf
+from database import get_connection, get_seat_connection, register_query
+from db_writer import run_write
+from pdf_generator import validate_dataframe_for_pdf
+from pdf_jobs import submit_pdf_job, get_pdf_job_status, get_pdf_job_result, make_job_id, PDFQueueFull
+from metrics import span
+from seat_schema import option_id_sql
+from search import sparkline, PROGRAM_TAGS
 
 
-def add_to_shortlist(user_id, institute, program, closing_rank, seat_type, quota, gender, notes=""):
-    """Add item to user's shortlist with automatic priority assignment"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+SHORTLIST_DUPLICATE_SQL = register_query("shortlist.find_duplicate", """
+    SELECT id FROM shortlists 
+    WHERE user_id = ? AND institute = ? AND program = ? AND seat_type = ? AND quota = ? AND gender = ?
+""")
+SHORTLIST_MAX_PRIORITY_SQL = register_query(
+    "shortlist.max_priority", "SELECT MAX(priority_order) FROM shortlists WHERE user_id = ?"
+)
+# Latest cutoff (last round of the latest year) and the previous year's, joined for the
+# whole list through idx_seat_cutoffs_option, plus the option's materialized trend;
+# unlinked items keep the rank they were saved with
+SHORTLIST_BY_USER_SQL = register_query("shortlist.by_user", """
+    SELECT s.id, s.institute, s.program, COALESCE(cur.closing_rank, s.closing_rank) as closing_rank,
+           s.seat_type, s.quota, s.gender, s.notes, s.added_at, 
+           COALESCE(s.priority_order, s.id) as priority_order,
+           s.option_id, cur.year as cutoff_year, cur.round as cutoff_round,
+           prev.year as previous_year, prev.closing_rank as previous_closing_rank,
+           s.closing_rank as saved_closing_rank,
+           t.years as trend_years, t.closing_ranks as trend_closing_ranks,
+           t.closing_delta, t.closing_slope
+    FROM shortlists s
+    LEFT JOIN seats.seat_trends t ON t.option_id = s.option_id
+    LEFT JOIN seats.seat_cutoffs cur ON cur.id = (
+        SELECT id FROM seats.seat_cutoffs WHERE option_id = s.option_id
+        ORDER BY year DESC, round DESC LIMIT 1
+    )
+    LEFT JOIN seats.seat_cutoffs prev ON prev.id = (
+        SELECT id FROM seats.seat_cutoffs WHERE option_id = s.option_id AND year < cur.year
+        ORDER BY year DESC, round DESC LIMIT 1
+    )
+    WHERE s.user_id = ? 
+    ORDER BY COALESCE(s.priority_order, s.id) ASC
+""")
+OPTION_ID_SQL = register_query("shortlist.option_id", "SELECT " + option_id_sql({
+    'Institute': '?', 'Academic Program Name': '?', 'Quota': '?', 'Seat Type': '?', 'Gender': '?'
+}), db="seat")
+SHORTLIST_ITEM_PRIORITY_SQL = register_query(
+    "shortlist.item_priority", "SELECT priority_order FROM shortlists WHERE id = ? AND user_id = ?"
+)
+SHORTLIST_ITEM_ABOVE_SQL = register_query("shortlist.item_above", """
+    SELECT id, priority_order FROM shortlists 
+    WHERE user_id = ? AND priority_order < ? 
+    ORDER BY priority_order DESC LIMIT 1
+""")
+SHORTLIST_ITEM_BELOW_SQL = register_query("shortlist.item_below", """
+    SELECT id, priority_order FROM shortlists 
+    WHERE user_id = ? AND priority_order > ? 
+    ORDER BY priority_order ASC LIMIT 1
+""")
+SHORTLIST_IDS_IN_ORDER_SQL = register_query("shortlist.ids_in_order", """
+    SELECT id FROM shortlists 
+    WHERE user_id = ? 
+    ORDER BY priority_order ASC
+""")
+SHORTLIST_COUNT_SQL = register_query("shortlist.count", "SELECT COUNT(*) FROM shortlists WHERE user_id = ?")
+SET_PRIORITY_SQL = register_query("shortlist.set_priority", "UPDATE shortlists SET priority_order = ? WHERE id = ?")
+SET_NOTES_SQL = register_query("shortlist.set_notes", "UPDATE shortlists SET notes = ? WHERE id = ?")
+DELETE_ITEM_SQL = register_query("shortlist.delete_item", "DELETE FROM shortlists WHERE id = ?")
+CLEAR_SHORTLIST_SQL = register_query("shortlist.clear", "DELETE FROM shortlists WHERE user_id = ?")
+SUMMARY_BY_INSTITUTE_SQL = register_query("shortlist.summary_by_institute", """
+    SELECT institute, COUNT(*) as count
+    FROM shortlists
+    WHERE user_id = ?
+    GROUP BY institute
+    ORDER BY count DESC
+""")
+SUMMARY_BY_SEAT_TYPE_SQL = register_query("shortlist.summary_by_seat_type", """
+    SELECT seat_type, COUNT(*) as count
+    FROM shortlists
+    WHERE user_id = ?
+    GROUP BY seat_type
+    ORDER BY count DESC
+""")
+SUMMARY_RANKS_SQL = register_query("shortlist.summary_ranks", """
+    SELECT AVG(closing_rank) as avg_rank, MIN(closing_rank) as min_rank, MAX(closing_rank) as max_rank
+    FROM shortlists
+    WHERE user_id = ? AND closing_rank IS NOT NULL
+""")
+# "Shortlist everything matching these filters" in one statement: the filter spec
+# comes in as JSON arrays (an empty array means no restriction, as in apply_filters,
+# while names that match nothing select nothing), each matching option is inserted
+# once with its best closing rank in the range, options already on the list are
+# skipped and priorities continue after the last item
+# Runs on a click, so it is checked as hot. By design it reads the input lists, the
+# one-row spec, the small dimension tables each filter is resolved against, the
+# materialized id lists and the matching options once each; dim_option and
+# seat_cutoffs are only reached through their indexes
+_ADD_MATCHING_SCANS = (
+    "json_each", "spec", "seats.dim_institute", "seats.dim_program", "seats.dim_quota", "seats.dim_seat_type",
+    "seats.dim_gender", "institute_ids", "program_ids", "quota_ids", "seat_type_ids", "gender_ids", "m",
+)
+SHORTLIST_ADD_MATCHING_SQL = register_query("shortlist.add_matching", """
+    INSERT INTO shortlists (user_id, institute, program, closing_rank, seat_type, quota, gender, notes, priority_order, option_id)
+    WITH spec AS (
+        SELECT ? AS user_id, ? AS min_rank, ? AS max_rank, ? AS types, ? AS colleges, ? AS programs,
+               ? AS program_patterns, ? AS genders, ? AS quotas, ? AS seat_types
+    ),
+    -- Each filter resolves to the ids of one small dimension table, once
+    institute_ids AS MATERIALIZED (
+        SELECT dim_institute.id FROM spec, seats.dim_institute
+        WHERE dim_institute.type IN (SELECT value FROM json_each(spec.types))
+          AND (json_array_length(spec.colleges) = 0 OR dim_institute.name IN (SELECT value FROM json_each(spec.colleges)))
+    ),
+    program_ids AS MATERIALIZED (
+        SELECT dim_program.id FROM spec, seats.dim_program
+        WHERE (json_array_length(spec.programs) = 0 AND json_array_length(spec.program_patterns) = 0)
+           OR dim_program.name IN (SELECT value FROM json_each(spec.programs))
+           OR EXISTS (SELECT 1 FROM json_each(spec.program_patterns) WHERE dim_program.name LIKE value)
+    ),
+    gender_ids AS MATERIALIZED (
+        SELECT dim_gender.id FROM spec, seats.dim_gender
+        WHERE json_array_length(spec.genders) = 0 OR dim_gender.name IN (SELECT value FROM json_each(spec.genders))
+    ),
+    quota_ids AS MATERIALIZED (
+        SELECT dim_quota.id FROM spec, seats.dim_quota
+        WHERE json_array_length(spec.quotas) = 0 OR dim_quota.name IN (SELECT value FROM json_each(spec.quotas))
+    ),
+    seat_type_ids AS MATERIALIZED (
+        SELECT dim_seat_type.id FROM spec, seats.dim_seat_type
+        WHERE json_array_length(spec.seat_types) = 0 OR dim_seat_type.name IN (SELECT value FROM json_each(spec.seat_types))
+    ),
+    matching AS (
+        SELECT o.id AS option_id, MIN(c.closing_rank) AS closing_rank
+        FROM spec, seats.dim_option o
+        JOIN seats.seat_cutoffs c ON c.option_id = o.id
+        WHERE o.institute_id IN institute_ids
+          AND o.program_id IN program_ids
+          AND o.quota_id IN quota_ids
+          AND o.seat_type_id IN seat_type_ids
+          AND o.gender_id IN gender_ids
+          AND c.closing_rank BETWEEN spec.min_rank AND spec.max_rank
+        GROUP BY o.id
+    ),
+    saved AS MATERIALIZED (
+        SELECT s.institute, s.program, s.seat_type, s.quota, s.gender
+        FROM spec, shortlists s WHERE s.user_id = spec.user_id
+    )
+    SELECT spec.user_id, i.name, p.name, m.closing_rank, st.name, q.name, g.name, '',
+           (SELECT COALESCE(MAX(s.priority_order), 0) FROM spec, shortlists s WHERE s.user_id = spec.user_id)
+               + ROW_NUMBER() OVER (ORDER BY m.closing_rank, m.option_id),
+           m.option_id
+    FROM spec, matching m
+    JOIN seats.dim_option o ON o.id = m.option_id
+    JOIN seats.dim_institute i ON i.id = o.institute_id
+    JOIN seats.dim_program p ON p.id = o.program_id
+    JOIN seats.dim_seat_type st ON st.id = o.seat_type_id
+    JOIN seats.dim_quota q ON q.id = o.quota_id
+    JOIN seats.dim_gender g ON g.id = o.gender_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM saved
+        WHERE saved.institute = i.name AND saved.program = p.name AND saved.seat_type = st.name
+          AND saved.quota = q.name AND saved.gender = g.name
+    )
+""", allow_scan=_ADD_MATCHING_SCANS)
+
+
+def _add_to_shortlist(cursor, user_id, institute, program, closing_rank, seat_type, quota, gender, notes, option_id):
     # Check if already in shortlist
-    cursor.execute("""
-        SELECT id FROM shortlists 
-        WHERE user_id = ? AND institute = ? AND program = ? AND seat_type = ? AND quota = ? AND gender = ?
-    """, (user_id, institute, program, seat_type, quota, gender))
+    cursor.execute(SHORTLIST_DUPLICATE_SQL, (user_id, institute, program, seat_type, quota, gender))
     
     if cursor.fetchone():
-        conn.close()
         return False, "This option is already in your shortlist!"
     
     # Get the next priority number (highest priority + 1)
-    cursor.execute("SELECT MAX(priority_order) FROM shortlists WHERE user_id = ?", (user_id,))
+    cursor.execute(SHORTLIST_MAX_PRIORITY_SQL, (user_id,))
     max_priority = cursor.fetchone()[0]
     next_priority = (max_priority or 0) + 1
     
     cursor.execute("""
-        INSERT INTO shortlists (user_id, institute, program, closing_rank, seat_type, quota, gender, notes, priority_order)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (user_id, institute, program, closing_rank, seat_type, quota, gender, notes, next_priority))
-    conn.commit()
-    conn.close()
+        INSERT INTO shortlists (user_id, institute, program, closing_rank, seat_type, quota, gender, notes, priority_order, option_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (user_id, institute, program, closing_rank, seat_type, quota, gender, notes, next_priority, option_id))
     return True, "Added to shortlist successfully!"
 
 
-def get_user_shortlist(user_id):
-    """Get user's shortlist ordered by priority"""
-    conn = get_connection()
-    query = """
-        SELECT id, institute, program, closing_rank, seat_type, quota, gender, notes, added_at, 
-               COALESCE(priority_order, id) as priority_order
-        FROM shortlists 
-        WHERE user_id = ? 
-        ORDER BY COALESCE(priority_order, id) ASC
+def _find_option_id(institute, program, seat_type, quota, gender):
+    conn = get_seat_connection()
+    try:
+        return conn.execute(OPTION_ID_SQL, (institute, program, quota, seat_type, gender)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def add_to_shortlist(user_id, institute, program, closing_rank, seat_type, quota, gender, notes="", option_id=None):
     """
-    df = pd.read_sql_query(query, conn, params=(user_id,))
+    Add item to user's shortlist with automatic priority assignment
+
+    Args:
+        option_id (int): Seat option of the row (the seat cache's option_id column);
+            looked up from the names when not given
+    """
+    # numpy integers from DataFrame rows would otherwise be stored as BLOBs
+    closing_rank = int(closing_rank) if pd.notnull(closing_rank) else None
+    if option_id is None:
+        option_id = _find_option_id(institute, program, seat_type, quota, gender)
+    option_id = int(option_id) if pd.notnull(option_id) else None
+    return run_write(_add_to_shortlist, user_id, institute, program, closing_rank, seat_type, quota, gender, notes, option_id)
+
+
+def _add_matching(cursor, params):
+    return cursor.execute(SHORTLIST_ADD_MATCHING_SQL, params).rowcount
+
+
+def add_matching_to_shortlist(user_id, selected_types, selected_colleges, program_group, rank_range, gender, quota, seat_type):
+    """
+    Shortlist every option matching a set of search filters, inside the database
+
+    Takes the filter values apply_filters() does. Program groups from
+    PROGRAM_TAGS match by name like they do there; no seat rows are loaded.
+
+    Returns:
+        int: Items added (options already on the shortlist are skipped)
+    """
+    colleges = [] if not selected_colleges or "All" in selected_colleges else list(selected_colleges)
+    programs = [name for name in program_group if name not in PROGRAM_TAGS]
+    patterns = [f"%{part}%" for tag in program_group if tag in PROGRAM_TAGS for part in PROGRAM_TAGS[tag].split("|")]
+    params = (
+        user_id, int(rank_range[0]), int(rank_range[1]),
+        json.dumps(list(selected_types)), json.dumps(colleges), json.dumps(programs), json.dumps(patterns),
+        json.dumps(list(gender)), json.dumps(list(quota)), json.dumps(list(seat_type)),
+    )
+    # The statement reads the seat file, so the writer attaches it for this batch
+    with span("shortlist.add_matching"):
+        return run_write(_add_matching, params, attach_seats=True)
+
+
+def get_user_shortlist(user_id):
+    """Get user's shortlist ordered by priority, with live cutoffs from the seat database"""
+    conn = get_connection(attach_seats=True)
+    df = pd.read_sql_query(SHORTLIST_BY_USER_SQL, conn, params=(user_id,))
     conn.close()
+    df['closing_trend'] = df['trend_closing_ranks'].map(lambda text: sparkline(json.loads(text)) if isinstance(text, str) else "")
     return df
 
 
 def remove_from_shortlist(shortlist_id):
     """Remove item from shortlist"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM shortlists WHERE id = ?", (shortlist_id,))
-    conn.commit()
-    conn.close()
+    run_write(lambda cursor: cursor.execute(DELETE_ITEM_SQL, (shortlist_id,)))
 
 
 def update_shortlist_notes(shortlist_id, notes):
     """Update notes for a shortlist item"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE shortlists SET notes = ? WHERE id = ?", (notes, shortlist_id))
-    conn.commit()
-    conn.close()
+    run_write(lambda cursor: cursor.execute(SET_NOTES_SQL, (notes, shortlist_id)))
 
 
-def move_item_up(user_id, item_id):
-    """Move item up in priority (decrease priority number)"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+def clear_shortlist(user_id):
+    """Remove every item from a user's shortlist"""
+    run_write(lambda cursor: cursor.execute(CLEAR_SHORTLIST_SQL, (user_id,)))
+
+
+def _move_item_up(cursor, user_id, item_id):
     # Get current item priority
-    cursor.execute("SELECT priority_order FROM shortlists WHERE id = ? AND user_id = ?", (item_id, user_id))
+    cursor.execute(SHORTLIST_ITEM_PRIORITY_SQL, (item_id, user_id))
     current_priority = cursor.fetchone()
     
     if not current_priority or current_priority[0] <= 1:
-        conn.close()
         return False, "Item is already at the top!"
     
     current_priority = current_priority[0]
     
     # Find the item immediately above (lower priority number)
-    cursor.execute("""
-        SELECT id, priority_order FROM shortlists 
-        WHERE user_id = ? AND priority_order < ? 
-        ORDER BY priority_order DESC LIMIT 1
-    """, (user_id, current_priority))
+    cursor.execute(SHORTLIST_ITEM_ABOVE_SQL, (user_id, current_priority))
     
     above_item = cursor.fetchone()
     if not above_item:
-        conn.close()
         return False, "No item above to swap with!"
     
     above_id, above_priority = above_item
     
     # Swap priorities
-    cursor.execute("UPDATE shortlists SET priority_order = ? WHERE id = ?", (above_priority, item_id))
-    cursor.execute("UPDATE shortlists SET priority_order = ? WHERE id = ?", (current_priority, above_id))
-    
-    conn.commit()
-    conn.close()
+    cursor.execute(SET_PRIORITY_SQL, (above_priority, item_id))
+    cursor.execute(SET_PRIORITY_SQL, (current_priority, above_id))
     return True, "Moved up!"
 
 
-def move_item_down(user_id, item_id):
-    """Move item down in priority (increase priority number)"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+def move_item_up(user_id, item_id):
+    """Move item up in priority (decrease priority number)"""
+    return run_write(_move_item_up, user_id, item_id)
+
+
+def _move_item_down(cursor, user_id, item_id):
     # Get current item priority
-    cursor.execute("SELECT priority_order FROM shortlists WHERE id = ? AND user_id = ?", (item_id, user_id))
+    cursor.execute(SHORTLIST_ITEM_PRIORITY_SQL, (item_id, user_id))
     current_priority = cursor.fetchone()
     
     if not current_priority:
-        conn.close()
         return False, "Item not found!"
     
     current_priority = current_priority[0]
     
     # Find the item immediately below (higher priority number)
-    cursor.execute("""
-        SELECT id, priority_order FROM shortlists 
-        WHERE user_id = ? AND priority_order > ? 
-        ORDER BY priority_order ASC LIMIT 1
-    """, (user_id, current_priority))
+    cursor.execute(SHORTLIST_ITEM_BELOW_SQL, (user_id, current_priority))
     
     below_item = cursor.fetchone()
     if not below_item:
-        conn.close()
         return False, "Item is already at the bottom!"
     
     below_id, below_priority = below_item
     
     # Swap priorities
-    cursor.execute("UPDATE shortlists SET priority_order = ? WHERE id = ?", (below_priority, item_id))
-    cursor.execute("UPDATE shortlists SET priority_order = ? WHERE id = ?", (current_priority, below_id))
-    
-    conn.commit()
-    conn.close()
+    cursor.execute(SET_PRIORITY_SQL, (below_priority, item_id))
+    cursor.execute(SET_PRIORITY_SQL, (current_priority, below_id))
     return True, "Moved down!"
 
 
-def move_item_to_position(user_id, item_id, new_position):
-    """Move item to specific position (1 = top)"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+def move_item_down(user_id, item_id):
+    """Move item down in priority (increase priority number)"""
+    return run_write(_move_item_down, user_id, item_id)
+
+
+def _move_item_to_position(cursor, user_id, item_id, new_position):
     # Get total number of items
-    cursor.execute("SELECT COUNT(*) FROM shortlists WHERE user_id = ?", (user_id,))
+    cursor.execute(SHORTLIST_COUNT_SQL, (user_id,))
     total_items = cursor.fetchone()[0]
     
+    # None means the last position
+    if new_position is None:
+        new_position = total_items
+    
     if new_position < 1 or new_position > total_items:
-        conn.close()
         return False, f"Position must be between 1 and {total_items}!"
     
     # Get current priority
-    cursor.execute("SELECT priority_order FROM shortlists WHERE id = ? AND user_id = ?", (item_id, user_id))
-    current_priority = cursor.fetchone()
-    
-    if not current_priority:
-        conn.close()
+    cursor.execute(SHORTLIST_ITEM_PRIORITY_SQL, (item_id, user_id))
+    if not cursor.fetchone():
         return False, "Item not found!"
     
-    current_priority = current_priority[0]
-    
     # Get all items ordered by priority
-    cursor.execute("""
-        SELECT id FROM shortlists 
-        WHERE user_id = ? 
-        ORDER BY priority_order ASC
-    """, (user_id,))
+    cursor.execute(SHORTLIST_IDS_IN_ORDER_SQL, (user_id,))
     
     all_items = [row[0] for row in cursor.fetchall()]
     
@@ -181,14 +348,18 @@ def move_item_to_position(user_id, item_id, new_position):
     all_items.insert(new_position - 1, item_id)
     
     # Update all priorities
-    for index, item_id_in_list in enumerate(all_items, 1):
-        cursor.execute("UPDATE shortlists SET priority_order = ? WHERE id = ?", (index, item_id_in_list))
-    
-    conn.commit()
-    conn.close()
+    cursor.executemany(
+        SET_PRIORITY_SQL,
+        [(index, item_id_in_list) for index, item_id_in_list in enumerate(all_items, 1)]
+    )
     return True, f"Moved to position {new_position}!"
 
 
+def move_item_to_position(user_id, item_id, new_position):
+    """Move item to specific position (1 = top)"""
+    return run_write(_move_item_to_position, user_id, item_id, new_position)
+
+
 def move_item_to_top(user_id, item_id):
     """Move item to top of the list"""
     return move_item_to_position(user_id, item_id, 1)
@@ -196,12 +367,21 @@ def move_item_to_top(user_id, item_id):
 
 def move_item_to_bottom(user_id, item_id):
     """Move item to bottom of the list"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM shortlists WHERE user_id = ?", (user_id,))
-    total_items = cursor.fetchone()[0]
-    conn.close()
-    return move_item_to_position(user_id, item_id, total_items)
+    return move_item_to_position(user_id, item_id, None)
+
+
+def _rank_with_year(rank, year):
+    if pd.isnull(rank):
+        return "–"
+    return f"{int(rank):,}" + (f" ({int(year)})" if pd.notnull(year) else "")
+
+
+def _trend_text(row):
+    years = json.loads(row['trend_years'])
+    text = f"{row['closing_trend']} {years[0]}–{years[-1]}" if len(years) > 1 else f"{row['closing_trend']} {years[0]}"
+    if pd.notnull(row['closing_slope']):
+        text += f" ({int(round(row['closing_slope'])):+,}/yr)"
+    return text
 
 
 def shortlist_page():
@@ -210,7 +390,8 @@ def shortlist_page():
     st.session_state.current_page = 'shortlist'
     st.subheader("⭐ My Shortlist")
     
-    shortlist_df = get_user_shortlist(st.session_state.user_id)
+    with span("shortlist.get_user_shortlist"):
+        shortlist_df = get_user_shortlist(st.session_state.user_id)
     
     if len(shortlist_df) == 0:
         st.info("Your shortlist is empty. Go to the search page to add some options!")
@@ -220,87 +401,92 @@ def shortlist_page():
     st.info("💡 Use the control buttons to reorder items, edit notes, or remove items from your shortlist.")
     
     # Display shortlist in a clean table format with controls
-    for idx, row in shortlist_df.iterrows():
-        with st.container():
-            # Create columns for layout
-            col1, col2, col3, col4, col5, col6, col7, col8 = st.columns([0.5, 2.5, 1.5, 0.6, 0.6, 0.6, 0.6, 0.8])
+    with span("shortlist.render_items"):
+        for idx, row in shortlist_df.iterrows():
+            with st.container():
+                # Create columns for layout
+                col1, col2, col3, col4, col5, col6, col7, col8 = st.columns([0.5, 2.5, 1.5, 0.6, 0.6, 0.6, 0.6, 0.8])
             
-            with col1:
-                # Show current position
-                current_position = idx + 1
-                st.markdown(f"**#{current_position}**")
+                with col1:
+                    # Show current position
+                    current_position = idx + 1
+                    st.markdown(f"**#{current_position}**")
             
-            with col2:
-                # Institute and program info
-                st.markdown(f"**{row['institute']}**")
-                st.caption(f"{row['program']}")
+                with col2:
+                    # Institute and program info
+                    st.markdown(f"**{row['institute']}**")
+                    st.caption(f"{row['program']}")
             
-            with col3:
-                # Details
-                st.caption(f"**Rank:** {row['closing_rank']:,}")
-                st.caption(f"**Type:** {row['seat_type']} | {row['quota']}")
-                st.caption(f"**Gender:** {row['gender']}")
+                with col3:
+                    # Details
+                    st.caption(f"**Rank:** {_rank_with_year(row['closing_rank'], row['cutoff_year'])}")
+                    if pd.notnull(row['previous_closing_rank']):
+                        st.caption(f"**Previous:** {_rank_with_year(row['previous_closing_rank'], row['previous_year'])}")
+                    if row['closing_trend']:
+                        st.caption(f"**Trend:** {_trend_text(row)}")
+                    st.caption(f"**Type:** {row['seat_type']} | {row['quota']}")
+                    st.caption(f"**Gender:** {row['gender']}")
             
-            with col4:
-                # Move up button
-                if st.button("⬆️", key=f"up_{row['id']}", help="Move up one position", disabled=(current_position == 1)):
-                    success, message = move_item_up(st.session_state.user_id, row['id'])
-                    if success:
-                        st.rerun()
-                    else:
-                        st.warning(message)
+                with col4:
+                    # Move up button
+                    if st.button("⬆️", key=f"up_{row['id']}", help="Move up one position", disabled=(current_position == 1)):
+                        success, message = move_item_up(st.session_state.user_id, row['id'])
+                        if success:
+                            st.rerun()
+                        else:
+                            st.warning(message)
             
-            with col5:
-                # Move down button
-                if st.button("⬇️", key=f"down_{row['id']}", help="Move down one position", disabled=(current_position == len(shortlist_df))):
-                    success, message = move_item_down(st.session_state.user_id, row['id'])
-                    if success:
-                        st.rerun()
-                    else:
-                        st.warning(message)
+                with col5:
+                    # Move down button
+                    if st.button("⬇️", key=f"down_{row['id']}", help="Move down one position", disabled=(current_position == len(shortlist_df))):
+                        success, message = move_item_down(st.session_state.user_id, row['id'])
+                        if success:
+                            st.rerun()
+                        else:
+                            st.warning(message)
             
-            with col6:
-                # Move to top button
-                if st.button("⏫", key=f"top_{row['id']}", help="Move to top", disabled=(current_position == 1)):
-                    success, message = move_item_to_top(st.session_state.user_id, row['id'])
-                    if success:
-                        st.rerun()
-                    else:
-                        st.warning(message)
+                with col6:
+                    # Move to top button
+                    if st.button("⏫", key=f"top_{row['id']}", help="Move to top", disabled=(current_position == 1)):
+                        success, message = move_item_to_top(st.session_state.user_id, row['id'])
+                        if success:
+                            st.rerun()
+                        else:
+                            st.warning(message)
             
-            with col7:
-                # Move to bottom button
-                if st.button("⏬", key=f"bottom_{row['id']}", help="Move to bottom", disabled=(current_position == len(shortlist_df))):
-                    success, message = move_item_to_bottom(st.session_state.user_id, row['id'])
-                    if success:
-                        st.rerun()
-                    else:
-                        st.warning(message)
+                with col7:
+                    # Move to bottom button
+                    if st.button("⏬", key=f"bottom_{row['id']}", help="Move to bottom", disabled=(current_position == len(shortlist_df))):
+                        success, message = move_item_to_bottom(st.session_state.user_id, row['id'])
+                        if success:
+                            st.rerun()
+                        else:
+                            st.warning(message)
             
-            with col8:
-                # Remove button
-                if st.button("🗑️", key=f"remove_{row['id']}", help="Remove from shortlist"):
-                    remove_from_shortlist(row['id'])
-                    st.success("Removed from shortlist!")
-                    st.rerun()
+                with col8:
+                    # Remove button
+                    if st.button("🗑️", key=f"remove_{row['id']}", help="Remove from shortlist"):
+                        remove_from_shortlist(row['id'])
+                        st.success("Removed from shortlist!")
+                        st.rerun()
             
-            # Notes section (full width)
-            notes_value = row['notes'] or ''
-            new_notes = st.text_input(
-                f"Notes for {row['institute']}", 
-                value=notes_value,
-                key=f"notes_{row['id']}",
-                placeholder="Add your personal notes about this option...",
-                label_visibility="collapsed"
-            )
+                # Notes section (full width)
+                notes_value = row['notes'] or ''
+                new_notes = st.text_input(
+                    f"Notes for {row['institute']}", 
+                    value=notes_value,
+                    key=f"notes_{row['id']}",
+                    placeholder="Add your personal notes about this option...",
+                    label_visibility="collapsed"
+                )
             
-            # Auto-save notes when changed
-            if new_notes != notes_value:
-                update_shortlist_notes(row['id'], new_notes)
-                st.success("Notes saved!")
-                st.rerun()
+                # Auto-save notes when changed
+                if new_notes != notes_value:
+                    update_shortlist_notes(row['id'], new_notes)
+                    st.success("Notes saved!")
+                    st.rerun()
             
-            st.markdown("---")
+                st.markdown("---")
         
     # Export and bulk actions
     st.markdown("---")
@@ -320,30 +506,19 @@ def shortlist_page():
         )
 
     with col2:
-        # Download shortlist as PDF
+        # Download shortlist as PDF (rendered in the background pool)
         if len(shortlist_df) > 0:
-            try:
-                if validate_dataframe_for_pdf(shortlist_df):
-                    pdf_bytes = generate_shortlist_pdf(shortlist_df, st.session_state.username)
-                    st.download_button(
-                        label="📄 Download as PDF",
-                        data=pdf_bytes,
-                        file_name=f"jee_shortlist_{st.session_state.username}.pdf",
-                        mime="application/pdf",
-                        help="Download your shortlist as a well-formatted PDF"
-                    )
-                else:
-                    st.error("Invalid data format for PDF generation")
-            except Exception as e:
-                st.error(f"PDF generation error: {str(e)}")
-                # Fallback CSV download
-                st.download_button(
-                    label="📥 Download CSV (PDF Error)",
-                    data=csv,
-                    file_name=f"jee_shortlist_{st.session_state.username}_fallback.csv",
-                    mime="text/csv",
-                    help="PDF generation failed, download CSV instead"
+            if validate_dataframe_for_pdf(shortlist_df):
+                pdf_download_widget(
+                    "shortlist",
+                    shortlist_df,
+                    (st.session_state.username,),
+                    label="📄 Download as PDF",
+                    file_name=f"jee_shortlist_{st.session_state.username}.pdf",
+                    fallback_csv=csv
                 )
+            else:
+                st.error("Invalid data format for PDF generation")
         else:
             st.info("Add items to shortlist to enable PDF download")
 
@@ -351,11 +526,7 @@ def shortlist_page():
         # Clear all option
         if st.button("🗑️ Clear All Shortlist"):
             if st.button("⚠️ Confirm Clear All", key="confirm_clear_all"):
-                conn = get_connection()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM shortlists WHERE user_id = ?", (st.session_state.user_id,))
-                conn.commit()
-                conn.close()
+                clear_shortlist(st.session_state.user_id)
                 st.success("All items cleared from shortlist!")
                 st.rerun()
     
@@ -363,6 +534,76 @@ def shortlist_page():
     display_shortlist_summary()
 
 
+def pdf_download_widget(kind, df, args, label, file_name, fallback_csv=None):
+    """Submit a background PDF job and show its status until the download is ready"""
+    job_key = f"pdf_job_{kind}"
+    with span(f"pdf.{kind}.job_lookup"):
+        job_id = make_job_id(kind, df, *args)
+        status = get_pdf_job_status(job_id)
+    
+    if status["state"] == "unknown":
+        if not st.button("📄 Prepare PDF", key=f"prepare_{job_key}", help="Build the PDF in the background"):
+            return
+        try:
+            submit_pdf_job(kind, df, *args)
+        except PDFQueueFull as e:
+            st.warning(f"⚠️ {e}")
+            return
+        except Exception as e:
+            st.error(f"PDF generation error: {str(e)}")
+            _pdf_fallback_download(fallback_csv, file_name)
+            return
+        status = get_pdf_job_status(job_id)
+    
+    if status["state"] in ("queued", "running"):
+        # Poll only this fragment until the worker finishes, then rerun the page
+        @st.fragment(run_every=1.0)
+        def _pdf_job_progress():
+            current = get_pdf_job_status(job_id)
+            if current["state"] not in ("queued", "running"):
+                st.rerun()
+            state_text = "Waiting for a free worker" if current["state"] == "queued" else "Rendering PDF"
+            st.info(f"⏳ {state_text}... ({current['elapsed']:.0f}s)")
+        
+        _pdf_job_progress()
+        return
+    
+    pdf_bytes = get_pdf_job_result(job_id) if status["state"] == "done" else None
+    if pdf_bytes:
+        st.download_button(
+            label=label,
+            data=pdf_bytes,
+            file_name=file_name,
+            mime="application/pdf",
+            help="Download as a well-formatted PDF"
+        )
+        return
+    
+    st.error(f"PDF generation error: {status['error']}")
+    if st.button("🔄 Retry PDF", key=f"retry_{job_key}"):
+        try:
+            submit_pdf_job(kind, df, *args)
+        except PDFQueueFull as e:
+            st.warning(f"⚠️ {e}")
+        except Exception as e:
+            st.error(f"PDF generation error: {str(e)}")
+        else:
+            st.rerun()
+    _pdf_fallback_download(fallback_csv, file_name)
+
+
+def _pdf_fallback_download(fallback_csv, file_name):
+    """CSV download offered when the PDF could not be produced"""
+    if fallback_csv is not None:
+        st.download_button(
+            label="📥 Download CSV (PDF Error)",
+            data=fallback_csv,
+            file_name=file_name.replace(".pdf", "_fallback.csv"),
+            mime="text/csv",
+            help="PDF generation failed, download CSV instead"
+        )
+
+
 def get_shortlist_summary(user_id):
     """Get summary statistics of user's shortlist"""
     conn = get_connection()
@@ -370,35 +611,19 @@ def get_shortlist_summary(user_id):
     
     try:
         # Total items
-        cursor.execute("SELECT COUNT(*) FROM shortlists WHERE user_id = ?", (user_id,))
+        cursor.execute(SHORTLIST_COUNT_SQL, (user_id,))
         total_items = cursor.fetchone()[0]
         
         # Items by institute
-        cursor.execute("""
-            SELECT institute, COUNT(*) as count
-            FROM shortlists
-            WHERE user_id = ?
-            GROUP BY institute
-            ORDER BY count DESC
-        """, (user_id,))
+        cursor.execute(SUMMARY_BY_INSTITUTE_SQL, (user_id,))
         by_institute = cursor.fetchall()
         
         # Items by seat type
-        cursor.execute("""
-            SELECT seat_type, COUNT(*) as count
-            FROM shortlists
-            WHERE user_id = ?
-            GROUP BY seat_type
-            ORDER BY count DESC
-        """, (user_id,))
+        cursor.execute(SUMMARY_BY_SEAT_TYPE_SQL, (user_id,))
         by_seat_type = cursor.fetchall()
         
         # Average rank
-        cursor.execute("""
-            SELECT AVG(closing_rank) as avg_rank, MIN(closing_rank) as min_rank, MAX(closing_rank) as max_rank
-            FROM shortlists
-            WHERE user_id = ? AND closing_rank IS NOT NULL
-        """, (user_id,))
+        cursor.execute(SUMMARY_RANKS_SQL, (user_id,))
         rank_stats = cursor.fetchone()
         
         return {
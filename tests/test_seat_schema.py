@@ -0,0 +1,33 @@
+# Seat trend regression over years with and without a closing rank
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seat_schema import ensure_seat_schema, refresh_seat_trends
+
+
+def _seed(cursor, closing_ranks):
+    ensure_seat_schema(cursor)
+    for year, closing_rank in closing_ranks.items():
+        cursor.execute(
+            'INSERT INTO jee_seats (Institute, Location, Type, "Academic Program Name", Quota, "Seat Type", Gender, '
+            '"Opening Rank", "Closing Rank", Year, Round) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ("IIT Delhi", "Delhi", "IIT", "Computer Science and Engineering", "AI", "OPEN", "Gender-Neutral",
+             1, closing_rank, year, 1),
+        )
+    refresh_seat_trends(cursor)
+    return cursor.execute("SELECT closing_slope FROM seat_trends").fetchone()[0]
+
+
+def test_closing_slope_skips_years_without_closing_rank():
+    cursor = sqlite3.connect(":memory:").cursor()
+    slope = _seed(cursor, {2021: 1000, 2022: None, 2023: 1200, 2024: 1300})
+    assert abs(slope - 100) < 1e-9
+
+
+def test_closing_slope_over_complete_years():
+    cursor = sqlite3.connect(":memory:").cursor()
+    assert abs(_seed(cursor, {2022: 1000, 2023: 1100, 2024: 1200}) - 100) < 1e-9
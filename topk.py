@@ -0,0 +1,207 @@
+# topk.py - The K best options a rank can still get, scored by the student's own preferences
+#
+# Options are indexed by their latest cutoff, sorted by closing rank and cut into
+# log-spaced rank buckets. The options a rank can get are the suffix from the
+# rank's bucket onwards. Buckets are scored most competitive first, and the
+# scan stops as soon as no later bucket can beat the current K-th score:
+# selectivity only falls as closing ranks grow and the other terms are bounded.
+# The K best are then picked with a partial selection rather than a full sort.
+
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from search import PROGRAM_TAGS
+
+
+# Score of each institute type (types not listed score 0)
+TIER_SCORES = {"IIT": 1.0, "NIT": 0.7, "IIIT": 0.5, "GFTI": 0.3}
+
+DEFAULT_WEIGHTS = {"selectivity": 1.0, "tier": 0.5, "branch": 0.5, "location": 0.3}
+
+# Selectivity is 1 for an option closing at the rank and 0 at this many times the rank
+SELECTIVITY_RANGE = 100
+
+# Consecutive bucket edges differ by this factor
+BUCKET_RATIO = 1.25
+
+DEFAULT_K = 50
+
+_INDEX_COLUMNS = ["Institute", "Type", "Location", "Academic Program Name", "Seat Type", "Quota", "Gender"]
+
+
+class RankIndex:
+    """Latest cutoff of every option, sorted by closing rank with log-spaced bucket starts"""
+
+    def __init__(self, df):
+        self.df = df
+        rows = df[df["Closing Rank"].notna()]
+        positions = np.flatnonzero(df["Closing Rank"].notna().to_numpy())
+        if len(rows) and "option_id" in rows.columns:
+            # Latest cutoff per option: last row once sorted by option, year and round
+            order = np.lexsort((
+                rows["Round"].to_numpy(dtype=np.int64, na_value=0) if "Round" in rows.columns else np.zeros(len(rows)),
+                rows["Year"].to_numpy(dtype=np.int64),
+                rows["option_id"].to_numpy(dtype=np.int64),
+            ))
+            option = rows["option_id"].to_numpy(dtype=np.int64)[order]
+            positions = positions[order[np.r_[option[1:] != option[:-1], True]]]
+
+        closing = df["Closing Rank"].to_numpy(dtype=np.float64, na_value=np.nan)[positions]
+        order = np.argsort(closing, kind="stable")
+        self.positions = positions[order]
+        self.closing = closing[order].astype(np.int64)
+        self.codes = {}
+        self.categories = {}
+        for column in _INDEX_COLUMNS:
+            values = df[column]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("category")
+            self.codes[column] = values.cat.codes.to_numpy()[self.positions]
+            self.categories[column] = values.cat.categories
+
+        # Bucket b holds closing ranks in [BUCKET_RATIO ** b, BUCKET_RATIO ** (b + 1))
+        top = int(self.closing[-1]) if len(self.closing) else 1
+        n_buckets = max(int(math.log(max(top, 1), BUCKET_RATIO)) + 2, 1)
+        self.edges = np.ceil(BUCKET_RATIO ** np.arange(n_buckets + 1)).astype(np.int64)
+        self.edges[0] = 0
+        self.bucket_start = np.searchsorted(self.closing, self.edges, side="left")
+
+    def __len__(self):
+        return len(self.positions)
+
+    def first_eligible(self, rank):
+        """Position of the first option with closing rank >= rank"""
+        bucket = min(int(np.searchsorted(self.edges, rank, side="right")) - 1, len(self.bucket_start) - 2)
+        lo, hi = self.bucket_start[bucket], self.bucket_start[bucket + 1]
+        return int(lo + np.searchsorted(self.closing[lo:hi], rank, side="left"))
+
+    def lookup(self, column, values):
+        """Per-category table of whether a category is in values (all True when values is empty)"""
+        categories = self.categories[column]
+        if not values:
+            return np.ones(len(categories) + 1, dtype=bool)
+        table = np.zeros(len(categories) + 1, dtype=bool)
+        table[categories.get_indexer(list(values))] = True
+        table[-1] = False
+        return table
+
+    def program_tag_match(self, tags):
+        """Per-program table of whether the program name matches any of the PROGRAM_TAGS given"""
+        names = pd.Series(self.categories["Academic Program Name"], dtype=object)
+        match = np.zeros(len(names) + 1, dtype=bool)
+        for tag in tags:
+            match[:-1] |= names.str.contains(PROGRAM_TAGS[tag], case=False, na=False).to_numpy()
+        return match
+
+
+def _score_table(categories, scores):
+    table = np.zeros(len(categories) + 1)
+    for name, score in scores.items():
+        position = categories.get_indexer([name])[0]
+        if position >= 0:
+            table[position] = score
+    return table
+
+
+def top_k_options(df, rank, k=DEFAULT_K, seat_types=None, quotas=None, genders=None, types=None,
+                  institutes=None, programs=None, branches=None, locations=None, weights=None,
+                  tier_scores=None, index=None):
+    """
+    The K best options for a rank, scored by selectivity, institute tier, branch and location
+
+    Args:
+        df (pandas.DataFrame): Seat snapshot from get_jee_data()
+        rank (int): Candidate's rank (eligible options close at or above it)
+        k (int): Number of options to return
+        seat_types, quotas, genders, types, institutes, programs (list): Hard filters (empty = all)
+        branches (list): Preferred PROGRAM_TAGS, e.g. ['Computers']
+        locations (list): Preferred institute locations
+        weights (dict): Overrides for DEFAULT_WEIGHTS
+        tier_scores (dict): Overrides for TIER_SCORES
+        index (RankIndex): Prebuilt index over df (built when None)
+
+    Returns:
+        pandas.DataFrame: Up to k seat rows with a 'Score' column, best first
+    """
+    index = index if index is not None else RankIndex(df)
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    codes = index.codes
+
+    # Per-category lookup tables: filters and scores cost one gather per option
+    allowed = [
+        (codes[column], index.lookup(column, values))
+        for column, values in (("Seat Type", seat_types), ("Quota", quotas), ("Gender", genders),
+                               ("Type", types), ("Institute", institutes), ("Academic Program Name", programs))
+        if values
+    ]
+    tier = weights["tier"] * _score_table(index.categories["Type"], {**TIER_SCORES, **(tier_scores or {})})
+    branch = weights["branch"] * index.program_tag_match(branches or [])
+    location = weights["location"] * (index.lookup("Location", locations) if locations
+                                      else np.zeros(len(index.categories["Location"]) + 1, dtype=bool))
+    best_bonus = tier.max() + branch.max() + location.max()
+    log_range = math.log(SELECTIVITY_RANGE)
+
+    def selectivity(closing):
+        return weights["selectivity"] * np.clip(1 - np.log(closing / rank) / log_range, 0, 1)
+
+    kept_scores = np.zeros(0)
+    kept_rows = np.zeros(0, dtype=np.int64)
+    start = index.first_eligible(rank)
+    bucket = int(np.searchsorted(index.bucket_start, start, side="right")) - 1
+    while start < len(index):
+        end = int(index.bucket_start[bucket + 1]) if bucket + 1 < len(index.bucket_start) else len(index)
+        end = max(end, start)
+        if len(kept_scores) >= k and selectivity(index.closing[start]) + best_bonus < kept_scores.min():
+            break
+        rows = np.arange(start, end)
+        mask = np.ones(len(rows), dtype=bool)
+        for column_codes, table in allowed:
+            mask &= table[column_codes[start:end]]
+        rows = rows[mask]
+        if len(rows):
+            scores = (selectivity(index.closing[rows]) + tier[codes["Type"][rows]]
+                      + branch[codes["Academic Program Name"][rows]] + location[codes["Location"][rows]])
+            kept_scores = np.concatenate([kept_scores, scores])
+            kept_rows = np.concatenate([kept_rows, rows])
+            if len(kept_scores) > k:
+                keep = np.argpartition(-kept_scores, k - 1)[:k]
+                kept_scores, kept_rows = kept_scores[keep], kept_rows[keep]
+        start, bucket = end, bucket + 1
+
+    # Only the K survivors are sorted: best score first, then the more competitive option
+    order = np.lexsort((index.closing[kept_rows], -kept_scores))
+    result = df.iloc[index.positions[kept_rows[order]]].copy()
+    result.insert(0, "Score", np.round(kept_scores[order], 3))
+    return result
+
+
+_index = None
+_index_lock = threading.Lock()
+_listening = set()
+
+
+def _drop_index(df, removed, inserted):
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def get_rank_index(df):
+    """Shared RankIndex over the cached seat frame, rebuilt when the frame changes"""
+    global _index
+    with _index_lock:
+        if _index is None or _index.df is not df:
+            _index = RankIndex(df)
+        return _index
+
+
+def register_with_cache(cache):
+    """Release the shared index as soon as the seat cache refreshes (safe to call on every rerun)"""
+    with _index_lock:
+        if id(cache) in _listening:
+            return
+        _listening.add(id(cache))
+    cache.register_listener(_drop_index)
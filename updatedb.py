@@ -1,12 +1,18 @@
 import sqlite3
+from database import mark_seat_data_reloaded, SEAT_DB_PATH
 
-conn = sqlite3.connect('jee_data.db')
+conn = sqlite3.connect(SEAT_DB_PATH)
 cursor = conn.cursor()
 
+# jee_seats is a view, so count the matching rows up front (rowcount does not include trigger writes)
+cursor.execute("SELECT COUNT(*) FROM jee_seats WHERE Gender = 'Female Only'")
+rows_affected = cursor.fetchone()[0]
+
 cursor.execute("UPDATE jee_seats SET Gender = 'Female-only (including Supernumerary)' WHERE Gender = 'Female Only'")
 conn.commit()
 
-rows_affected = cursor.rowcount
+# Tell running app instances to reload seat data
+mark_seat_data_reloaded(conn)
 
 conn.close()
 